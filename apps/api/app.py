@@ -77,13 +77,18 @@ import uuid
 def setup_database(app):
     """Ensure the system database is ready with schema and default seeds (Zero-Setup)."""
     with app.app_context():
-        from models.metadata import Base, engine, Role, User, SessionLocal
+        from models.metadata import Base, engine, Role, User, SessionLocal, add_missing_columns
         import uuid
         
         if engine:
             try:
                 print("Backend: Checking and initializing database schema...")
                 Base.metadata.create_all(engine)
+                add_missing_columns(engine)
+
+                # Move schema embeddings still stored as JSON to binary vectors
+                from services.schema_retriever import schema_retriever
+                schema_retriever.migrate_storage()
                 
                 session = SessionLocal()
                 # 1. Seed Roles
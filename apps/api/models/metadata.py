@@ -1,5 +1,5 @@
 
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, Text, DateTime, JSON, ForeignKey, Enum
+from sqlalchemy import create_engine, Column, String, Integer, Boolean, Text, DateTime, JSON, ForeignKey, Enum, Float, LargeBinary, inspect, text
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
@@ -7,9 +7,12 @@ import os
 import datetime
 import enum
 import time
+import logging
 
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
 class Environment(enum.Enum):
     PRODUCTION = "PRODUCTION"
     STAGING = "STAGING"
@@ -212,11 +215,42 @@ class SchemaEmbedding(Base):
     schema = Column(String, default='public')
     tableName = Column(String, nullable=False)
     tableDescription = Column(Text, nullable=True)
-    embedding = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)
+    # Legacy JSON vector; holds [] once the row is stored in the binary columns below
+    embedding = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False, default=list)
+    vector = Column(LargeBinary, nullable=True)        # Packed embedding (utils/vector_codec.py)
+    vectorFormat = Column(String, nullable=True)       # 'float32' | 'float16' | 'int8'
+    vectorScale = Column(Float, nullable=True)         # int8 dequantization factor
+    embeddingModel = Column(String, nullable=True)     # Model that produced the vector; others are re-embedded
     
     created_on = Column(DateTime, default=datetime.datetime.utcnow)
     changed_on = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+class QueryEmbedding(Base):
+    """Persisted embeddings of normalized AI intents, so repeated prompts skip the embedding API."""
+    __tablename__ = 'query_embeddings'
+
+    id = Column(String, primary_key=True)              # sha256 of model + normalized text
+    model = Column(String, nullable=False)
+    text = Column(Text, nullable=False)                # the phrasing that was embedded (first seen for the key)
+    vector = Column(LargeBinary, nullable=False)       # float32 blob (utils/vector_codec.py)
+    hits = Column(Integer, default=0)
+
+    created_on = Column(DateTime, default=datetime.datetime.utcnow)
+    lastUsed = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class AIResponseCache(Base):
+    """Cached model responses for deterministic AI calls, keyed by the final prompt and model."""
+    __tablename__ = 'ai_response_cache'
+
+    id = Column(String, primary_key=True)              # sha256 of model + assembled prompt
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+
+    created_on = Column(DateTime, default=datetime.datetime.utcnow)
+    expiresAt = Column(DateTime, nullable=False, index=True)
+    lastUsed = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
 # Database connection
 import sys
 from dotenv import load_dotenv
@@ -278,6 +312,32 @@ except Exception as e:
     engine = None
     DATABASE_URL = None
 
+# Nullable columns added after their table first shipped. Only tables this module owns
+# (created by create_all, absent from database/prisma-migrations) may be listed here.
+ADDED_COLUMNS = {
+    'schema_embeddings': ('vector', 'vectorFormat', 'vectorScale', 'embeddingModel'),
+}
+
+def add_missing_columns(engine):
+    """
+    Adds the ADDED_COLUMNS to tables created before they existed. create_all() only
+    creates whole tables; Prisma-managed tables change through their own migrations.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table_name, column_names in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table_name)}
+            table = Base.metadata.tables[table_name]
+            for name in column_names:
+                if name in existing:
+                    continue
+                col_type = table.columns[name].type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(name)} {col_type}"))
+                logger.info(f"Added column {table_name}.{name}")
+
 def SessionLocal():
     if engine is None:
         return None
@@ -5,6 +5,7 @@ backend/routes/ai.py
 import os
 from flask import Blueprint, request, jsonify, g, Response, stream_with_context
 from services.ai_service import ai_service
+from services.schema_retriever import schema_retriever
 from models.metadata import AIChatMessage, AIConversation, AIFeedback
 from utils.auth_middleware import login_required
 from models.metadata import AIModel, SessionLocal
@@ -148,6 +149,31 @@ def autocomplete_sql():
     except Exception as e:
         return jsonify({'error': str(e), 'completion': ''}), 500
 
+@ai_bp.route('/schema-index', methods=['GET'])
+@login_required
+def get_schema_index_status():
+    """Reports the background embedding job for a database schema."""
+    db_id = request.args.get('databaseId')
+    if not db_id:
+        return jsonify({'error': 'databaseId is required'}), 400
+    try:
+        return jsonify(schema_retriever.index_status(db_id, request.args.get('schema', 'public')))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ai_bp.route('/schema-index', methods=['POST'])
+@login_required
+def start_schema_index():
+    """Queues a background re-index of a database schema's embeddings."""
+    data = request.json or {}
+    db_id = data.get('databaseId')
+    if not db_id:
+        return jsonify({'error': 'databaseId is required'}), 400
+    try:
+        return jsonify(schema_retriever.schedule_index(db_id, data.get('schema', 'public'), force=True)), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @ai_bp.route('/agent', methods=['POST'])
 @login_required
 def execute_agent():
@@ -4,7 +4,9 @@ execution_routes.py
 API routes for query execution, history management, and saved queries.
 """
 
-from flask import Blueprint, request, jsonify
+import json
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from services.execution import execution_service
 from utils.auth_middleware import login_required
 
@@ -30,12 +32,30 @@ def execute_query():
     auto_commit = data.get('autoCommit', True)
     limit = data.get('limit', 1000)
     try:
-        result = execution_service.execute_query(db_id, sql, auto_commit, limit)
+        result = execution_service.execute_query(db_id, sql, auto_commit, limit, data.get('schema'))
         return jsonify(result)
     except Exception as e:
         status = 404 if "not found" in str(e).lower() else 500
         return jsonify({'error': str(e)}), status
 
+@execution_bp.route('/execute/stream', methods=['POST'])
+def stream_query():
+    """Executes a query and streams results as newline-delimited JSON events."""
+    data = request.json
+    if not data:
+        return jsonify({'error': 'Missing request body'}), 400
+    db_id = data.get('databaseId')
+    sql = data.get('sql')
+    if not db_id or not sql:
+        return jsonify({'error': 'databaseId and sql are both required'}), 400
+
+    auto_commit = data.get('autoCommit', True)
+    limit = int(data.get('limit', 100000))
+    batch_size = data.get('batchSize')
+    events = execution_service.stream_query(db_id, sql, auto_commit, limit, batch_size, data.get('schema'))
+    lines = (json.dumps(event, default=str) + "\n" for event in events)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
 @execution_bp.route('/explain', methods=['POST'])
 def explain_query():
     """Generates an EXPLAIN plan for a given query and returns performance metrics."""
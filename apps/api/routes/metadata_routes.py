@@ -6,6 +6,7 @@ API routes for database schema and object discovery (metadata).
 
 from flask import Blueprint, request, jsonify
 from services.metadata import metadata_service
+from services.search_index import search_index
 from utils.auth_middleware import login_required
 
 metadata_bp = Blueprint('metadata', __name__)
@@ -216,6 +217,151 @@ def get_table_info():
         status = 404 if "not found" in str(e).lower() else 500
         return jsonify({'error': str(e)}), status
 
+@metadata_bp.route('/collection-schema', methods=['GET'])
+def get_collection_schema():
+    """Profiles a MongoDB collection's fields from a server-side document sample."""
+    db_id = request.args.get('databaseId')
+    table = request.args.get('table')
+    if not db_id or not table:
+        return jsonify({'error': 'databaseId and table are both required'}), 400
+    schema = request.args.get('schema', 'public')
+    try:
+        sample_size = request.args.get('sampleSize', type=int)
+        profile = metadata_service.get_collection_schema(db_id, schema, table, sample_size)
+        return jsonify(profile)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        status = 404 if "not found" in str(e).lower() else 500
+        return jsonify({'error': str(e)}), status
+
+@metadata_bp.route('/table-stats', methods=['GET'])
+def get_table_stats():
+    """Retrieves approximate row counts and sizes for all tables or collections of a schema; exact SQL counts are opt-in."""
+    db_id = request.args.get('databaseId')
+    if not db_id:
+        return jsonify({'error': 'databaseId required'}), 400
+    schema = request.args.get('schema', 'public')
+    exact = request.args.get('exact', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        stats = metadata_service.get_table_stats(db_id, schema, exact)
+        return jsonify(stats)
+    except Exception as e:
+        status = 404 if "not found" in str(e).lower() else 500
+        return jsonify({'error': str(e)}), status
+
+@metadata_bp.route('/redis/keys', methods=['GET'])
+def browse_redis_keys():
+    """Walks a Redis keyspace one SCAN page at a time; pass the returned cursor to continue."""
+    db_id = request.args.get('databaseId')
+    if not db_id:
+        return jsonify({'error': 'databaseId required'}), 400
+    schema = request.args.get('schema', '0')
+    try:
+        page = metadata_service.browse_keys(
+            db_id, schema,
+            cursor=int(request.args.get('cursor', 0)),
+            match=request.args.get('match') or None,
+            key_type=request.args.get('type') or None,
+            prefix=request.args.get('prefix', ''),
+            delimiter=request.args.get('delimiter', ':'),
+            count=int(request.args.get('count', 500)),
+        )
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        status = 404 if "not found" in str(e).lower() else 500
+        return jsonify({'error': str(e)}), status
+
+@metadata_bp.route('/redis/inspect', methods=['POST'])
+def inspect_redis_keys():
+    """Returns type, TTL, element count and memory usage for a batch of Redis keys."""
+    data = request.json or {}
+    db_id = data.get('databaseId')
+    keys = data.get('keys')
+    if not db_id or not isinstance(keys, list):
+        return jsonify({'error': 'databaseId and a keys list are both required'}), 400
+    try:
+        details = metadata_service.inspect_keys(db_id, str(data.get('schema', '0')), [str(k) for k in keys])
+        return jsonify(details)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        status = 404 if "not found" in str(e).lower() else 500
+        return jsonify({'error': str(e)}), status
+
+@metadata_bp.route('/redis/analysis', methods=['POST'])
+def start_keyspace_analysis():
+    """Starts a background per-prefix memory analysis of a Redis database."""
+    data = request.json or {}
+    db_id = data.get('databaseId')
+    if not db_id:
+        return jsonify({'error': 'databaseId required'}), 400
+    try:
+        job = metadata_service.analyze_keyspace(db_id, str(data.get('schema', '0')), bool(data.get('refresh', False)))
+        return jsonify(job), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        status = 404 if "not found" in str(e).lower() else 500
+        return jsonify({'error': str(e)}), status
+
+@metadata_bp.route('/redis/analysis', methods=['GET'])
+def get_keyspace_analysis():
+    """Returns progress or results of the latest Redis keyspace analysis."""
+    db_id = request.args.get('databaseId')
+    if not db_id:
+        return jsonify({'error': 'databaseId required'}), 400
+    try:
+        job = metadata_service.get_keyspace_analysis(db_id, request.args.get('schema', '0'))
+        if job is None:
+            return jsonify({'error': 'No analysis has been run for this database'}), 404
+        return jsonify(job)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        status = 404 if "not found" in str(e).lower() else 500
+        return jsonify({'error': str(e)}), status
+
+@metadata_bp.route('/search', methods=['GET'])
+def search_objects():
+    """Searches schemas, tables, views, columns and routines across all connections."""
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'error': 'q required'}), 400
+    kinds = [k for k in request.args.get('kinds', '').split(',') if k] or None
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        results = search_index.search(query, request.args.get('databaseId'), kinds, limit)
+        return jsonify(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@metadata_bp.route('/search/refresh', methods=['POST'])
+def refresh_search_index():
+    """Rebuilds the object search index for one connection, or all of them, in the background."""
+    data = request.json or {}
+    db_id = data.get('databaseId')
+    try:
+        if db_id:
+            import threading
+            threading.Thread(target=search_index.refresh_database, args=(db_id,), daemon=True).start()
+            return jsonify({'status': 'started', 'databases': 1})
+        return jsonify({'status': 'started', 'databases': search_index.refresh_all()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@metadata_bp.route('/refresh-metadata', methods=['POST'])
+def refresh_metadata():
+    """Discards cached metadata for a connection (optionally one schema)."""
+    data = request.json or {}
+    db_id = data.get('databaseId')
+    if not db_id:
+        return jsonify({'error': 'databaseId required'}), 400
+    metadata_service.refresh(db_id, data.get('schema'))
+    return jsonify({'status': 'ok'})
+
 @metadata_bp.route('/diagnostics', methods=['GET'])
 def get_diagnostics():
     """Retrieves advanced statistical profiling (histograms) for a table."""
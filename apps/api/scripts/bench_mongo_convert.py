@@ -0,0 +1,96 @@
+"""
+backend/scripts/bench_mongo_convert.py
+
+Benchmark for MongoExecutor result conversion: the previous per-value Python walk
+versus the batched C-encoder path, over wide and deeply nested documents.
+
+Usage:
+    cd backend
+    python scripts/bench_mongo_convert.py [--docs 5000] [--width 40] [--depth 4]
+"""
+
+import sys
+import os
+import time
+import argparse
+import datetime
+
+# Add backend root to path so imports work
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bson import ObjectId, Decimal128
+from services.execution.mongo_executor import MongoExecutor
+
+
+def legacy_sanitize(val):
+    """The recursive conversion MongoExecutor used before the batched path."""
+    if isinstance(val, (str, int, float, bool, type(None))):
+        return val
+    elif isinstance(val, dict):
+        return {k: legacy_sanitize(v) for k, v in val.items()}
+    elif isinstance(val, list):
+        return [legacy_sanitize(v) for v in val]
+    return str(val)
+
+
+def legacy_process(docs):
+    processed, columns = [], set()
+    for doc in docs:
+        p_doc = {k: str(v) if k == '_id' else legacy_sanitize(v) for k, v in doc.items()}
+        processed.append(p_doc)
+        columns.update(p_doc.keys())
+    return processed, sorted(columns)
+
+
+def nested(depth: int):
+    if depth == 0:
+        return {"n": 1, "s": "leaf", "ratio": 0.5, "at": datetime.datetime(2024, 1, 1)}
+    return {
+        "level": depth,
+        "tags": ["a", "b", "c"],
+        "child": nested(depth - 1),
+        "items": [nested(depth - 1) for _ in range(2)] if depth > 2 else [],
+    }
+
+
+def make_docs(count: int, width: int, depth: int):
+    base = {f"field_{i}": i if i % 3 else f"value {i}" for i in range(width)}
+    return [
+        {"_id": ObjectId(), **base, "price": Decimal128("9.99"), "created": datetime.datetime(2024, 1, 1), "doc": nested(depth)}
+        for _ in range(count)
+    ]
+
+
+def timed(fn, docs, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--width', type=int, default=40)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs, args.width, args.depth)
+    executor = MongoExecutor(service=None)
+
+    legacy_time, legacy_result = timed(legacy_process, docs, args.repeat)
+    fast_time, fast_result = timed(executor._process_documents, docs, args.repeat)
+    assert legacy_result == fast_result, "conversion paths disagree"
+
+    # Generated documents hold no None values, so every batch takes the orjson path
+    print(f"{args.docs} docs, width {args.width}, depth {args.depth}, encoder: orjson")
+    print(f"  legacy walk : {legacy_time * 1000:8.1f} ms")
+    print(f"  batched     : {fast_time * 1000:8.1f} ms")
+    print(f"  speedup     : {legacy_time / fast_time:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
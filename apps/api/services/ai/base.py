@@ -8,7 +8,11 @@ import os
 import re
 import uuid
 import json
+import time
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 from datetime import datetime
 
@@ -22,9 +26,15 @@ except ImportError:
 from models.metadata import AIChatMessage, AIGeneratedQuery, UserAIConfig, SessionLocal
 from services.conversation_context import ConversationContextManager
 from routes.ai_config import decrypt_key
+from services.ai.response_cache import ai_response_cache
+from services.ai.gateway import ai_gateway, AIGatewayError, AI_REQUEST_DEADLINE
 
 logger = logging.getLogger(__name__)
 
+# ─── Configuration ────────────────────────────────────────────────────────────
+AI_KEY_CLIENTS_MAX = 32           # Per-key Gemini clients kept (least recently used evicted)
+# ─────────────────────────────────────────────────────────────────────────────
+
 def _get_system_api_key() -> Optional[str]:
     """Helper to fetch an active API key, preferring Database > ENV."""
     session = SessionLocal()
@@ -41,6 +51,38 @@ def _get_system_api_key() -> Optional[str]:
             session.close()
     return os.getenv("GOOGLE_API_KEY")
 
+# One generative client per API key: genai.configure() is process-wide, so concurrent calls
+# with different keys must not go through it. Entries are keyed by a hash of the key.
+_key_clients: "OrderedDict[str, Any]" = OrderedDict()
+_key_clients_lock = threading.Lock()
+
+def _generative_client(api_key: str):
+    """Returns the cached GenerativeServiceClient bound to `api_key`."""
+    name = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    with _key_clients_lock:
+        client = _key_clients.get(name)
+        if client is None:
+            import google.ai.generativelanguage as glm
+            client = _key_clients[name] = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+            while len(_key_clients) > AI_KEY_CLIENTS_MAX:
+                _key_clients.popitem(last=False)
+        else:
+            _key_clients.move_to_end(name)
+        return client
+
+def get_model(model_name: str, api_key: Optional[str] = None, **kwargs):
+    """A GenerativeModel whose requests are sent with `api_key` (the global configuration if None)."""
+    model = genai.GenerativeModel(model_name, **kwargs)
+    if api_key:
+        # GenerativeModel takes no client argument; _client is the attribute it reads it from
+        # (google-generativeai is pinned in requirements.txt for this reason)
+        model._client = _generative_client(api_key)
+    return model
+
+def embed_content(api_key: Optional[str], **kwargs):
+    """genai.embed_content sent with `api_key` (the global configuration if None)."""
+    return genai.embed_content(client=_generative_client(api_key) if api_key else None, **kwargs)
+
 class BaseAIService:
     """Provides foundational AI operations and persistence."""
     def __init__(self, model_name: str = 'gemini-2.5-flash'):
@@ -60,60 +102,76 @@ class BaseAIService:
                     logger.error(f"Failed to configure global Gemini: {e}")
         return self._api_configured
 
-    def _generate_response(self, combined_prompt: str, model_id: Optional[str] = None, user_id: Optional[str] = None) -> str:
-        """Internal helper to communicate with the Gemini API, using user-specific keys if available."""
+    def _generate_response(self, combined_prompt: str, model_id: Optional[str] = None, user_id: Optional[str] = None, cache: bool = False) -> str:
+        """
+        Internal helper to communicate with the Gemini API, using user-specific keys if available.
+        With `cache`, an identical (prompt, model) pair is answered from the response cache.
+        """
+        target_model = model_id or self.model_name
+        if cache:
+            cached = ai_response_cache.get(combined_prompt, target_model)
+            if cached is not None:
+                return cached
+        response = self._request_response(combined_prompt, target_model, user_id)
+        if cache:
+            ai_response_cache.set(combined_prompt, target_model, response)
+        return response
+
+    def _request_response(self, combined_prompt: str, target_model: str, user_id: Optional[str] = None) -> str:
+        """
+        Calls Gemini through the AI gateway with the user's key, falling back to the system key
+        on API errors; both attempts share one AI_REQUEST_DEADLINE. Gateway refusals (rate limits,
+        saturation) end the request with an "AI Error:" message instead of trying another key.
+        """
         if not HAS_GENAI:
             return "AI Error: google-generativeai package is not installed"
-            
+
         # Ensure base configuration
         self._ensure_genai()
-            
-        # Try user-specific config
-        if user_id:
-            try:
-                from routes.ai_config import decrypt_key
-                session = SessionLocal()
-                config = session.query(UserAIConfig).filter(UserAIConfig.userId == user_id).first()
-                if config and config.apiKey:
-                    key = decrypt_key(config.apiKey)
-                    if key:
-                        genai.configure(api_key=key)
-                if session:
-                    session.close()
-            except Exception as e:
-                logger.error(f"Failed to use user AI key: {e}")
 
-        target_model = model_id or self.model_name
-        import time
-        max_retries = 3
-        for attempt in range(max_retries):
+        keys = []
+        for key in (self._get_user_api_key(user_id), _get_system_api_key()):
+            if key and key not in keys:
+                keys.append(key)
+
+        deadline = time.monotonic() + AI_REQUEST_DEADLINE
+        error: Optional[Exception] = None
+        for api_key in keys or [None]:
             try:
-                model = genai.GenerativeModel(target_model)
-                response = model.generate_content(combined_prompt)
-                return response.text if response and response.text else ""
+                return ai_gateway.call(
+                    lambda: self._call_model(combined_prompt, target_model, api_key),
+                    api_key=api_key, timeout=max(deadline - time.monotonic(), 0)
+                )
+            except AIGatewayError as e:
+                # Another key would only add load to a gateway that is already refusing work
+                logger.warning(f"Gemini call refused by the AI gateway: {e}")
+                return f"AI Error: {e}"
             except Exception as e:
-                # Check for rate limits first
-                if "429" in str(e) and attempt < max_retries - 1:
-                    logger.warning(f"Quota exceeded (429), retrying in 15 seconds... (Attempt {attempt+1})")
-                    time.sleep(15)
-                    continue
-                
-                # Fallback to system key
-                api_key = _get_system_api_key()
-                if api_key:
-                    try:
-                        genai.configure(api_key=api_key)
-                        model = genai.GenerativeModel(target_model)
-                        response = model.generate_content(combined_prompt)
-                        return response.text if response and response.text else ""
-                    except Exception as fallback_e:
-                        if "429" in str(fallback_e) and attempt < max_retries - 1:
-                            logger.warning(f"Fallback key Quota exceeded (429), retrying in 15 seconds... (Attempt {attempt+1})")
-                            time.sleep(15)
-                            continue
-                
-                logger.error(f"Gemini API call failed with model {target_model}: {e}", exc_info=True)
-                return f"AI Error: {str(e)}"
+                logger.warning(f"Gemini call failed with model {target_model}: {e}")
+                error = e
+
+        logger.error(f"Gemini API call failed with model {target_model}: {error}", exc_info=error)
+        return f"AI Error: {str(error)}"
+
+    def _call_model(self, combined_prompt: str, target_model: str, api_key: Optional[str]) -> str:
+        response = get_model(target_model, api_key).generate_content(combined_prompt)
+        return response.text if response and response.text else ""
+
+    def _get_user_api_key(self, user_id: Optional[str]) -> Optional[str]:
+        """Decrypted Gemini key from the user's AI config, if any."""
+        if not user_id:
+            return None
+        session = SessionLocal()
+        try:
+            config = session.query(UserAIConfig).filter(UserAIConfig.userId == user_id).first()
+            if config and config.apiKey:
+                return decrypt_key(config.apiKey)
+        except Exception as e:
+            logger.error(f"Failed to use user AI key: {e}")
+        finally:
+            if session:
+                session.close()
+        return None
 
     def _save_chat(self, role: str, content: str, user_id: Optional[str] = None, db_id: Optional[str] = None, conv_id: Optional[str] = None) -> Optional[str]:
         """Persists AI chat messages to the database."""
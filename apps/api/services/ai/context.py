@@ -4,101 +4,111 @@ context.py
 Schema context generator for AI services, including RAG-based table selection
 and sample data injection.
 """
+import os
+import math
+import time
 import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Optional, Dict, List, Any
-from datetime import datetime
 from sqlalchemy import text
 
 from models.metadata import SessionLocal
 from services.metadata import metadata_service
+from services.metadata.cache import metadata_cache, METADATA_CACHE_TTL
 from services.base_service import BaseDatabaseService
 from services.schema_retriever import schema_retriever
+from services.ai.context_packer import ContextPacker, TableContext, estimate_tokens, rank_tables_with_parents
+from utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# ─── Configuration ────────────────────────────────────────────────────────────
+CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "6000"))  # Estimated tokens per schema context
+CONTEXT_RETRIEVAL_TOP_K = 12                                            # Retrieved tables seeding the FK ranking
+CONTEXT_MAX_TABLES = 30                                                 # Upper bound; the token budget usually binds first
+CONTEXT_SAMPLE_ROWS = 3                                                 # Sample rows per table
+CONTEXT_SAMPLE_TTL = int(os.getenv("AI_CONTEXT_SAMPLE_TTL", "900"))     # Seconds sample rows stay cached
+CONTEXT_SAMPLE_FAILURE_TTL = 60                                         # Failed sample fetches are retried after this
+CONTEXT_CACHE_MAX_ENTRIES = 8192                                        # Per-table fragments kept per cache
+CONTEXT_SAMPLE_WORKERS = 4                                              # Concurrent sample queries (shared pool)
+CONTEXT_SAMPLE_TIMEOUT = float(os.getenv("AI_CONTEXT_SAMPLE_TIMEOUT", "2.0"))  # Seconds per table / per wait
+# ─────────────────────────────────────────────────────────────────────────────
+
 class SchemaContextService:
     """Provides structured database schema context for AI prompts."""
 
     def __init__(self):
-        self._schema_cache = {} # db_id:schema -> {timestamp, context}
-        self._cache_ttl_minutes = 10
+        # Rendered per-table pieces keyed by (db_id, schema, table); contexts are assembled from them
+        self._ddl_cache = TTLCache(maxsize=CONTEXT_CACHE_MAX_ENTRIES, ttl=METADATA_CACHE_TTL)
+        self._sample_cache = TTLCache(maxsize=CONTEXT_CACHE_MAX_ENTRIES, ttl=CONTEXT_SAMPLE_TTL)
+        self._sample_pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
 
-    def format_schema_context(self, db_id: str, schema: str, intent: Optional[str] = None) -> str:
-        """Constructs a rich, dialect-aware schema context with RAG-based selection."""
+    def format_schema_context(self, db_id: str, schema: str, intent: Optional[str] = None,
+                              token_budget: Optional[int] = CONTEXT_TOKEN_BUDGET) -> str:
+        """
+        Constructs a dialect-aware schema context packed into `token_budget` tokens
+        (None for no limit). Tables are ranked by retrieval score and FK distance;
+        DDL is packed first, then column comments, then sample rows.
+        """
         # Use semantic retrieval if intent is provided
         relevant_tables = []
         if intent:
-            relevant_tables = schema_retriever.get_relevant_tables(db_id, intent, schema, top_k=8)
+            relevant_tables = schema_retriever.get_relevant_tables(db_id, intent, schema, top_k=CONTEXT_RETRIEVAL_TOP_K)
             logger.info(f"RAG Context: Selected {len(relevant_tables)} tables for intent.")
 
-        # Cache check for non-specific requests
-        if not intent:
-            cache_key = f"{db_id}:{schema}"
-            if cache_key in self._schema_cache:
-                entry = self._schema_cache[cache_key]
-                if (datetime.now() - entry["timestamp"]).seconds < (self._cache_ttl_minutes * 60):
-                    return entry["context"]
-
-        # 1. Fetch metadata
+        # 1. Fetch metadata (served by the metadata cache after the first call)
         all_cols = metadata_service.get_all_columns(db_id, schema)
         if not all_cols:
             return "No schema metadata available."
-            
-        # 2. Filter by relevance (RAG)
-        if relevant_tables:
-            target_cols = self._filter_tables(all_cols, relevant_tables, db_id, schema)
-        else:
-            target_cols = all_cols
+        all_fks = metadata_service.get_all_foreign_keys(db_id, schema) or []
 
-        # 3. Fetch dialect and build DDL with samples
+        # 2. Rank: retrieved tables first, then their FK neighbours by hop count
+        ranked = rank_tables_with_parents(list(all_cols), relevant_tables, all_fks)
+
+        # 3. Pack DDL (and comments) from cached per-table fragments, highest priority first
         db_type = self._get_db_type(db_id)
-        all_fks = metadata_service.get_all_foreign_keys(db_id, schema)
-        
-        context = [f"DATABASE DIALECT: {db_type.upper()}", "SCHEMA STRUCTURE:"]
-        db_service = BaseDatabaseService()
-        
-        count = 0
-        for table, columns in target_cols.items():
-            if count >= 30: break
-            
-            # Format DDL
-            table_def = self._build_table_ddl(table, columns, all_fks)
-            
-            # Fetch sample rows
-            samples = db_service.run_dynamic_query(db_id, lambda conn: self._get_samples(conn, table, schema, db_type))
-            if samples and samples.get("rows"):
-                table_def.append("-- SAMPLE DATA (3 rows):")
-                table_def.append(f"-- Columns: {', '.join(samples['columns'])}")
-                for row in samples["rows"]:
-                    clean_row = [str(v)[:50] + "..." if isinstance(v, str) and len(str(v)) > 50 else str(v) for v in row]
-                    table_def.append(f"-- [{', '.join(clean_row)}]")
-
-            context.append("\n".join(table_def))
-            count += 1
-            
-        context_str = "\n\n".join(context)
-        
-        # Cache non-intent context
-        if not intent:
-            self._schema_cache[f"{db_id}:{schema}"] = {"timestamp": datetime.now(), "context": context_str}
-            
-        return context_str
-
-    def _filter_tables(self, all_cols: Dict, relevant: List[str], db_id: str, schema: str) -> Dict:
-        """Filters columns to relevant tables and their immediate neighbors via Foreign Keys."""
-        filtered = {t: all_cols[t] for t in relevant if t in all_cols}
-        fks = metadata_service.get_all_foreign_keys(db_id, schema)
-        
-        # Extend to include FK-related tables for joining capability
-        related = set()
-        for fk in fks:
-            if fk['table'] in relevant: related.add(fk['foreignTable'])
-            elif fk['foreignTable'] in relevant: related.add(fk['table'])
-            
-        for rt in related:
-            if rt in all_cols and rt not in filtered:
-                filtered[rt] = all_cols[rt]
-        return filtered
+        fks_by_table = defaultdict(list)
+        for fk in all_fks:
+            fks_by_table[fk['table']].append(fk)
+
+        packer = ContextPacker(token_budget, header=f"DATABASE DIALECT: {db_type.upper()}\nSCHEMA STRUCTURE:")
+        for table, via in ranked:
+            if packer.exhausted or len(packer.tables) >= CONTEXT_MAX_TABLES:
+                break
+            packer.add(TableContext(
+                name=table,
+                ddl=self._table_ddl(db_id, schema, table, all_cols[table], fks_by_table.get(table, [])),
+                comments=self._render_comments(all_cols[table]),
+                via=via,
+            ))
+        packer.fill('comments')
+
+        # 4. Samples only for packed tables, and only while budget remains
+        if not packer.exhausted:
+            sample_fragments = self._collect_samples(db_id, schema, [t.name for t in packer.tables], db_type)
+            for table in packer.tables:
+                table.samples = sample_fragments.get(table.name, "")
+            packer.fill('samples')
+
+        context = packer.render()
+        logger.debug(f"Schema context: {len(packer.tables)}/{len(ranked)} tables, ~{estimate_tokens(context)} tokens")
+        return context
+
+    def invalidate(self, db_id: str, schema: Optional[str] = None):
+        """Drops cached fragments for a database, or one of its schemas."""
+        matches = lambda key: key[0] == db_id and (schema is None or key[1] == schema)
+        self._ddl_cache.invalidate(matches)
+        self._sample_cache.invalidate(matches)
+
+    def on_cache_update(self, db_id: str, schema: Optional[str], kind: Optional[str], value: Any):
+        """Metadata cache listener: a metadata refresh also refreshes the derived fragments."""
+        if kind is None:
+            self.invalidate(db_id, schema)
+
+    # --- Private Helpers ---
 
     def _get_db_type(self, db_id: str) -> str:
         """Retrieves db type (dialect) safely."""
@@ -110,29 +120,192 @@ class SchemaContextService:
             if session:
                 session.close()
 
+    def _table_ddl(self, db_id: str, schema: str, table: str, columns: List[Dict], fks: List[Dict]) -> str:
+        """Returns the cached DDL fragment for a table, rendering it on a miss."""
+        key = (db_id, schema, table)
+        fragment = self._ddl_cache.get(key)
+        if fragment is None:
+            fragment = "\n".join(self._build_table_ddl(table, columns, fks))
+            self._ddl_cache.set(key, fragment)
+        return fragment
+
+    def _collect_samples(self, db_id: str, schema: str, tables: List[str], db_type: str) -> Dict[str, str]:
+        """
+        Returns sample fragments for the given tables. Cache misses are fetched concurrently
+        on one engine; tables still running after CONTEXT_SAMPLE_TIMEOUT are left out of this
+        context, and their late results still land in the cache for the next prompt.
+        """
+        fragments: Dict[str, str] = {}
+        missing = []
+        for table in tables:
+            fragment = self._sample_cache.get((db_id, schema, table))
+            if fragment is None:
+                missing.append(table)
+            else:
+                fragments[table] = fragment
+        if not missing:
+            return fragments
+
+        try:
+            # One config lookup/decrypt and one engine for the whole batch
+            engine = BaseDatabaseService().get_engine(db_id)
+        except Exception as e:
+            logger.debug(f"Sample rows unavailable for {db_id}: {e}")
+            for table in missing:
+                self._sample_cache.set((db_id, schema, table), "", ttl=CONTEXT_SAMPLE_FAILURE_TTL)
+            return fragments
+
+        pool = self._get_sample_pool()
+        futures = {
+            pool.submit(self._fetch_samples, engine, (db_id, schema, table), db_type): table
+            for table in missing
+        }
+        started = time.monotonic()
+        done, pending = wait(futures, timeout=CONTEXT_SAMPLE_TIMEOUT)
+        for future in done:
+            fragments[futures[future]] = future.result()
+        if pending:
+            logger.info(f"Sample rows for {len(pending)} tables exceeded {CONTEXT_SAMPLE_TIMEOUT}s; omitted from context")
+        logger.debug(f"Fetched samples for {len(done)} tables in {(time.monotonic() - started) * 1000:.0f}ms")
+        return fragments
 
-    def _build_table_ddl(self, table: str, columns: List[Dict], all_fks: List[Dict]) -> List[str]:
+    def _fetch_samples(self, engine, key: tuple, db_type: str) -> str:
+        """Worker: fetches and caches one table's sample fragment (never raises)."""
+        _, schema, table = key
+        samples = None
+        try:
+            with engine.connect() as conn:
+                samples = self._get_samples(conn, table, schema, db_type)
+        except Exception as e:
+            logger.debug(f"Sample fetch failed for {table}: {e}")
+        fragment = self._render_samples(samples)
+        # Failures are cached briefly so a broken table is not re-queried on every prompt
+        self._sample_cache.set(key, fragment, ttl=None if samples is not None else CONTEXT_SAMPLE_FAILURE_TTL)
+        return fragment
+
+    def _get_sample_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._sample_pool is None:
+                self._sample_pool = ThreadPoolExecutor(max_workers=CONTEXT_SAMPLE_WORKERS, thread_name_prefix="ai-samples")
+            return self._sample_pool
+
+    @staticmethod
+    def _render_comments(columns: List[Dict]) -> str:
+        """Column comments as SQL comment lines; empty when the metadata carries none."""
+        lines = [f"-- {c['name']}: {c['comment']}" for c in columns if c.get('comment')]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _render_samples(samples: Optional[Dict]) -> str:
+        if not samples or not samples.get("rows"):
+            return ""
+        lines = [f"-- SAMPLE DATA ({CONTEXT_SAMPLE_ROWS} rows):", f"-- Columns: {', '.join(samples['columns'])}"]
+        for row in samples["rows"]:
+            clean_row = [str(v)[:50] + "..." if isinstance(v, str) and len(str(v)) > 50 else str(v) for v in row]
+            lines.append(f"-- [{', '.join(clean_row)}]")
+        return "\n".join(lines)
+
+    def _build_table_ddl(self, table: str, columns: List[Dict], fks: List[Dict]) -> List[str]:
         """Simple DDL constructor."""
         col_strs = [f"{c['name']} {c['type']}" + (" NOT NULL" if not c.get('nullable') else "") for c in columns]
         ddl = [f'CREATE TABLE "{table}" (', *[f"  {s}" for s in col_strs]]
-        
+
         # Filter matching FKs
-        for fk in all_fks:
+        for fk in fks:
             if fk['table'] == table:
                 ddl.append(f"  FOREIGN KEY ({fk['column']}) REFERENCES {fk['foreignTable']}({fk['foreignColumn']})")
-        
+
         ddl.append(");")
         return ddl
 
     def _get_samples(self, conn, table: str, schema: str, db_type: str) -> Optional[Dict]:
-        """Fetches up to 3 sample rows."""
+        """
+        Fetches up to 3 sample rows, bounded by CONTEXT_SAMPLE_TIMEOUT. Returns None without
+        querying when the dialect/driver offers no way to bound the query, so a slow table
+        cannot hold a shared pool worker.
+        """
+        cleanup = None
         try:
-            quote = '`' if db_type == 'mysql' else '"'
-            ref = f"{quote}{schema}{quote}.{quote}{table}{quote}"
-            res = conn.execute(text(f"SELECT * FROM {ref} LIMIT 3"))
+            quote = '`' if conn.dialect.name in ('mysql', 'mariadb') else '"'
+            bounded = self._bounded_sample_query(conn, f"{quote}{schema}{quote}.{quote}{table}{quote}")
+            if bounded is None:
+                logger.debug(f"Sample rows skipped for {table}: no query timeout for {conn.dialect.name}")
+                return None
+            sql, cleanup = bounded
+            res = conn.execute(text(sql))
             return {"columns": list(res.keys()), "rows": [list(r) for r in res.fetchall()]}
         except Exception as e:
             logger.debug(f"Sample fetch failed for {table}: {e}")
             return None
+        finally:
+            if cleanup:
+                cleanup()
+
+    @staticmethod
+    def _bounded_sample_query(conn, ref: str) -> Optional[tuple]:
+        """
+        Returns (sample SQL in the dialect's row-limit syntax, cleanup callable or None) with
+        a timeout armed on the server, driver or connection; None when none is available.
+        """
+        timeout_ms = int(CONTEXT_SAMPLE_TIMEOUT * 1000)
+        seconds = f"{CONTEXT_SAMPLE_TIMEOUT:g}"
+        dialect = conn.dialect.name
+        limit = f"LIMIT {CONTEXT_SAMPLE_ROWS}"
+        if dialect == 'postgresql':
+            # LOCAL scopes the timeout to this transaction, so pooled connections are unaffected
+            conn.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+            return f"SELECT * FROM {ref} {limit}", None
+        if dialect in ('mysql', 'mariadb'):
+            if getattr(conn.dialect, 'is_mariadb', False):
+                return f"SET STATEMENT max_statement_time = {seconds} FOR SELECT * FROM {ref} {limit}", None
+            return f"SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */ * FROM {ref} {limit}", None
+        if dialect in ('clickhouse', 'clickhousedb'):
+            return f"SELECT * FROM {ref} {limit} SETTINGS max_execution_time = {seconds}", None
+
+        raw = conn.connection.driver_connection
+        if dialect in ('sqlite', 'duckdb'):
+            # Embedded engines have no statement timeout, but interrupt() is thread-safe
+            timer = threading.Timer(CONTEXT_SAMPLE_TIMEOUT, raw.interrupt)
+            timer.daemon = True
+            timer.start()
+            return f"SELECT * FROM {ref} {limit}", timer.cancel
+        if dialect == 'mssql':
+            return f"SELECT TOP {CONTEXT_SAMPLE_ROWS} * FROM {ref}", SchemaContextService._arm_mssql_timeout(conn, raw, timeout_ms)
+        if dialect == 'oracle' and hasattr(raw, 'call_timeout'):
+            raw.call_timeout = timeout_ms
+            return (f"SELECT * FROM {ref} FETCH FIRST {CONTEXT_SAMPLE_ROWS} ROWS ONLY",
+                    lambda: setattr(raw, 'call_timeout', 0))
+        return None
+
+    @staticmethod
+    def _arm_mssql_timeout(conn, raw, timeout_ms: int):
+        """
+        SQL Server has no statement timeout: LOCK_TIMEOUT (session-scoped T-SQL, any driver)
+        fails blocked reads on the server, and the driver's read timeout bounds the rest.
+        Returns the cleanup that restores the pooled connection.
+        """
+        conn.execute(text(f"SET LOCK_TIMEOUT {timeout_ms}"))
+        restore = []
+        if hasattr(raw, 'timeout'):
+            # pyodbc query timeout (whole seconds) applies to cursors opened after it is set
+            raw.timeout = max(1, math.ceil(CONTEXT_SAMPLE_TIMEOUT))
+            restore.append(lambda: setattr(raw, 'timeout', 0))
+        else:
+            # pytds has no per-query timeout; its socket timeout is the one it applies to every read
+            sock = getattr(getattr(raw, '_tds_socket', None), 'sock', None)
+            if sock is not None:
+                previous = sock.gettimeout()
+                sock.settimeout(CONTEXT_SAMPLE_TIMEOUT)
+                restore.append(lambda: sock.settimeout(previous))
+
+        def cleanup():
+            for undo in restore:
+                undo()
+            try:
+                conn.execute(text("SET LOCK_TIMEOUT -1"))
+            except Exception as e:
+                logger.debug(f"Could not reset LOCK_TIMEOUT on sample connection: {e}")
+        return cleanup
 
 schema_context_service = SchemaContextService()
+metadata_cache.subscribe(schema_context_service.on_cache_update)
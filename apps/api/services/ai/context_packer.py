@@ -0,0 +1,164 @@
+"""
+context_packer.py
+
+Token-budgeted assembly of schema context. Tables are ordered by retrieval rank
+and foreign-key distance from the retrieved tables, then packed greedily in tiers:
+every table's DDL first (so the model can see as many joinable tables as possible),
+then column comments, then sample rows, until the budget is spent. The top-ranked
+table is always included, cut down to the columns that fit if necessary.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+FK_MAX_DISTANCE = 2               # Join hops from a retrieved table still worth including
+# ─────────────────────────────────────────────────────────────────────────────
+
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local estimate of BPE token count: letter runs cost one token per ~4 characters,
+    digit runs one per ~3, and each punctuation mark one. Errs slightly high for SQL/DDL.
+    """
+    tokens = 0
+    for piece in _PIECE_RE.findall(text or ''):
+        if piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+@dataclass
+class TableContext:
+    """Renderable pieces of one table, each packed as its own tier."""
+    name: str
+    ddl: str
+    comments: str = ""
+    samples: str = ""
+    via: Optional[str] = None   # Table this one was reached from by FK; None for retrieved tables
+    included: List[str] = field(default_factory=list)
+
+
+def rank_tables(tables: Sequence[str], retrieved: Sequence[str], fks: Iterable[Dict],
+                max_distance: int = FK_MAX_DISTANCE) -> List[str]:
+    """
+    Orders tables for packing. With retrieval results: retrieved tables by rank, then
+    their FK neighbours by hop count (ties broken by the rank of the table they hang off);
+    unrelated tables are dropped. Without retrieval results the original order is kept.
+    """
+    return [table for table, _ in rank_tables_with_parents(tables, retrieved, fks, max_distance)]
+
+
+def rank_tables_with_parents(tables: Sequence[str], retrieved: Sequence[str], fks: Iterable[Dict],
+                             max_distance: int = FK_MAX_DISTANCE) -> List[Tuple[str, Optional[str]]]:
+    """Same order as rank_tables, paired with the table each FK neighbour was reached from."""
+    known = set(tables)
+    seeds = [t for t in retrieved if t in known]
+    if not seeds:
+        return [(table, None) for table in tables]
+
+    neighbours: Dict[str, List[str]] = {}
+    for fk in fks:
+        a, b = fk.get('table'), fk.get('foreignTable')
+        if a in known and b in known and a != b:
+            neighbours.setdefault(a, []).append(b)
+            neighbours.setdefault(b, []).append(a)
+
+    # Multi-source BFS; a seed's position makes earlier seeds' neighbourhoods win ties
+    order: Dict[str, tuple] = {seed: (0, rank) for rank, seed in enumerate(seeds)}
+    parents: Dict[str, str] = {}
+    queue = deque(seeds)
+    while queue:
+        current = queue.popleft()
+        distance, rank = order[current]
+        if distance >= max_distance:
+            continue
+        for other in sorted(neighbours.get(current, [])):
+            if other not in order:
+                order[other] = (distance + 1, rank)
+                parents[other] = current
+                queue.append(other)
+    return [(table, parents.get(table)) for table in sorted(order, key=lambda t: (order[t], t))]
+
+
+def truncate_ddl(ddl: str, budget: int) -> str:
+    """
+    Keeps the CREATE line, the closing line and as many column/key lines as fit in
+    `budget` tokens, noting how many were left out. The frame is kept even over budget.
+    """
+    lines = ddl.split("\n")
+    if len(lines) < 3:
+        return ddl
+    head, body, tail = lines[0], lines[1:-1], lines[-1]
+    marker = f"  -- ... {len(body)} more omitted"
+    used = estimate_tokens(head) + estimate_tokens(tail) + estimate_tokens(marker) + 3
+    kept = []
+    for line in body:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    if len(kept) == len(body):
+        return ddl
+    return "\n".join([head, *kept, f"  -- ... {len(body) - len(kept)} more omitted", tail])
+
+
+class ContextPacker:
+    """
+    Greedy tiered packer. Callers add DDL for tables in priority order, then comments
+    and samples for the tables that made it in; a piece that does not fit is skipped,
+    so smaller pieces further down can still use the remaining budget. The first DDL is
+    truncated rather than skipped, and FK neighbours are skipped when the table they
+    were reached from is not packed.
+    """
+
+    def __init__(self, budget: Optional[int], header: str = ""):
+        self.header = header
+        self.remaining = None if budget is None else budget - estimate_tokens(header)
+        self.tables: List[TableContext] = []
+        self._packed = set()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining is not None and self.remaining <= 0
+
+    def add(self, table: TableContext, tier: str = 'ddl') -> bool:
+        """Includes one tier of a table if it fits; comments/samples need the table's DDL."""
+        piece = getattr(table, tier)
+        if not piece or (tier != 'ddl' and 'ddl' not in table.included):
+            return False
+        if tier == 'ddl' and table.via is not None and table.via not in self._packed:
+            return False
+        cost = estimate_tokens(piece) + 1  # + the joining newline
+        if self.remaining is not None:
+            if cost > self.remaining:
+                if tier != 'ddl' or self.tables:
+                    return False
+                table.ddl = truncate_ddl(piece, self.remaining - 1)
+                cost = estimate_tokens(table.ddl) + 1
+            self.remaining -= cost
+        table.included.append(tier)
+        if tier == 'ddl':
+            self.tables.append(table)
+            self._packed.add(table.name)
+        return True
+
+    def fill(self, tier: str):
+        """Packs one tier across all packed tables, in priority order."""
+        for table in self.tables:
+            self.add(table, tier)
+
+    def render(self) -> str:
+        blocks = [self.header] if self.header else []
+        for table in self.tables:
+            blocks.append("\n".join(getattr(table, t) for t in ('ddl', 'comments', 'samples') if t in table.included))
+        return "\n\n".join(blocks)
@@ -0,0 +1,204 @@
+"""
+gateway.py
+
+Central admission control for Gemini calls. Every request passes through:
+  - a token bucket per API key (requests per minute with a small burst),
+  - a bounded wait queue and a concurrency cap shared by all keys (streams have
+    their own cap, so long-lived streams never block one-shot calls),
+  - a deadline, after which the request fails fast instead of holding a worker,
+  - jittered exponential backoff on HTTP 429, which also cools the whole key down
+    so concurrent requests on an exhausted key stop hammering the API.
+"""
+
+import os
+import re
+import time
+import random
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+AI_RATE_LIMIT_RPM = float(os.getenv("AI_RATE_LIMIT_RPM", "60"))      # Sustained requests per minute per API key
+AI_RATE_LIMIT_BURST = int(os.getenv("AI_RATE_LIMIT_BURST", "10"))    # Requests a key may send back to back
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))       # In-flight model calls across all keys
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "16"))                  # Requests waiting for a slot before rejecting
+AI_MAX_STREAMS = int(os.getenv("AI_MAX_STREAMS", "8"))               # Open chat streams (counted apart from the cap above)
+AI_REQUEST_DEADLINE = float(os.getenv("AI_REQUEST_DEADLINE", "30"))  # Seconds a request may spend queued + retrying
+AI_MAX_RETRIES = 3                # Retries after a 429
+AI_BACKOFF_BASE = 1.0             # First backoff ceiling in seconds, doubled per retry
+AI_BACKOFF_MAX = 20.0             # Backoff ceiling
+# ─────────────────────────────────────────────────────────────────────────────
+
+_RETRY_HINT_RES = (
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+)
+
+
+class AIGatewayError(Exception):
+    """Base error for requests the gateway refused or gave up on."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AIRateLimited(AIGatewayError):
+    """The key's quota is exhausted for longer than the request's deadline allows."""
+
+
+class AIGatewayBusy(AIGatewayError):
+    """Too many requests are already queued or in flight."""
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    text = str(error)
+    return "429" in text or type(error).__name__ == "ResourceExhausted" or "quota" in text.lower()
+
+
+def retry_after_hint(error: Exception) -> Optional[float]:
+    """Server-suggested delay from a 429 message ("Please retry in 12.3s" / retry_delay { seconds: 12 })."""
+    for pattern in _RETRY_HINT_RES:
+        match = pattern.search(str(error))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket with an optional cool-down imposed after rate-limit responses."""
+
+    def __init__(self, rate_per_minute: float = AI_RATE_LIMIT_RPM, capacity: int = AI_RATE_LIMIT_BURST):
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns 0, or returns the seconds to wait before asking again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._cooldown_until:
+                return self._cooldown_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def cool_down(self, seconds: float):
+        """Blocks the key for `seconds` (never shortens an existing cool-down)."""
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+
+class AIGateway:
+    """Rate limiting, queueing, concurrency caps and retries for model calls."""
+
+    def __init__(self, max_concurrency: int = AI_MAX_CONCURRENCY, max_queue: int = AI_MAX_QUEUE,
+                 max_streams: int = AI_MAX_STREAMS):
+        self._slots = threading.BoundedSemaphore(max(max_concurrency, 1))
+        self._stream_slots = threading.BoundedSemaphore(max(max_streams, 1))
+        self._max_queue = max_queue
+        self._waiting = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def call(self, fn: Callable[[], T], api_key: Optional[str] = None, timeout: Optional[float] = None,
+             max_retries: int = AI_MAX_RETRIES) -> T:
+        """
+        Runs `fn` once admitted for `api_key`, retrying rate-limit errors with jittered
+        exponential backoff. Raises AIRateLimited / AIGatewayBusy when the deadline
+        (`timeout` seconds, default AI_REQUEST_DEADLINE) cannot be met; other errors propagate.
+        """
+        deadline = time.monotonic() + (AI_REQUEST_DEADLINE if timeout is None else timeout)
+        bucket = self._bucket(api_key)
+        for attempt in range(max_retries + 1):
+            with self._admit(bucket, deadline):
+                try:
+                    return fn()
+                except Exception as e:
+                    if not is_rate_limit_error(e):
+                        raise
+                    error = e
+            # Full jitter, but never sooner than the server asked for
+            delay = random.uniform(0, min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * 2 ** attempt))
+            delay = max(delay, retry_after_hint(error) or 0.0)
+            bucket.cool_down(delay)
+            logger.warning(f"Gemini rate limit (429), backing off {delay:.1f}s (attempt {attempt + 1})")
+        raise AIRateLimited("AI quota exhausted; retries used up", retry_after=delay) from error
+
+    @contextmanager
+    def stream_slot(self, api_key: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Admission for streaming calls (no retries: a stream cannot be replayed). Streams take a
+        token from the key's bucket and one of AI_MAX_STREAMS stream slots, never a shared slot.
+        """
+        deadline = time.monotonic() + (AI_REQUEST_DEADLINE if timeout is None else timeout)
+        with self._queued():
+            self._wait_for_token(self._bucket(api_key), deadline)
+        if not self._stream_slots.acquire(blocking=False):
+            raise AIGatewayBusy("Too many AI chat streams open; try again shortly")
+        try:
+            yield
+        finally:
+            self._stream_slots.release()
+
+    # --- Private Helpers ---
+
+    def _bucket(self, api_key: Optional[str]) -> TokenBucket:
+        # Keys are held hashed; requests without a key share one bucket
+        name = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16] if api_key else "default"
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                bucket = self._buckets[name] = TokenBucket()
+            return bucket
+
+    @contextmanager
+    def _admit(self, bucket: TokenBucket, deadline: float):
+        """Waits for a token and a concurrency slot, failing fast when the deadline cannot be met."""
+        with self._queued():
+            self._wait_for_token(bucket, deadline)
+            acquired = self._slots.acquire(timeout=max(deadline - time.monotonic(), 0))
+        if not acquired:
+            raise AIGatewayBusy("Timed out waiting for an AI request slot")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def _queued(self):
+        """Counts the caller against AI_MAX_QUEUE while it waits (for a token or a slot)."""
+        with self._lock:
+            if self._waiting >= self._max_queue:
+                raise AIGatewayBusy("Too many AI requests queued; try again shortly")
+            self._waiting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    @staticmethod
+    def _wait_for_token(bucket: TokenBucket, deadline: float):
+        wait = bucket.reserve()
+        while wait > 0:
+            if time.monotonic() + wait > deadline:
+                raise AIRateLimited(f"AI rate limit reached; retry in {wait:.0f}s", retry_after=wait)
+            time.sleep(wait)
+            wait = bucket.reserve()
+
+
+ai_gateway = AIGateway()
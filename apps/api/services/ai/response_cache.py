@@ -0,0 +1,128 @@
+"""
+response_cache.py
+
+Cache for deterministic AI responses (SQL generation, explanation, optimization,
+fixes and autocomplete). Keys are a hash of the model id and the final assembled
+prompt, which already embeds the schema context, so a schema change yields a new
+key. An in-process TTL/LRU layer sits in front of the `ai_response_cache` table;
+persisted rows expire after AI_RESPONSE_CACHE_TTL and are pruned by last use.
+"""
+
+import os
+import hashlib
+import logging
+import datetime
+from typing import Optional
+
+from models.metadata import SessionLocal, AIResponseCache
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+RESPONSE_CACHE_TTL = int(os.getenv("AI_RESPONSE_CACHE_TTL", str(24 * 3600)))  # Seconds a response is reused (0 disables)
+RESPONSE_CACHE_MEMORY_SIZE = 512          # Responses kept in process (LRU)
+RESPONSE_CACHE_MAX_ROWS = int(os.getenv("AI_RESPONSE_CACHE_MAX_ROWS", "5000"))  # Persisted rows kept
+RESPONSE_CACHE_MAX_CHARS = 64_000         # Larger responses are not cached
+RESPONSE_CACHE_PRUNE_EVERY = 100          # Inserts between prune passes
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class AIResponseCacheService:
+    """Looks responses up in memory, then in the metadata store; stores successful ones in both."""
+
+    def __init__(self, ttl: int = RESPONSE_CACHE_TTL, memory_size: int = RESPONSE_CACHE_MEMORY_SIZE):
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=memory_size, ttl=max(ttl, 1))
+        self._inserts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def key(prompt: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\n{prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, prompt: str, model: str) -> Optional[str]:
+        """Returns the cached response for (prompt, model), or None."""
+        if not self.enabled:
+            return None
+        key = self.key(prompt, model)
+        response = self._memory.get(key)
+        if response is None:
+            response = self._load(key)
+            if response is not None:
+                self._memory.set(key, response)
+        return response
+
+    def set(self, prompt: str, model: str, response: str):
+        """Stores a successful response; empty, error and oversized responses are skipped."""
+        if not self.enabled or not response or response.startswith("AI Error:") or len(response) > RESPONSE_CACHE_MAX_CHARS:
+            return
+        key = self.key(prompt, model)
+        self._memory.set(key, response)
+        self._store(key, model, response)
+
+    def clear_memory(self):
+        """Drops the in-process layer (persisted rows are kept)."""
+        self._memory.clear()
+
+    # --- Private Helpers ---
+
+    def _load(self, key: str) -> Optional[str]:
+        """Reads an unexpired row and marks it used; store errors degrade to a miss."""
+        session = SessionLocal()
+        if session is None:
+            return None
+        try:
+            row = session.get(AIResponseCache, key)
+            now = datetime.datetime.utcnow()
+            if row is None or row.expiresAt <= now:
+                return None
+            row.hits = (row.hits or 0) + 1
+            row.lastUsed = now
+            session.commit()
+            return row.response
+        except Exception as e:
+            logger.warning(f"AI response cache lookup failed: {e}")
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+    def _store(self, key: str, model: str, response: str):
+        session = SessionLocal()
+        if session is None:
+            return
+        try:
+            now = datetime.datetime.utcnow()
+            session.merge(AIResponseCache(
+                id=key, model=model, response=response, hits=0,
+                created_on=now, lastUsed=now, expiresAt=now + datetime.timedelta(seconds=self.ttl)
+            ))
+            session.commit()
+            self._inserts += 1
+            if self._inserts % RESPONSE_CACHE_PRUNE_EVERY == 0:
+                self._prune(session)
+        except Exception as e:
+            logger.warning(f"AI response cache store failed: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
+    def _prune(self, session):
+        """Deletes expired rows, then keeps the RESPONSE_CACHE_MAX_ROWS most recently used."""
+        deleted = session.query(AIResponseCache).filter(
+            AIResponseCache.expiresAt <= datetime.datetime.utcnow()
+        ).delete(synchronize_session=False)
+        cutoff = session.query(AIResponseCache.lastUsed).order_by(AIResponseCache.lastUsed.desc()) \
+            .offset(RESPONSE_CACHE_MAX_ROWS).limit(1).scalar()
+        if cutoff is not None:
+            deleted += session.query(AIResponseCache).filter(AIResponseCache.lastUsed <= cutoff).delete(synchronize_session=False)
+        session.commit()
+        if deleted:
+            logger.info(f"Pruned {deleted} cached AI responses")
+
+
+ai_response_cache = AIResponseCacheService()
@@ -27,7 +27,7 @@ class SqlAIService(BaseAIService):
         context = schema_context_service.format_schema_context(db_id, schema, intent=prompt)
         system_prompt = get_sql_generation_prompt(context)
         
-        response = self._generate_response(f"{system_prompt}\n\nUser Intent: {prompt}", model_id=model_id, user_id=user_id)
+        response = self._generate_response(f"{system_prompt}\n\nUser Intent: {prompt}", model_id=model_id, user_id=user_id, cache=True)
         if not response or response.startswith("AI Error:"):
             return {"error": response or "Failed to generate"}
             
@@ -42,7 +42,7 @@ class SqlAIService(BaseAIService):
         self._save_chat("user", f"Explain this SQL: {sql}", user_id)
         system_prompt = get_sql_explanation_prompt()
         
-        response = self._generate_response(f"{system_prompt}\n\nSQL:\n{sql}", model_id=model_id, user_id=user_id)
+        response = self._generate_response(f"{system_prompt}\n\nSQL:\n{sql}", model_id=model_id, user_id=user_id, cache=True)
         if not response or response.startswith("AI Error:"):
             return {"error": response or "Failed to explain"}
             
@@ -55,7 +55,7 @@ class SqlAIService(BaseAIService):
         context = schema_context_service.format_schema_context(db_id, schema, intent=f"Optimize SQL: {sql}")
         system_prompt = get_sql_optimization_prompt(context)
         
-        response = self._generate_response(f"{system_prompt}\n\nCURRENT SQL:\n{sql}", model_id=model_id, user_id=user_id)
+        response = self._generate_response(f"{system_prompt}\n\nCURRENT SQL:\n{sql}", model_id=model_id, user_id=user_id, cache=True)
         if not response or response.startswith("AI Error:"):
             return {"error": response or "Failed to optimize"}
             
@@ -71,7 +71,7 @@ class SqlAIService(BaseAIService):
         context = schema_context_service.format_schema_context(db_id, schema, intent=f"Fix SQL: {sql} with error: {error}")
         system_prompt = get_sql_fix_prompt(error, context)
         
-        response = self._generate_response(f"{system_prompt}\n\nFAILED SQL:\n{sql}", model_id=model_id, user_id=user_id)
+        response = self._generate_response(f"{system_prompt}\n\nFAILED SQL:\n{sql}", model_id=model_id, user_id=user_id, cache=True)
         if not response or response.startswith("AI Error:"):
             return {"error": response or "Failed to fix"}
             
@@ -10,9 +10,15 @@ from typing import Dict, Any, Optional
 from .ai.sql import SqlAIService
 from .ai.agent import AgentAIService
 from .ai.context import schema_context_service
+from .ai.base import _get_system_api_key, get_model
+from .ai.gateway import ai_gateway, AIGatewayError
+from .ai.response_cache import ai_response_cache
+from .query_embedding_cache import drop_partial_word
 
 logger = logging.getLogger(__name__)
 
+AUTOCOMPLETE_TIMEOUT = 5.0        # Seconds an inline completion may wait for the AI gateway
+
 class AIService(SqlAIService, AgentAIService):
     """
     Primary AI service delegator.
@@ -34,7 +40,8 @@ class AIService(SqlAIService, AgentAIService):
 
     def autocomplete_sql(self, db_id: str, schema: str, prefix: str, suffix: str, user_id: Optional[str] = None, model_id: Optional[str] = None) -> Dict[str, Any]:
         """Provides fast inline SQL autocomplete using Gemini."""
-        context = self._format_schema_context(db_id, schema, intent=f"{prefix} ... {suffix}")
+        # The word under the cursor changes every keystroke; leaving it out keeps the intent stable
+        context = self._format_schema_context(db_id, schema, intent=f"{drop_partial_word(prefix)} ... {suffix}")
         
         system_instruction = (
             "You are a fast, precise SQL coding assistant for inline autocomplete.\n"
@@ -46,16 +53,29 @@ class AIService(SqlAIService, AgentAIService):
         )
         
         prompt = f"PREFIX:\n{prefix}\n\nSUFFIX:\n{suffix}\n\nCOMPLETION:"
+        target_model = model_id or "gemini-2.5-flash"
+        cache_prompt = f"{system_instruction}\n\n{prompt}"
+        cached = ai_response_cache.get(cache_prompt, target_model)
+        if cached is not None:
+            return {"completion": cached}
         try:
-            import google.generativeai as genai
-            model = genai.GenerativeModel(
-                model_name=model_id or "gemini-2.5-flash",
+            api_key = self._get_user_api_key(user_id) or _get_system_api_key()
+            model = get_model(
+                target_model, api_key,
                 system_instruction=system_instruction,
                 generation_config={"temperature": 0.1, "max_output_tokens": 128}
             )
-            response = model.generate_content(prompt)
+            # A late completion is useless: short deadline, no retries on 429
+            response = ai_gateway.call(
+                lambda: model.generate_content(prompt),
+                api_key=api_key, timeout=AUTOCOMPLETE_TIMEOUT, max_retries=0
+            )
             completion = self._clean_sql_code(response.text) if response and response.text else ""
+            ai_response_cache.set(cache_prompt, target_model, completion)
             return {"completion": completion}
+        except AIGatewayError as e:
+            logger.info(f"Autocomplete skipped: {e}")
+            return {"completion": "", "error": str(e)}
         except Exception as e:
             logger.error(f"Autocomplete failed: {e}")
             return {"completion": "", "error": str(e)}
@@ -71,7 +91,6 @@ class AIService(SqlAIService, AgentAIService):
 
     def stream_generate_response(self, prompt: str, db_id: Optional[str] = None, schema: str = "public", model_id: Optional[str] = None, user_id: Optional[str] = None, history: Optional[list] = None, conv_id: Optional[str] = None):
         """Streams responses for chat interfaces."""
-        import google.generativeai as genai
         system_prompt = "You are the Supreme SQL Architect."
         if db_id:
             context = self._format_schema_context(db_id, schema, intent=prompt)
@@ -81,9 +100,12 @@ class AIService(SqlAIService, AgentAIService):
         messages = self._context_mgr.build_context(conv_id, prompt) if conv_id else [{'role': 'user', 'parts': [{'text': prompt}]}]
         
         try:
-            model = genai.GenerativeModel(model_name=model_id or "gemini-2.5-flash", system_instruction=system_prompt)
-            for chunk in model.generate_content(messages, stream=True):
-                if chunk.text: yield chunk.text
+            api_key = self._get_user_api_key(user_id) or _get_system_api_key()
+            model = get_model(model_id or "gemini-2.5-flash", api_key, system_instruction=system_prompt)
+            # Streams are rate limited per key and capped on their own, not by the shared call slots
+            with ai_gateway.stream_slot(api_key=api_key):
+                for chunk in model.generate_content(messages, stream=True):
+                    if chunk.text: yield chunk.text
         except Exception as e:
             logger.error(f"Streaming failed: {e}")
             yield f"AI Error: {str(e)}"
@@ -8,6 +8,7 @@ from typing import Tuple, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import create_engine, pool, event
 import logging
+import threading
 
 from models.metadata import Db, SessionLocal
 from utils.common import decrypt_uri
@@ -18,7 +19,8 @@ logger = logging.getLogger(__name__)
 # Cache for database engines to manage connection pooling globally
 _engine_cache = {} # Map db_id -> engine
 _mongo_cache = {}  # Map db_id -> client
-_redis_cache = {}  # Map db_id -> client
+_redis_cache = {}  # Map (db_id, db_index) -> client, plus f"{db_id}_db" -> default index
+_redis_lock = threading.Lock()
 
 class BaseDatabaseService:
     """
@@ -28,7 +30,12 @@ class BaseDatabaseService:
 
     @staticmethod
     def invalidate_cache(db_id: str):
-        """Removes and disposes cached connections for a specific database."""
+        """Removes and disposes cached connections and metadata for a specific database."""
+        from services.metadata.cache import metadata_cache
+        from services.metadata.prefetcher import metadata_prefetcher
+        metadata_cache.invalidate(db_id)
+        metadata_prefetcher.forget(db_id)
+
         if db_id in _engine_cache:
             engine = _engine_cache.pop(db_id)
             try:
@@ -44,10 +51,14 @@ class BaseDatabaseService:
             except Exception as e:
                 logger.error(f"Failed to close Mongo client for {db_id}: {e}")
 
-        if db_id in _redis_cache:
-            client = _redis_cache.pop(db_id)
+        with _redis_lock:
+            redis_keys = [k for k in _redis_cache if isinstance(k, tuple) and k[0] == db_id]
+            redis_clients = [_redis_cache.pop(k) for k in redis_keys]
+            _redis_cache.pop(f"{db_id}_db", None)
+        for client in redis_clients:
             try:
                 client.close()
+                client.connection_pool.disconnect()
             except Exception as e:
                 logger.error(f"Failed to close Redis client for {db_id}: {e}")
 
@@ -128,6 +139,7 @@ class BaseDatabaseService:
 
             if db_id:
                 _engine_cache[db_id] = engine
+                self.schedule_prefetch(db_id)
 
             return engine
 
@@ -135,6 +147,12 @@ class BaseDatabaseService:
             logger.error(f"Connection FAILED: {e}")
             raise Exception(f"Failed to connect to {db_type}: {str(e)}")
 
+    @staticmethod
+    def schedule_prefetch(db_id: str):
+        """Queues a background metadata warm-up for a newly opened connection."""
+        from services.metadata.prefetcher import metadata_prefetcher
+        metadata_prefetcher.schedule(db_id)
+
     def get_mongo_client(self, db_id: str, session: Session):
         """Acquires a cached or new pymongo MongoClient."""
         if db_id in _mongo_cache:
@@ -169,52 +187,74 @@ class BaseDatabaseService:
         
         _mongo_cache[db_id] = client
         _mongo_cache[f"{db_id}_db"] = default_db
+        self.schedule_prefetch(db_id)
         return client, default_db
 
-    def get_redis_client(self, db_id: str, session: Session):
-        """Acquires a cached or new redis-py client."""
-        if db_id in _redis_cache:
-            client = _redis_cache[db_id]
-            try:
-                client.ping()
-                return client, _redis_cache.get(f"{db_id}_db", 0)
-            except:
-                self.invalidate_cache(db_id)
+    def get_redis_client(self, db_id: str, session: Session, db_index: Optional[int] = None):
+        """
+        Acquires a cached or new redis-py client bound to one logical database.
+        Each (db_id, db_index) pair owns its connection pool, so requests never SELECT
+        on shared connections. Stale pooled connections are health-checked by redis-py.
+        """
+        default_db = _redis_cache.get(f"{db_id}_db")
+        if default_db is not None:
+            client = _redis_cache.get((db_id, default_db if db_index is None else db_index))
+            if client is not None:
+                return client, default_db
 
         import redis
         _, config = self.get_db_config(db_id, session)
         
         uri = config.get('uri')
         if uri:
-            client = redis.Redis.from_url(uri, socket_connect_timeout=5, decode_responses=True)
-            default_db = 0 # Extracted from URI? Usually encoded in path
+            pool = redis.ConnectionPool.from_url(
+                uri, socket_connect_timeout=5, health_check_interval=30, decode_responses=True
+            )
+            default_db = int(pool.connection_kwargs.get('db', 0) or 0)
         else:
-            client = redis.Redis(
+            default_db = int(config.get('database', 0))
+            pool = redis.ConnectionPool(
                 host=config.get('host', '127.0.0.1'),
                 port=int(config.get('port', 6379)),
                 username=config.get('user'),
                 password=config.get('password'),
-                db=int(config.get('database', 0)),
+                db=default_db,
                 socket_connect_timeout=5,
+                health_check_interval=30,
                 decode_responses=True
             )
-            default_db = int(config.get('database', 0))
-            
-        _redis_cache[db_id] = client
-        _redis_cache[f"{db_id}_db"] = default_db
+        index = default_db if db_index is None else int(db_index)
+        pool.connection_kwargs['db'] = index
+
+        with _redis_lock:
+            client = _redis_cache.get((db_id, index))
+            if client is None:
+                client = redis.Redis(connection_pool=pool)
+                _redis_cache[(db_id, index)] = client
+            else:
+                pool.disconnect()
+            _redis_cache[f"{db_id}_db"] = default_db
         return client, default_db
 
-    def run_dynamic_query(self, database_id: str, callback):
-        """Helper to run a callback function using a database connection."""
+    def get_engine(self, database_id: str):
+        """Resolves the cached SQLAlchemy engine for a registered database."""
         session = SessionLocal()
-        connection = None
         try:
             db_type, config = self.get_db_config(database_id, session)
             engine = self.create_connection_engine(db_type, config, db_id=database_id)
+        finally:
+            if session:
+                session.close()
 
-            if not engine:
-                raise Exception(f"{db_type} does not support standard SQL queries via SQLAlchemy.")
+        if not engine:
+            raise Exception(f"{db_type} does not support standard SQL queries via SQLAlchemy.")
+        return engine
 
+    def run_dynamic_query(self, database_id: str, callback):
+        """Helper to run a callback function using a database connection."""
+        connection = None
+        try:
+            engine = self.get_engine(database_id)
             connection = engine.connect()
             return callback(connection)
 
@@ -225,5 +265,3 @@ class BaseDatabaseService:
         finally:
             if connection:
                 connection.close()
-            if session:
-                session.close()
\ No newline at end of file
@@ -58,6 +58,8 @@ class ConnectionService(BaseDatabaseService):
             )
             session.add(new_db)
             session.commit()
+            if new_db.type and new_db.type.lower() != 'redis':
+                self.schedule_prefetch(new_db.id)
             
             return {
                 "id": new_db.id,
@@ -104,6 +106,8 @@ class ConnectionService(BaseDatabaseService):
                 session.delete(db)
                 session.commit()
                 self.invalidate_cache(db_id)
+                from services.search_index import search_index
+                search_index.remove_database(db_id)
                 return True
             
             session.commit()
@@ -5,8 +5,9 @@ Service for executing queries on various database engines and managing history.
 Delegates heavy database-specific execution to specialized executors.
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from datetime import datetime
+import re
 import uuid
 import logging
 
@@ -16,9 +17,16 @@ from services.execution.sql_executor import SqlExecutor
 from services.execution.mongo_executor import MongoExecutor
 from services.execution.redis_executor import RedisExecutor
 from services.execution.explain_executor import ExplainExecutor
+from services.metadata.cache import metadata_cache
 
 logger = logging.getLogger(__name__)
 
+# Statements that change the catalog and therefore stale the metadata cache
+_DDL_PATTERN = re.compile(r'^\s*(CREATE|ALTER|DROP|RENAME|TRUNCATE|COMMENT)\b', re.IGNORECASE)
+
+# Rows grouped into one streamed event
+STREAM_CHUNK_ROWS = 500
+
 class ExecutionService(BaseDatabaseService):
     """
     Handles query routing, execution, and history persistence.
@@ -32,8 +40,9 @@ class ExecutionService(BaseDatabaseService):
         self.redis_executor = RedisExecutor(self)
         self.explain_executor = ExplainExecutor(self)
 
-    def execute_query(self, database_id: str, sql: str, auto_commit: bool = True, limit: int = 1000) -> Dict[str, Any]:
-        """Routes and executes a query, persisting the outcome to history."""
+    def execute_query(self, database_id: str, sql: str, auto_commit: bool = True, limit: int = 1000,
+                      schema: Optional[str] = None) -> Dict[str, Any]:
+        """Routes and executes a query, persisting the outcome to history. `schema` selects the Redis logical DB."""
         start_time = datetime.now()
         status = 'SUCCESS'
         error_message = None
@@ -54,9 +63,11 @@ class ExecutionService(BaseDatabaseService):
             if db_type == 'mongodb':
                 data, columns = self.mongo_executor.execute(database_id, sql, limit)
             elif db_type == 'redis':
-                data, columns = self.redis_executor.execute(database_id, sql, limit)
+                data, columns = self.redis_executor.execute(database_id, sql, limit, schema)
             else:
                 data, columns = self.sql_executor.execute(database_id, sql, limit, auto_commit)
+                if _DDL_PATTERN.match(sql):
+                    metadata_cache.invalidate(database_id)
             
         except Exception as e:
             status = 'FAILED'
@@ -73,6 +84,69 @@ class ExecutionService(BaseDatabaseService):
             "error": error_message
         }
 
+    def stream_query(self, database_id: str, sql: str, auto_commit: bool = True, limit: int = 100000,
+                     batch_size: Optional[int] = None, schema: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Executes a query and yields result events as rows arrive, without buffering the result set:
+        {"type": "columns"} (SQL only, up front), {"type": "rows"} chunks, then {"type": "end"}
+        or {"type": "error"}. History is recorded once the stream finishes.
+        """
+        start_time = datetime.now()
+        error_message = None
+        columns: List[str] = []
+        seen_columns: Dict[str, None] = {}
+        row_count = 0
+
+        try:
+            if not database_id or not sql:
+                raise ValueError("Database ID and SQL query are required.")
+
+            session = SessionLocal()
+            try:
+                db_type, _ = self.get_db_config(database_id, session)
+            finally:
+                session.close()
+
+            if db_type == 'mongodb':
+                rows = self.mongo_executor.stream(database_id, sql, limit, batch_size)
+            elif db_type == 'redis':
+                rows = iter(self.redis_executor.execute(database_id, sql, limit, schema)[0])
+            else:
+                rows = self.sql_executor.stream(database_id, sql, limit, auto_commit)
+                columns = next(rows, [])
+                yield {"type": "columns", "columns": columns}
+
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if not columns:
+                    seen_columns.update(dict.fromkeys(row))
+                if len(chunk) >= STREAM_CHUNK_ROWS:
+                    row_count += len(chunk)
+                    yield {"type": "rows", "rows": chunk}
+                    chunk = []
+            if chunk:
+                row_count += len(chunk)
+                yield {"type": "rows", "rows": chunk}
+
+            if db_type not in ['mongodb', 'redis'] and _DDL_PATTERN.match(sql):
+                metadata_cache.invalidate(database_id)
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"Streaming execution failed for {database_id}: {error_message}")
+
+        execution_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+        self._save_history(database_id, sql, 'FAILED' if error_message else 'SUCCESS', execution_time_ms, error_message)
+        if error_message:
+            yield {"type": "error", "error": error_message, "rowCount": row_count}
+        else:
+            yield {
+                "type": "end",
+                "rowCount": row_count,
+                "columns": columns or sorted(seen_columns),
+                "executionTime": execution_time_ms,
+            }
+
     def get_explain_plan(self, database_id: str, sql: str) -> Dict[str, Any]:
         """Routes an EXPLAIN request to the ExplainExecutor."""
         if not database_id or not sql:
@@ -84,9 +158,10 @@ class ExecutionService(BaseDatabaseService):
         finally:
             session.close()
 
-        # We only support EXPLAIN for SQL relational DBs for now
-        if db_type in ['mongodb', 'redis']:
-             raise ValueError("Performance Insights (EXPLAIN) is currently only supported for SQL databases.")
+        if db_type == 'mongodb':
+            return self.mongo_executor.explain(database_id, sql)
+        if db_type == 'redis':
+            raise ValueError("Performance Insights (EXPLAIN) is not supported for Redis.")
 
         return self.explain_executor.execute(database_id, sql)
 
@@ -5,61 +5,135 @@ Specialized executor for MongoDB queries (MQL and SQL-like).
 """
 
 import re
+import json
 import logging
-from typing import List, Dict, Any, Tuple
+import orjson
+from itertools import islice
+from typing import List, Dict, Any, Tuple, Iterator, Optional
 from bson import json_util
 from models.metadata import SessionLocal
+from services.execution.sql_to_mql import translate, SqlTranslationError
+from services.execution.mongo_explain import normalize_explain
 
 logger = logging.getLogger(__name__)
 
+# ─── Configuration ────────────────────────────────────────────────────────────
+MONGO_BATCH_SIZE = 500            # Documents per getMore round-trip
+EXPLAIN_MAX_TIME_MS = 30000       # Matches the statement_timeout used for SQL EXPLAIN ANALYZE
+# Stages after which nothing may follow, so no $limit can be appended
+_TERMINAL_STAGES = ('$out', '$merge')
+# ─────────────────────────────────────────────────────────────────────────────
+
 class MongoExecutor:
     """Handles execution of MongoDB queries via MQL syntax (e.g. coll.find()) or SQL fallbacks."""
 
     def __init__(self, service):
         self.service = service
 
-    def execute(self, db_id: str, sql: str, limit: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+    def execute(self, db_id: str, sql: str, limit: int, batch_size: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
         """Parses and executes a MongoDB query, returning results and column names."""
         session = SessionLocal()
         try:
-            db_type, config = self.service.get_db_config(db_id, session)
-            if db_type != 'mongodb':
-                raise ValueError(f"Expected mongodb type, got {db_type}")
-                
-            sql = sql.strip()
-            # Match formats like db.collection.find(...) or collection.find(...)
-            mql_match = re.match(
-                r'^(db|[\w\.-]+)\.(find|aggregate|insertOne|insertMany|updateOne|updateMany|deleteOne|deleteMany|replaceOne|createView)\s*\((.*)\)\s*$', 
-                sql, re.DOTALL | re.IGNORECASE
-            )
-            
-            # Simple SQL-like fallback: SELECT * FROM collection
-            sql_match = re.search(r'FROM\s+["\']?([\w\.-]+)["\']?', sql, re.IGNORECASE)
-            
-            collection_name, query_type, args = self._parse_query(mql_match, sql_match, sql)
-            
-            # Resolve database and collection
-            target_db, collection_name = self._resolve_target(collection_name, config)
-            
-            client, _ = self.service.get_mongo_client(db_id, session)
-            if not client:
-                raise Exception("Failed to connect to MongoDB cluster")
-            
-            target_obj = client[target_db] if collection_name.lower() == 'db' else client[target_db][collection_name]
-            
-            # Map JS-style method names to PyMongo's snake_case
-            method_name = self._get_method_name(query_type)
-            method = getattr(target_obj, method_name, None)
-            
-            if not method and method_name != 'command':
-                raise Exception(f"Unsupported MongoDB operation: {query_type}")
+            op = self._prepare(db_id, sql, session)
+            return self._run_operation(*op, limit, batch_size=batch_size)
+        finally:
+            session.close()
 
-            return self._run_operation(method, method_name, query_type, args, limit, client, target_db)
+    def stream(self, db_id: str, sql: str, limit: int, batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields result documents one at a time straight off the cursor.
+        find/aggregate never materialize the result set; write operations yield their summary row.
+        """
+        session = SessionLocal()
+        try:
+            method, py_name, orig_name, args, client, db_name = self._prepare(db_id, sql, session)
         finally:
             session.close()
 
+        if py_name in ('find', 'aggregate'):
+            cursor = self._open_cursor(method, py_name, args, limit, batch_size)
+            # Convert per cursor batch: one encoder call per batch instead of per document
+            chunk_size = int(batch_size or MONGO_BATCH_SIZE)
+            while True:
+                docs = list(islice(cursor, chunk_size))
+                if not docs:
+                    break
+                yield from self._to_json_compatible(docs)
+        else:
+            rows, _ = self._run_operation(method, py_name, orig_name, args, client, db_name, limit)
+            yield from rows
+
+    def explain(self, db_id: str, sql: str) -> Dict[str, Any]:
+        """Runs explain("executionStats") for a find/aggregate and normalizes the plan."""
+        session = SessionLocal()
+        try:
+            method, py_name, _, args, client, db_name = self._prepare(db_id, sql, session)
+        finally:
+            session.close()
+
+        if py_name not in ('find', 'aggregate'):
+            raise ValueError("Performance Insights (EXPLAIN) supports MongoDB find and aggregate queries only.")
+        collection = method.__self__.name
+        raw = client[db_name].command({
+            "explain": self._explain_command(py_name, collection, args),
+            "verbosity": "executionStats",
+        })
+        # Filters echo BSON values (ObjectId, dates) that must become JSON-safe
+        plan = self._to_json_compatible(normalize_explain(raw, collection))
+        return {"plan": plan, "dialect": "mongodb"}
+
     # --- Private Helpers ---
 
+    def _explain_command(self, py_name: str, collection: str, args: List[Any]) -> Dict[str, Any]:
+        """Builds the find/aggregate command document that explain wraps."""
+        if py_name == 'aggregate':
+            options = args[1] if len(args) > 1 and isinstance(args[1], dict) else {}
+            return {"aggregate": collection, "pipeline": list(args[0]) if args else [], "cursor": {},
+                    "maxTimeMS": EXPLAIN_MAX_TIME_MS, **options}
+
+        command: Dict[str, Any] = {"find": collection, "filter": args[0] if args else {}, "maxTimeMS": EXPLAIN_MAX_TIME_MS}
+        if len(args) > 1 and args[1]:
+            command["projection"] = args[1]
+        options = args[2] if len(args) > 2 and isinstance(args[2], dict) else {}
+        command.update({k: v for k, v in options.items() if k in ('sort', 'skip', 'limit', 'hint', 'collation')})
+        return command
+
+    def _prepare(self, db_id: str, sql: str, session):
+        """Parses the query and resolves the PyMongo callable it targets."""
+        db_type, config = self.service.get_db_config(db_id, session)
+        if db_type != 'mongodb':
+            raise ValueError(f"Expected mongodb type, got {db_type}")
+            
+        sql = sql.strip()
+        # Match formats like db.collection.find(...) or collection.find(...)
+        mql_match = re.match(
+            r'^(db|[\w\.-]+)\.(find|aggregate|insertOne|insertMany|updateOne|updateMany|deleteOne|deleteMany|replaceOne|createView)\s*\((.*)\)\s*$', 
+            sql, re.DOTALL | re.IGNORECASE
+        )
+        
+        # Simple SQL-like fallback: SELECT * FROM collection
+        sql_match = re.search(r'FROM\s+["\']?([\w\.-]+)["\']?', sql, re.IGNORECASE)
+        
+        collection_name, query_type, args = self._parse_query(mql_match, sql_match, sql)
+        
+        # Resolve database and collection
+        target_db, collection_name = self._resolve_target(collection_name, config)
+        
+        client, _ = self.service.get_mongo_client(db_id, session)
+        if not client:
+            raise Exception("Failed to connect to MongoDB cluster")
+        
+        target_obj = client[target_db] if collection_name.lower() == 'db' else client[target_db][collection_name]
+        
+        # Map JS-style method names to PyMongo's snake_case
+        method_name = self._get_method_name(query_type)
+        method = getattr(target_obj, method_name, None)
+        
+        if not method and method_name != 'command':
+            raise Exception(f"Unsupported MongoDB operation: {query_type}")
+
+        return method, method_name, query_type, args, client, target_db
+
     def _parse_query(self, mql_match, sql_match, sql: str) -> Tuple[str, str, List[Any]]:
         """Extracts operation details from the input query string."""
         if mql_match:
@@ -70,8 +144,12 @@ class MongoExecutor:
             except Exception as e:
                 raise Exception(f"MQL Parse Error: {e}. Use valid JSON with double quotes.")
         elif sql_match:
-            # Default to find({}) for basic SQL syntax
-            return sql_match.group(1), 'find', [{}]
+            # Push WHERE/columns/ORDER BY/LIMIT down to the server instead of scanning with find({})
+            try:
+                query = translate(sql)
+            except SqlTranslationError as e:
+                raise Exception(f"SQL Translation Error: {e}. Use MQL for queries outside the SELECT subset.")
+            return query.collection, query.operation, query.to_args()
         else:
             raise Exception("Unsupported format. Use 'db.collection.find({...})' or 'collection.find({...})'.")
 
@@ -96,15 +174,10 @@ class MongoExecutor:
         }
         return method_map.get(query_type, query_type)
 
-    def _run_operation(self, method, py_name, orig_name, args, limit, client, db_name) -> Tuple[List[Dict[str, Any]], List[str]]:
+    def _run_operation(self, method, py_name, orig_name, args, client, db_name, limit, batch_size: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
         """Executes the PyMongo operation and formats the result."""
-        if py_name == 'find':
-            cursor = method(*args).limit(limit)
-            return self._process_documents(list(cursor))
-        elif py_name == 'aggregate':
-            cursor = method(*args)
-            docs = [doc for i, doc in enumerate(cursor) if i < limit]
-            return self._process_documents(docs)
+        if py_name in ('find', 'aggregate'):
+            return self._process_documents(self._open_cursor(method, py_name, args, limit, batch_size))
         elif py_name == 'command' and orig_name == 'createView':
             # createView: [viewName, sourceColl, pipeline]
             result = client[db_name].command({'create': args[0], 'viewOn': args[1], 'pipeline': args[2]})
@@ -113,30 +186,64 @@ class MongoExecutor:
             result = method(*args)
             return self._format_result(self._build_info(result, orig_name))
 
-    def _sanitize_bson(self, val: Any) -> Any:
-        """Recursively sanitizes BSON types to be JSON serializable."""
-        if isinstance(val, (str, int, float, bool, type(None))):
-            return val
-        elif isinstance(val, dict):
-            return {k: self._sanitize_bson(v) for k, v in val.items()}
-        elif isinstance(val, list):
-            return [self._sanitize_bson(v) for v in val]
+    def _open_cursor(self, method, py_name: str, args: List[Any], limit: int, batch_size: Optional[int] = None):
+        """
+        Opens a find/aggregate cursor that the server bounds to `limit` documents
+        (a limit of 0 yields nothing, without querying).
+        find(filter, projection, options) follows mongosh: options may carry sort/skip/limit;
+        pipelines get a trailing $limit.
+        """
+        batch_size = int(batch_size or MONGO_BATCH_SIZE)
+        if py_name == 'find':
+            options = dict(args[2]) if len(args) > 2 and isinstance(args[2], dict) else {}
+            sort, skip = options.pop('sort', None), options.pop('skip', 0)
+            # The tighter of the query's own LIMIT and the executor's row cap wins
+            limits = [n for n in (limit, options.pop('limit', None)) if n is not None]
+            limit = min(limits) if limits else 0
+            if limits and limit == 0:
+                # LIMIT 0 asks for no documents; cursor.limit(0) would mean "no limit"
+                return iter(())
+            cursor = method(*args[:2], **options)
+            if sort:
+                cursor = cursor.sort(list(sort.items()))
+            if skip:
+                cursor = cursor.skip(skip)
+            return cursor.limit(limit).batch_size(min(batch_size, limit) if limit else batch_size)
+
+        if limit == 0:
+            return iter(())
+        pipeline = list(args[0]) if args else []
+        if limit and not (pipeline and any(stage in pipeline[-1] for stage in _TERMINAL_STAGES)):
+            pipeline.append({"$limit": limit})
+        options = args[1] if len(args) > 1 and isinstance(args[1], dict) else {}
+        return method(pipeline, batchSize=batch_size, **options)
+
+    def _to_json_compatible(self, docs: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Converts a batch of already-decoded BSON documents (pymongo decodes in C) to
+        JSON-compatible dicts in one orjson encode/decode pass; types JSON lacks
+        (ObjectId, datetime, Decimal128, ...) become str.
+        """
+        encoded = orjson.dumps(docs, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        if b'null' in encoded:
+            # orjson writes NaN/Infinity as null too; the stdlib encoder keeps them as floats.
+            # (A "null" inside a string also lands here, which only costs speed.)
+            converted = json.loads(json.dumps(docs, default=str))
         else:
-            return str(val)
+            converted = orjson.loads(encoded)
+        # _id is always presented as a string, whatever its BSON type
+        for raw, doc in zip(docs, converted):
+            if '_id' in raw and not isinstance(doc['_id'], str):
+                doc['_id'] = str(raw['_id'])
+        return converted
 
-    def _process_documents(self, docs: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    def _process_documents(self, docs) -> Tuple[List[Dict], List[str]]:
         """Serializes BSON documents to standard JSON-compatible formats."""
-        processed, columns = [], set()
-        for doc in docs:
-            p_doc = {}
-            for k, v in doc.items():
-                if k == '_id':
-                    p_doc[k] = str(v)
-                else:
-                    p_doc[k] = self._sanitize_bson(v)
-            processed.append(p_doc)
-            columns.update(p_doc.keys())
-        return processed, sorted(list(columns))
+        processed = self._to_json_compatible(list(docs))
+        columns = set()
+        for doc in processed:
+            columns.update(doc)
+        return processed, sorted(columns)
 
     def _format_result(self, info: Dict) -> Tuple[List[Dict], List[str]]:
         """Formats a single operation info dict as a row/column response."""
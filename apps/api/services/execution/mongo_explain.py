@@ -0,0 +1,138 @@
+"""
+mongo_explain.py
+
+Normalizes MongoDB `explain("executionStats")` output into the node tree used for
+relational plans (Postgres JSON keys: "Node Type", "Plans", "Actual Rows", ...), so
+collection scans surface the way sequential scans do.
+"""
+
+from typing import Any, Dict, List, Optional
+
+# Classic and slot-based engine stages that read documents or index keys
+_SCAN_STAGES = {'COLLSCAN', 'IXSCAN', 'IDHACK', 'EXPRESS_IXSCAN', 'CLUSTERED_IXSCAN', 'COUNT_SCAN', 'DISTINCT_SCAN', 'scan', 'ixseek', 'ixscan'}
+_COLLSCAN_STAGES = {'COLLSCAN', 'scan'}
+_CHILD_KEYS = ('inputStage', 'inputStages', 'innerStage', 'outerStage', 'thenStage', 'elseStage')
+
+
+def normalize_explain(raw: Dict[str, Any], collection: str) -> List[Dict[str, Any]]:
+    """Returns [{"Plan": root, "Execution Time": ms, "Summary": {...}}] for a find or aggregate explain."""
+    summary = {"nReturned": 0, "docsExamined": 0, "keysExamined": 0, "indexesUsed": [], "collectionScan": False}
+
+    if "shards" in raw and isinstance(raw["shards"], dict):
+        # Sharded aggregate: one full explain per shard, merged on mongos
+        children = []
+        for shard, shard_raw in raw["shards"].items():
+            shard_plan = normalize_explain(shard_raw, collection)[0]
+            children.append({**shard_plan["Plan"], "Shard": shard})
+            _merge_summary(summary, shard_plan["Summary"])
+        root = {"Node Type": "SHARD_MERGE", "Relation Name": collection, "Plans": children,
+                "Actual Rows": summary["nReturned"]}
+        return [{"Plan": root, "Execution Time": None, "Summary": _finish(summary)}]
+
+    if "stages" in raw:
+        root, elapsed = _pipeline_tree(raw["stages"], collection, summary)
+    else:
+        stats = raw.get("executionStats", {})
+        root = _stage_tree(stats.get("executionStages", {}), collection, summary)
+        _add_stats(summary, stats, raw.get("queryPlanner", {}))
+        elapsed = stats.get("executionTimeMillis")
+    return [{"Plan": root, "Execution Time": elapsed, "Summary": _finish(summary)}]
+
+
+# --- Private Helpers ---
+
+def _pipeline_tree(stages: List[Dict[str, Any]], collection: str, summary: Dict[str, Any]):
+    """Chains aggregation stages so the last stage is the root and $cursor the leaf."""
+    node: Optional[Dict[str, Any]] = None
+    elapsed = None
+    for stage in stages:
+        name = next((k for k in stage if k.startswith('$')), 'stage')
+        if name == '$cursor':
+            cursor = stage['$cursor']
+            stats = cursor.get("executionStats", {})
+            node = _stage_tree(stats.get("executionStages", {}), collection, summary)
+            _add_stats(summary, stats, cursor.get("queryPlanner", {}))
+            elapsed = stats.get("executionTimeMillis")
+            continue
+        current = {"Node Type": name, "Actual Rows": stage.get("nReturned"),
+                   "Actual Total Time": stage.get("executionTimeMillisEstimate")}
+        if node is not None:
+            current["Plans"] = [node]
+        node = current
+        if stage.get("nReturned") is not None:
+            summary["nReturned"] = stage["nReturned"]
+        if stage.get("executionTimeMillisEstimate") is not None:
+            elapsed = max(elapsed or 0, stage["executionTimeMillisEstimate"])
+    return node or {"Node Type": "EOF"}, elapsed
+
+
+def _stage_tree(stage: Dict[str, Any], collection: str, summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts one executionStages node and its inputs."""
+    name = stage.get("stage", "UNKNOWN")
+    node: Dict[str, Any] = {
+        "Node Type": name,
+        "Actual Rows": stage.get("nReturned"),
+        "Actual Total Time": stage.get("executionTimeMillisEstimate"),
+    }
+    if name in _SCAN_STAGES:
+        node["Relation Name"] = collection
+    if name in _COLLSCAN_STAGES:
+        node["Collection Scan"] = True
+        summary["collectionScan"] = True
+    for key, label in (("docsExamined", "Docs Examined"), ("keysExamined", "Keys Examined"),
+                       ("indexName", "Index Name"), ("keyPattern", "Index Key"), ("filter", "Filter")):
+        if key in stage:
+            node[label] = stage[key]
+    if stage.get("indexName") and stage["indexName"] not in summary["indexesUsed"]:
+        summary["indexesUsed"].append(stage["indexName"])
+
+    children = []
+    for key in _CHILD_KEYS:
+        value = stage.get(key)
+        for child in (value if isinstance(value, list) else [value] if value else []):
+            children.append(_stage_tree(child, collection, summary))
+    # Sharded find: SHARD_MERGE lists per-shard execution trees
+    for shard in stage.get("shards", []):
+        child = _stage_tree(shard.get("executionStages", {}), collection, summary)
+        children.append({**child, "Shard": shard.get("shardName")})
+    if children:
+        node["Plans"] = children
+    return node
+
+
+def _add_stats(summary: Dict[str, Any], stats: Dict[str, Any], planner: Dict[str, Any]):
+    summary["nReturned"] += stats.get("nReturned", 0)
+    summary["docsExamined"] += stats.get("totalDocsExamined", 0)
+    summary["keysExamined"] += stats.get("totalKeysExamined", 0)
+    # SBE reports its own stage names; the winning plan keeps the classic shape
+    winning = planner.get("winningPlan", {})
+    _scan_winning_plan(winning.get("queryPlan", winning), summary)
+
+
+def _scan_winning_plan(stage: Dict[str, Any], summary: Dict[str, Any]):
+    if not isinstance(stage, dict):
+        return
+    if stage.get("stage") == 'COLLSCAN':
+        summary["collectionScan"] = True
+    if stage.get("indexName") and stage["indexName"] not in summary["indexesUsed"]:
+        summary["indexesUsed"].append(stage["indexName"])
+    for key in _CHILD_KEYS:
+        value = stage.get(key)
+        for child in (value if isinstance(value, list) else [value] if value else []):
+            _scan_winning_plan(child, summary)
+    for shard in stage.get("shards", []):
+        _scan_winning_plan(shard.get("winningPlan", {}), summary)
+
+
+def _merge_summary(target: Dict[str, Any], other: Dict[str, Any]):
+    for key in ("nReturned", "docsExamined", "keysExamined"):
+        target[key] += other.get(key, 0)
+    target["collectionScan"] = target["collectionScan"] or other.get("collectionScan", False)
+    target["indexesUsed"] += [i for i in other.get("indexesUsed", []) if i not in target["indexesUsed"]]
+
+
+def _finish(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Adds the examined-to-returned ratio; high values mean the filter is not index-backed."""
+    returned = summary["nReturned"]
+    summary["examinedPerReturned"] = round(summary["docsExamined"] / returned, 2) if returned else None
+    return summary
@@ -6,7 +6,7 @@ Specialized executor for Redis commands.
 
 import shlex
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from models.metadata import SessionLocal
 
 logger = logging.getLogger(__name__)
@@ -17,15 +17,19 @@ class RedisExecutor:
     def __init__(self, service):
         self.service = service
 
-    def execute(self, db_id: str, command_str: str, limit: int) -> Tuple[List[Dict[str, Any]], List[str]]:
-        """Parses and executes a Redis command, returning results in a table-compatible format."""
+    def execute(self, db_id: str, command_str: str, limit: int, schema: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Parses and executes a Redis command, returning results in a table-compatible format.
+        `schema` is the logical database index chosen in the schema selector (default DB if unset).
+        """
         session = SessionLocal()
         try:
             db_type, config = self.service.get_db_config(db_id, session)
             if db_type != 'redis':
                 raise ValueError(f"Expected redis type, got {db_type}")
                 
-            client, _ = self.service.get_redis_client(db_id, session)
+            db_index = int(schema) if schema is not None and str(schema).isdigit() else None
+            client, _ = self.service.get_redis_client(db_id, session, db_index)
             if not client:
                 raise Exception("Failed to connect to Redis cluster")
             
@@ -38,17 +42,23 @@ class RedisExecutor:
             if not parts:
                 raise Exception("Empty Redis command")
             
-            cmd, args = self._translate_command(parts, client)
+            cmd, args = self._translate_command(parts)
+            if cmd == 'select':
+                # Pooled connections are bound to one logical DB; SELECT would leak into later requests
+                raise ValueError("SELECT is not supported here; choose the Redis database from the schema selector")
             
             # Run the command and process result
-            result = client.execute_command(cmd, *args)
+            if cmd == 'get' and len(args) == 1:
+                result = self._get_any(client, args[0])
+            else:
+                result = client.execute_command(cmd, *args)
             return self._process_result(result, limit)
         finally:
             session.close()
 
     # --- Private Helpers ---
 
-    def _translate_command(self, parts: List[str], client) -> Tuple[str, List[str]]:
+    def _translate_command(self, parts: List[str]) -> Tuple[str, List[str]]:
         """Translates basic SQL-like syntax (SELECT ...) into Redis equivalent commands."""
         cmd = parts[0].lower()
         args = parts[1:]
@@ -57,21 +67,27 @@ class RedisExecutor:
         if cmd == 'select' and len(parts) >= 4 and parts[2].lower() == 'from':
             cmd = 'get'
             args = [parts[3].replace('"', '').replace("'", "")]
-            
-        # Detect key type and fallback to appropriate accessor
-        if cmd == 'get' and len(args) == 1:
-            key = args[0]
-            try:
-                k_type = client.type(key)
-                if k_type == 'hash': return 'hgetall', [key]
-                if k_type == 'list': return 'lrange', [key, '0', '99']
-                if k_type == 'set': return 'smembers', [key]
-                if k_type == 'zset': return 'zrange', [key, '0', '99', 'withscores']
-            except Exception:
-                pass
         
         return cmd, args
 
+    def _get_any(self, client, key: str):
+        """
+        Reads a key of any type. TYPE and GET share one pipelined round-trip, so strings
+        cost a single RTT; other types follow up with their own accessor.
+        """
+        pipe = client.pipeline(transaction=False)
+        pipe.type(key)
+        pipe.get(key)
+        k_type, value = pipe.execute(raise_on_error=False)
+
+        if k_type == 'hash': return client.hgetall(key)
+        if k_type == 'list': return client.lrange(key, 0, 99)
+        if k_type == 'set': return client.smembers(key)
+        if k_type == 'zset': return client.zrange(key, 0, 99, withscores=True)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
     def _process_result(self, result, limit: int) -> Tuple[List[Dict[str, Any]], List[str]]:
         """Formats the Redis command result (list, dict, or scalar) for tabular display."""
         processed, columns = [], ["result"]
@@ -5,12 +5,31 @@ Specialized executor for relational SQL queries using SQLAlchemy.
 """
 
 import re
+import uuid
+import decimal
+import datetime
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator
 from sqlalchemy import text
 
 logger = logging.getLogger(__name__)
 
+# ─── Configuration ────────────────────────────────────────────────────────────
+STREAM_FETCH_SIZE = 1000          # Rows fetched per server-side cursor round-trip
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def serialize_value(val: Any) -> Any:
+    """Converts driver values that JSON cannot represent (dates, decimals, UUIDs)."""
+    if isinstance(val, (datetime.datetime, datetime.date)):
+        return val.isoformat()
+    elif isinstance(val, decimal.Decimal):
+        return float(val)
+    elif isinstance(val, uuid.UUID):
+        return str(val)
+    return val
+
+
 class SqlExecutor:
     """Handles execution of SQL queries across diverse relational dialects via SQLAlchemy."""
 
@@ -36,25 +55,38 @@ class SqlExecutor:
             # Format rows and keys for the response
             if result.returns_rows:
                 keys = list(result.keys())
-                import datetime
-                import decimal
-                import uuid
-                
-                def serialize_val(val):
-                    if isinstance(val, (datetime.datetime, datetime.date)):
-                        return val.isoformat()
-                    elif isinstance(val, decimal.Decimal):
-                        return float(val)
-                    elif isinstance(val, uuid.UUID):
-                        return str(val)
-                    return val
-                    
-                data = [{k: serialize_val(v) for k, v in zip(keys, row)} for row in result]
+                data = [{k: serialize_value(v) for k, v in zip(keys, row)} for row in result]
                 return data, keys
             return [], []
                 
         return self.service.run_dynamic_query(db_id, _op)
 
+    def stream(self, db_id: str, sql: str, limit: int, auto_commit: bool) -> Iterator[Any]:
+        """
+        Yields the column list, then rows one at a time from a server-side cursor.
+        The connection stays checked out until the consumer finishes or closes the generator.
+        """
+        engine = self.service.get_engine(db_id)
+        with engine.connect() as conn:
+            dialect = conn.engine.dialect.name
+            final_sql = self._prepare_sql(sql.strip(), limit, dialect)
+
+            exec_conn = conn.execution_options(stream_results=True, yield_per=STREAM_FETCH_SIZE)
+            if auto_commit and dialect not in ['clickhouse', 'clickhousedb', 'duckdb']:
+                exec_conn = exec_conn.execution_options(isolation_level="AUTOCOMMIT")
+            if dialect == 'postgresql':
+                exec_conn.execute(text("SET statement_timeout = '30s'"))
+
+            result = exec_conn.execute(text(final_sql))
+            if not result.returns_rows:
+                yield []
+                return
+
+            keys = list(result.keys())
+            yield keys
+            for row in result:
+                yield {k: serialize_value(v) for k, v in zip(keys, row)}
+
     # --- Private Helpers ---
 
     def _prepare_sql(self, sql: str, limit: int, dialect: str) -> str:
@@ -0,0 +1,499 @@
+"""
+sql_to_mql.py
+
+Translates the SELECT subset of SQL into MongoDB queries so SQL typed against a
+Mongo connection is answered with filters and projections the server can serve
+from indexes, instead of scanning the collection.
+
+Supported: column lists (dotted paths, aliases), WHERE with AND/OR/NOT, comparisons,
+IN, BETWEEN, LIKE, IS [NOT] NULL; GROUP BY with COUNT/SUM/AVG/MIN/MAX; HAVING and
+ORDER BY on columns or aggregates; LIMIT/OFFSET. Plain selects become find(filter, projection,
+options); grouped selects become aggregation pipelines with $match first.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<string>'(?:[^']|'')*')
+      | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`)
+      | (?P<op><>|!=|<=|>=|=|<|>|\(|\)|,|\*|\.)
+      | (?P<word>[A-Za-z_$][\w$]*)
+    )""", re.VERBOSE)
+
+# Unquoted collection names after FROM may contain hyphens (e.g. my-coll), as Mongo allows
+_COLLECTION_RE = re.compile(r"\s*(?P<word>[\w$][\w$-]*)")
+
+_KEYWORDS = {
+    'SELECT', 'DISTINCT', 'FROM', 'WHERE', 'GROUP', 'BY', 'HAVING', 'ORDER', 'ASC', 'DESC', 'LIMIT',
+    'OFFSET', 'AND', 'OR', 'NOT', 'IN', 'IS', 'NULL', 'LIKE', 'BETWEEN', 'AS', 'TRUE', 'FALSE',
+}
+_AGGREGATES = {'COUNT': '$sum', 'SUM': '$sum', 'AVG': '$avg', 'MIN': '$min', 'MAX': '$max'}
+_COMPARISONS = {'=': '$eq', '!=': '$ne', '<>': '$ne', '<': '$lt', '<=': '$lte', '>': '$gt', '>=': '$gte'}
+_NEGATED = {'$eq': '$ne', '$ne': '$eq', '$lt': '$gte', '$lte': '$gt', '$gt': '$lte', '$gte': '$lt', '$in': '$nin', '$nin': '$in'}
+
+
+class SqlTranslationError(ValueError):
+    """Raised when a statement falls outside the translatable SQL subset."""
+
+
+@dataclass
+class MqlQuery:
+    """A translated statement: either find arguments or an aggregation pipeline."""
+    collection: str
+    operation: str                                   # 'find' or 'aggregate'
+    filter: Dict[str, Any] = field(default_factory=dict)
+    projection: Optional[Dict[str, Any]] = None
+    sort: Optional[Dict[str, int]] = None
+    skip: int = 0
+    limit: Optional[int] = None
+    pipeline: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_args(self) -> List[Any]:
+        """Arguments in mongosh order: find(filter, projection, options) or aggregate(pipeline)."""
+        if self.operation == 'aggregate':
+            return [self.pipeline]
+        options: Dict[str, Any] = {}
+        if self.sort:
+            options['sort'] = self.sort
+        if self.skip:
+            options['skip'] = self.skip
+        if self.limit is not None:
+            options['limit'] = self.limit
+        return [self.filter, self.projection or {}, options]
+
+
+def translate(sql: str) -> MqlQuery:
+    """Translates one SELECT statement; raises SqlTranslationError on anything else."""
+    return _Parser(sql).parse()
+
+
+@dataclass
+class _Column:
+    path: Optional[str]                 # None for COUNT(*)
+    alias: str
+    aggregate: Optional[str] = None     # Upper-case SQL function name
+
+
+class _Parser:
+    """Recursive-descent parser producing MqlQuery objects directly."""
+
+    def __init__(self, sql: str):
+        self.sql = sql.strip().rstrip(';')
+        self.tokens = self._tokenize(self.sql)
+        self.pos = 0
+
+    # --- Statement ---
+
+    def parse(self) -> MqlQuery:
+        self._expect_word('SELECT')
+        distinct = self._accept_word('DISTINCT')
+        columns = self._select_list()
+        self._expect_word('FROM')
+        collection = self._identifier()
+
+        where = self._condition() if self._accept_word('WHERE') else {}
+        group_by: List[str] = []
+        if self._accept_word('GROUP'):
+            self._expect_word('BY')
+            group_by = self._identifier_list()
+        having = None
+        if self._accept_word('HAVING'):
+            having = self._having_condition(columns)
+        order: Dict[str, int] = {}
+        order_extra: List[_Column] = []
+        if self._accept_word('ORDER'):
+            self._expect_word('BY')
+            order = self._order_list(columns, order_extra)
+        limit, skip = self._limit_offset()
+        if self.pos < len(self.tokens):
+            raise SqlTranslationError(f"Unsupported SQL near '{self.tokens[self.pos][1]}'")
+
+        aggregated = any(c.aggregate for c in columns) or bool(order_extra)
+        if distinct and not group_by and not aggregated:
+            group_by = [c.path for c in columns if c.path]
+            if not group_by:
+                raise SqlTranslationError("SELECT DISTINCT * is not supported")
+        if group_by or aggregated or having:
+            pipeline = self._pipeline(where, columns, group_by, having, order, order_extra, skip, limit)
+            return MqlQuery(collection, 'aggregate', filter=where, pipeline=pipeline)
+
+        projection = None
+        if columns:
+            # An aliased column is a computed projection ({alias: "$path"}, MongoDB 4.4+)
+            projection = {c.alias: 1 if c.alias == c.path else f"${c.path}" for c in columns}
+            if '_id' not in projection:
+                projection['_id'] = 0
+            # find sorts before it projects, so ORDER BY aliases map back to their paths
+            paths = {c.alias: c.path for c in columns}
+            order = {paths.get(key, key): direction for key, direction in order.items()}
+        return MqlQuery(collection, 'find', filter=where, projection=projection, sort=order or None, skip=skip, limit=limit)
+
+    def _pipeline(self, where, columns, group_by, having, order, order_extra, skip, limit) -> List[Dict[str, Any]]:
+        """$match -> $group -> $project -> $match(HAVING) -> $sort -> $unset -> $skip -> $limit."""
+        for col in columns:
+            if not col.aggregate and col.path not in group_by:
+                raise SqlTranslationError(f"Column '{col.path}' must appear in GROUP BY or be aggregated")
+
+        pipeline: List[Dict[str, Any]] = []
+        if where:
+            pipeline.append({"$match": where})
+        keys = {self._key_name(path): f"${path}" for path in group_by}
+        group: Dict[str, Any] = {"_id": keys or None}
+        project: Dict[str, Any] = {"_id": 0}
+        for path in group_by:
+            project[self._output_name(path, columns)] = f"$_id.{self._key_name(path)}"
+        # Aggregates only HAVING / ORDER BY refer to are computed, used, then dropped
+        hidden = (having or {}).get('columns', []) + order_extra
+        for col in [c for c in columns if c.aggregate] + hidden:
+            if col.alias in group:
+                continue
+            group[col.alias] = self._accumulator(col)
+            project[col.alias] = 1
+        pipeline.append({"$group": group})
+        pipeline.append({"$project": project})
+        if having:
+            pipeline.append({"$match": having['filter']})
+        if order:
+            pipeline.append({"$sort": {self._output_name(k, columns): v for k, v in order.items()}})
+        selected = {c.alias for c in columns}
+        unset = list(dict.fromkeys(col.alias for col in hidden if col.alias not in selected))
+        if unset:
+            pipeline.append({"$unset": unset})
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit is not None:
+            pipeline.append({"$limit": limit})
+        return pipeline
+
+    # --- Clauses ---
+
+    def _select_list(self) -> List[_Column]:
+        if self._accept_op('*'):
+            return []
+        columns = [self._select_item()]
+        while self._accept_op(','):
+            columns.append(self._select_item())
+        return columns
+
+    def _select_item(self) -> _Column:
+        kind, value = self._peek()
+        if kind == 'word' and value.upper() in _AGGREGATES and self._peek(1) == ('op', '('):
+            col = self._aggregate_call()
+        else:
+            path = self._identifier()
+            col = _Column(path=path, alias=path)
+        if self._accept_word('AS'):
+            col.alias = self._identifier()
+        elif self._peek()[0] in ('word', 'quoted') and self._peek()[1].upper() not in _KEYWORDS:
+            col.alias = self._identifier()
+        return col
+
+    def _aggregate_call(self) -> _Column:
+        func = self._next()[1].upper()
+        self._expect_op('(')
+        if self._accept_op('*'):
+            if func != 'COUNT':
+                raise SqlTranslationError(f"{func}(*) is not supported")
+            path = None
+        else:
+            if self._accept_word('DISTINCT'):
+                raise SqlTranslationError("Aggregates over DISTINCT values are not supported")
+            path = self._identifier()
+        self._expect_op(')')
+        alias = f"{func.lower()}_{path.replace('.', '_')}" if path else 'count'
+        return _Column(path=path, alias=alias, aggregate=func)
+
+    def _order_list(self, columns: List[_Column], extra: List[_Column]) -> Dict[str, int]:
+        """ORDER BY keys; aggregate calls resolve to their output names (unseen ones land in `extra`)."""
+        saved = self._aggregate_refs
+        self._aggregate_refs = (columns, extra)
+        try:
+            return self._order_keys()
+        finally:
+            self._aggregate_refs = saved
+
+    def _order_keys(self) -> Dict[str, int]:
+        order = {}
+        while True:
+            path = self._operand_path()
+            direction = -1 if self._accept_word('DESC') else 1
+            if direction == 1:
+                self._accept_word('ASC')
+            order[path] = direction
+            if not self._accept_op(','):
+                return order
+
+    def _limit_offset(self) -> Tuple[Optional[int], int]:
+        limit, skip = None, 0
+        for _ in range(2):
+            if self._accept_word('LIMIT'):
+                limit = self._integer()
+                if self._accept_op(','):  # MySQL LIMIT offset, count
+                    skip, limit = limit, self._integer()
+            elif self._accept_word('OFFSET'):
+                skip = self._integer()
+        return limit, skip
+
+    def _having_condition(self, columns: List[_Column]) -> Dict[str, Any]:
+        """HAVING filters on aggregate outputs; unseen aggregates are computed then dropped."""
+        extra: List[_Column] = []
+        saved = self._aggregate_refs
+        self._aggregate_refs = (columns, extra)
+        try:
+            condition = self._condition()
+        finally:
+            self._aggregate_refs = saved
+        return {"filter": condition, "columns": extra}
+
+    _aggregate_refs: Optional[Tuple[List[_Column], List[_Column]]] = None
+
+    # --- Conditions ---
+
+    def _condition(self) -> Dict[str, Any]:
+        terms = [self._and_condition()]
+        while self._accept_word('OR'):
+            terms.append(self._and_condition())
+        return terms[0] if len(terms) == 1 else {"$or": terms}
+
+    def _and_condition(self) -> Dict[str, Any]:
+        terms = [self._not_condition()]
+        while self._accept_word('AND'):
+            terms.append(self._not_condition())
+        return terms[0] if len(terms) == 1 else self._merge_and(terms)
+
+    def _not_condition(self) -> Dict[str, Any]:
+        if self._accept_word('NOT'):
+            return self._negate(self._not_condition())
+        if self._accept_op('('):
+            inner = self._condition()
+            self._expect_op(')')
+            return inner
+        return self._predicate()
+
+    def _predicate(self) -> Dict[str, Any]:
+        path = self._operand_path()
+        negate = self._accept_word('NOT')
+
+        if self._accept_word('IS'):
+            is_not = self._accept_word('NOT')
+            self._expect_word('NULL')
+            return {path: {"$ne": None} if is_not else None}
+        if self._accept_word('IN'):
+            self._expect_op('(')
+            values = [self._literal()]
+            while self._accept_op(','):
+                values.append(self._literal())
+            self._expect_op(')')
+            return {path: {"$nin" if negate else "$in": values}}
+        if self._accept_word('BETWEEN'):
+            low = self._literal()
+            self._expect_word('AND')
+            high = self._literal()
+            if negate:
+                return {"$or": [{path: {"$lt": low}}, {path: {"$gt": high}}]}
+            return {path: {"$gte": low, "$lte": high}}
+        if self._accept_word('LIKE'):
+            pattern = self._literal()
+            if not isinstance(pattern, str):
+                raise SqlTranslationError("LIKE needs a string pattern")
+            regex = {"$regex": self._like_to_regex(pattern)}
+            return {path: {"$not": regex} if negate else regex}
+        if negate:
+            raise SqlTranslationError("NOT must precede IN, BETWEEN or LIKE here")
+
+        kind, op = self._next()
+        if kind != 'op' or op not in _COMPARISONS:
+            raise SqlTranslationError(f"Expected a comparison operator, got '{op}'")
+        if self._peek()[0] in ('word', 'quoted') and self._peek()[1].upper() not in ('TRUE', 'FALSE', 'NULL'):
+            # Column-to-column comparison needs $expr, which cannot use an index but is still correct
+            other = self._identifier()
+            return {"$expr": {_COMPARISONS[op]: [f"${path}", f"${other}"]}}
+        value = self._literal()
+        if _COMPARISONS[op] == '$eq':
+            return {path: value}
+        return {path: {_COMPARISONS[op]: value}}
+
+    def _operand_path(self) -> str:
+        """A field path, or inside HAVING an aggregate call resolved to its output name."""
+        if self._aggregate_refs and self._is_aggregate_ahead():
+            call = self._aggregate_call()
+            columns, extra = self._aggregate_refs
+            for col in columns + extra:
+                if col.aggregate == call.aggregate and col.path == call.path:
+                    return col.alias
+            extra.append(call)
+            return call.alias
+        return self._identifier()
+
+    def _is_aggregate_ahead(self) -> bool:
+        kind, value = self._peek()
+        return kind == 'word' and value.upper() in _AGGREGATES and self._peek(1) == ('op', '(')
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _merge_and(terms: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Folds AND terms into one filter document, keeping $and only for key collisions."""
+        merged: Dict[str, Any] = {}
+        for term in terms:
+            for key, value in term.items():
+                if key in merged:
+                    if isinstance(merged[key], dict) and isinstance(value, dict) and not set(merged[key]) & set(value) \
+                            and all(k.startswith('$') for k in list(merged[key]) + list(value)):
+                        merged[key] = {**merged[key], **value}
+                    else:
+                        return {"$and": terms}
+                else:
+                    merged[key] = value
+        return merged
+
+    @staticmethod
+    def _negate(condition: Dict[str, Any]) -> Dict[str, Any]:
+        if list(condition) == ["$or"]:
+            return {"$nor": condition["$or"]}
+        if len(condition) == 1:
+            key, value = next(iter(condition.items()))
+            if not key.startswith('$'):
+                if isinstance(value, dict) and len(value) == 1:
+                    op, operand = next(iter(value.items()))
+                    if op in _NEGATED:
+                        return {key: {_NEGATED[op]: operand}}
+                    if op == '$not':
+                        return {key: operand}
+                    return {key: {"$not": value}}
+                if not isinstance(value, dict):
+                    return {key: {"$ne": value}}
+        return {"$nor": [condition]}
+
+    @staticmethod
+    def _like_to_regex(pattern: str) -> str:
+        out = []
+        for ch in pattern:
+            if ch == '%':
+                out.append('.*')
+            elif ch == '_':
+                out.append('.')
+            else:
+                out.append(re.escape(ch))
+        regex = ''.join(out)
+        # Anchor both ends like SQL; a leading literal keeps the regex index-friendly
+        regex = '^' + regex if not regex.startswith('.*') else regex[2:]
+        regex = regex + '$' if not regex.endswith('.*') else regex[:-2]
+        return regex
+
+    @staticmethod
+    def _key_name(path: str) -> str:
+        return path.replace('.', '_')
+
+    @staticmethod
+    def _output_name(path: str, columns: List[_Column]) -> str:
+        for col in columns:
+            if path in (col.path, col.alias) and (col.aggregate is None or path == col.alias):
+                return col.alias
+        return path.replace('.', '_') if '.' in path else path
+
+    @staticmethod
+    def _accumulator(col: _Column) -> Dict[str, Any]:
+        if col.aggregate == 'COUNT':
+            if col.path is None:
+                return {"$sum": 1}
+            # COUNT(col) ignores NULL and missing values
+            return {"$sum": {"$cond": [{"$gt": [f"${col.path}", None]}, 1, 0]}}
+        return {_AGGREGATES[col.aggregate]: f"${col.path}"}
+
+    def _identifier(self) -> str:
+        kind, value = self._next()
+        if kind == 'quoted':
+            part = value[1:-1].replace('""', '"')
+        elif kind == 'word' and value.upper() not in _KEYWORDS:
+            part = value
+        else:
+            raise SqlTranslationError(f"Expected an identifier, got '{value}'")
+        # Dotted paths address nested fields (or db.collection in FROM)
+        if self._peek() == ('op', '.'):
+            self._next()
+            return f"{part}.{self._identifier()}"
+        return part
+
+    def _identifier_list(self) -> List[str]:
+        items = [self._identifier()]
+        while self._accept_op(','):
+            items.append(self._identifier())
+        return items
+
+    def _literal(self) -> Any:
+        kind, value = self._next()
+        if kind == 'number':
+            return float(value) if any(c in value for c in '.eE') else int(value)
+        if kind == 'string':
+            return value[1:-1].replace("''", "'")
+        if kind == 'word':
+            upper = value.upper()
+            if upper == 'TRUE': return True
+            if upper == 'FALSE': return False
+            if upper == 'NULL': return None
+        raise SqlTranslationError(f"Expected a literal value, got '{value}'")
+
+    def _integer(self) -> int:
+        value = self._literal()
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise SqlTranslationError("LIMIT and OFFSET need non-negative integers")
+        return value
+
+    def _tokenize(self, sql: str) -> List[Tuple[str, str]]:
+        tokens, pos = [], 0
+        target = None  # Position in the FROM target: 'name' (a name part is next) or 'after' (one just ended)
+        while pos < len(sql):
+            if sql[pos:].strip() == '':
+                break
+            # Hyphens belong to unquoted name parts of the FROM target
+            match = (target == 'name' and _COLLECTION_RE.match(sql, pos)) or _TOKEN_RE.match(sql, pos)
+            if not match or match.end() == pos:
+                raise SqlTranslationError(f"Unexpected character near '{sql[pos:pos + 10].strip()}'")
+            kind = match.lastgroup
+            value = match.group(kind)
+            tokens.append((kind, value))
+            pos = match.end()
+            if target == 'name':
+                target = 'after'
+            elif target == 'after' and (kind, value) == ('op', '.'):
+                target = 'name'
+            else:
+                target = 'name' if kind == 'word' and value.upper() == 'FROM' else None
+        return tokens
+
+    def _peek(self, offset: int = 0) -> Tuple[str, str]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else ('eof', '')
+
+    def _next(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token[0] == 'eof':
+            raise SqlTranslationError("Unexpected end of statement")
+        self.pos += 1
+        return token
+
+    def _accept_word(self, word: str) -> bool:
+        kind, value = self._peek()
+        if kind == 'word' and value.upper() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect_word(self, word: str):
+        if not self._accept_word(word):
+            raise SqlTranslationError(f"Expected {word} near '{self._peek()[1]}'")
+
+    def _accept_op(self, op: str) -> bool:
+        if self._peek() == ('op', op):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect_op(self, op: str):
+        if not self._accept_op(op):
+            raise SqlTranslationError(f"Expected '{op}' near '{self._peek()[1]}'")
@@ -0,0 +1,69 @@
+"""
+lexical_ranker.py
+
+BM25 ranking of tables by their names and column names. Used by schema retrieval
+while embeddings are still being built, so the first AI request on a database gets
+a focused table list immediately instead of waiting for the whole schema to embed.
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+BM25_K1 = 1.2                     # Term-frequency saturation
+BM25_B = 0.75                     # Length normalization
+TABLE_NAME_WEIGHT = 3             # Table-name tokens count as this many column mentions
+# ─────────────────────────────────────────────────────────────────────────────
+
+_CAMEL_RE = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_WORD_RE = re.compile(r'[A-Za-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits identifiers and prose alike: snake_case, camelCase and dotted names become words."""
+    tokens = []
+    for word in _WORD_RE.findall(_CAMEL_RE.sub(' ', text or '')):
+        word = word.lower()
+        # Cheap plural folding so "customers" matches "customer_id"
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def table_terms(table: str, columns: Iterable[Dict]) -> List[str]:
+    """Bag of terms for a table: its name (weighted) plus every column name."""
+    name_tokens = tokenize(table.split('.')[-1])
+    terms = name_tokens * TABLE_NAME_WEIGHT
+    for col in columns:
+        terms.extend(tokenize(col.get('name', '')))
+    return terms
+
+
+def bm25_rank(query: str, documents: Dict[str, List[str]], top_k: int) -> List[Tuple[str, float]]:
+    """Scores each document's term list against the query; zero-score documents are omitted."""
+    query_terms = set(tokenize(query))
+    if not query_terms or not documents:
+        return []
+
+    doc_count = len(documents)
+    avg_len = sum(len(terms) for terms in documents.values()) / doc_count or 1.0
+    frequencies = {name: Counter(terms) for name, terms in documents.items()}
+    doc_freq = Counter(term for tf in frequencies.values() for term in query_terms if term in tf)
+
+    scored = []
+    for name, tf in frequencies.items():
+        length = len(documents[name])
+        score = 0.0
+        for term in query_terms:
+            f = tf.get(term)
+            if not f:
+                continue
+            idf = math.log(1 + (doc_count - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * f * (BM25_K1 + 1) / (f + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+        if score > 0:
+            scored.append((name, score))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:top_k]
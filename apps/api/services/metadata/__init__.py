@@ -14,6 +14,7 @@ from models.metadata import SessionLocal
 from services.metadata.sql_provider import SqlMetadataProvider
 from services.metadata.mongo_provider import MongoMetadataProvider
 from services.metadata.redis_provider import RedisMetadataProvider
+from services.metadata.cache import metadata_cache, cached_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,7 @@ class MetadataService(BaseDatabaseService):
         self.mongo_provider = MongoMetadataProvider(self)
         self.redis_provider = RedisMetadataProvider(self)
 
+    @cached_metadata('schemas')
     def get_schemas(self, database_id: str) -> List[str]:
         """Lists all schemas or databases in the target database cluster."""
         session = SessionLocal()
@@ -46,6 +48,7 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    @cached_metadata('tables')
     def get_tables(self, database_id: str, schema: str = 'public') -> List[str]:
         """Lists all table or collection names within a specific schema or database."""
         session = SessionLocal()
@@ -63,6 +66,7 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    @cached_metadata('views')
     def get_views(self, database_id: str, schema: str = 'public') -> List[str]:
         """Lists all defined views within a given schema."""
         session = SessionLocal()
@@ -80,6 +84,7 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    @cached_metadata('table_columns')
     def get_columns(self, database_id: str, schema: str, table: str) -> List[Dict[str, Any]]:
         """Retrieves or infers column details for a specific table or collection."""
         session = SessionLocal()
@@ -97,18 +102,15 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    @cached_metadata('columns')
     def get_all_columns(self, database_id: str, schema: str) -> Dict[str, List[Dict[str, Any]]]:
         """Retrieves columns for all tables and views in a schema, optimized for performance."""
         session = SessionLocal()
+        db_type = None
         try:
             db_type, _ = self.get_db_config(database_id, session)
             if db_type == 'mongodb':
-                tables = self.mongo_provider.get_tables(database_id, schema, session)
-                views = self.mongo_provider.get_views(database_id, schema, session)
-                result = {}
-                for obj in (tables + views):
-                    result[obj] = self.mongo_provider.get_columns(database_id, schema, obj, session)
-                return result
+                return self.mongo_provider.get_all_columns(database_id, schema, session)
             if db_type == 'redis':
                 return {}
             
@@ -116,6 +118,15 @@ class MetadataService(BaseDatabaseService):
             return self.sql_provider.get_all_columns(database_id, schema)
         except Exception as e:
             logger.error(f"Error fetching all columns for {database_id}: {e}")
+            if db_type and db_type not in ['mongodb', 'redis']:
+                # Reflect per table concurrently on one engine instead of a serial walk
+                logger.info("Falling back to parallel per-table column reflection...")
+                try:
+                    return self.sql_provider.get_all_columns_parallel(database_id, schema)
+                except Exception as fallback_err:
+                    # A serial walk after this would only repeat the slow path; empty results are not cached
+                    logger.error(f"Parallel column fallback failed for {database_id}: {fallback_err}")
+                    return {}
             # Fallback to individual fetches if optimized one fails
             logger.info("Falling back to separate column fetches...")
             tables = self.get_tables(database_id, schema)
@@ -177,6 +188,84 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    def get_collection_schema(self, database_id: str, schema: str, table: str, sample_size: Optional[int] = None) -> Dict[str, Any]:
+        """Profiles a MongoDB collection: nested field paths, type histograms and presence ratios."""
+        session = SessionLocal()
+        try:
+            db_type, _ = self.get_db_config(database_id, session)
+            if db_type != 'mongodb':
+                raise ValueError("Schema profiling is only available for MongoDB connections")
+            return self.mongo_provider.get_collection_schema(database_id, schema, table, session, sample_size)
+        finally:
+            if session:
+                session.close()
+
+    def get_table_stats(self, database_id: str, schema: str = 'public', exact: bool = False) -> List[Dict[str, Any]]:
+        """Retrieves row counts and sizes for every table (or Mongo collection) of a schema in one query."""
+        session = SessionLocal()
+        try:
+            db_type, _ = self.get_db_config(database_id, session)
+            if db_type == 'mongodb':
+                # $collStats counts come from collection metadata; there is no cheaper exact mode
+                return self.mongo_provider.get_collection_stats(database_id, schema, session)
+            if db_type == 'redis':
+                return []
+            return self.sql_provider.get_table_stats(database_id, schema, exact)
+        except Exception as e:
+            logger.error(f"Error fetching table stats for {schema}: {e}")
+            return []
+        finally:
+            if session:
+                session.close()
+
+    def browse_keys(self, database_id: str, schema: str, **options) -> Dict[str, Any]:
+        """Returns one cursor page of a Redis keyspace, grouped by namespace prefix."""
+        session = SessionLocal()
+        try:
+            db_type, _ = self.get_db_config(database_id, session)
+            if db_type != 'redis':
+                raise ValueError("Key browsing is only available for Redis connections")
+            return self.redis_provider.browse_keys(database_id, schema, session, **options)
+        finally:
+            if session:
+                session.close()
+
+    def inspect_keys(self, database_id: str, schema: str, keys: List[str]) -> List[Dict[str, Any]]:
+        """Returns type, TTL, size and memory details for many Redis keys in one round-trip."""
+        session = SessionLocal()
+        try:
+            db_type, _ = self.get_db_config(database_id, session)
+            if db_type != 'redis':
+                raise ValueError("Key inspection is only available for Redis connections")
+            return self.redis_provider.inspect_keys(database_id, schema, keys, session)
+        finally:
+            if session:
+                session.close()
+
+    def analyze_keyspace(self, database_id: str, schema: str, refresh: bool = False) -> Dict[str, Any]:
+        """Starts a background Redis memory analysis, or returns the cached one."""
+        session = SessionLocal()
+        try:
+            db_type, _ = self.get_db_config(database_id, session)
+            if db_type != 'redis':
+                raise ValueError("Keyspace analysis is only available for Redis connections")
+            return self.redis_provider.analyze_keyspace(database_id, schema, session, refresh)
+        finally:
+            if session:
+                session.close()
+
+    def get_keyspace_analysis(self, database_id: str, schema: str) -> Optional[Dict[str, Any]]:
+        """Returns progress or results of the latest Redis keyspace analysis."""
+        session = SessionLocal()
+        try:
+            db_type, _ = self.get_db_config(database_id, session)
+            if db_type != 'redis':
+                raise ValueError("Keyspace analysis is only available for Redis connections")
+            return self.redis_provider.get_keyspace_analysis(database_id, schema, session)
+        finally:
+            if session:
+                session.close()
+
     def get_table_ddl(self, database_id: str, schema: str, table: str) -> str:
         """Retrieves or generates the CREATE TABLE DDL for the specified object."""
         session = SessionLocal()
@@ -194,8 +283,13 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    def refresh(self, database_id: str, schema: Optional[str] = None):
+        """Discards cached metadata so the next request reads the live catalog."""
+        metadata_cache.invalidate(database_id, schema)
+
     # --- SQL specific methods still using text queries directly for simplicity ---
 
+    @cached_metadata('functions')
     def get_functions(self, database_id: str, schema: str = 'public') -> List[str]:
         """Lists all database functions defined in the schema."""
         session = SessionLocal()
@@ -211,6 +305,7 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    @cached_metadata('procedures')
     def get_procedures(self, database_id: str, schema: str = 'public') -> List[str]:
         """Lists all database procedures defined in the schema."""
         session = SessionLocal()
@@ -256,6 +351,7 @@ class MetadataService(BaseDatabaseService):
             if session:
                 session.close()
 
+    @cached_metadata('foreign_keys')
     def get_all_foreign_keys(self, database_id: str, schema: str = 'public') -> List[Dict[str, Any]]:
         """Retrieves foreign key constraints for all tables in the schema."""
         session = SessionLocal()
@@ -0,0 +1,119 @@
+"""
+metadata/cache.py
+
+Shared cache for schema metadata (schemas, tables, columns, routines) fetched from
+target databases. Listeners are notified on every store and invalidation so that
+derived structures (e.g. the object search index) can refresh incrementally.
+"""
+
+import os
+import inspect
+import logging
+import functools
+from typing import Any, Callable, List, Optional
+
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", "300"))     # Seconds before an entry is refetched
+METADATA_CACHE_MAX_ENTRIES = 4096                                    # LRU bound across all databases
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Listener signature: (db_id, schema, kind, value). kind/value are None on invalidation.
+Listener = Callable[[str, Optional[str], Optional[str], Any], None]
+
+
+class MetadataCache:
+    """
+    Caches metadata results keyed by (db_id, schema, kind, *extra).
+    Loaders run outside the cache lock; failed loads are never cached.
+    """
+
+    def __init__(self, ttl: int = METADATA_CACHE_TTL, maxsize: int = METADATA_CACHE_MAX_ENTRIES):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._listeners: List[Listener] = []
+
+    def subscribe(self, listener: Listener):
+        """Registers a callback fired after each store or invalidation."""
+        self._listeners.append(listener)
+
+    def get(self, db_id: str, schema: Optional[str], kind: str, *extra) -> Any:
+        """Returns a cached value or None."""
+        return self._cache.get((db_id, schema, kind) + extra)
+
+    def set(self, db_id: str, schema: Optional[str], kind: str, value: Any, *extra):
+        """Stores a value and notifies listeners."""
+        self._cache.set((db_id, schema, kind) + extra, value)
+        # Per-object entries (extra key parts) are covered by their schema-wide counterparts
+        if not extra:
+            self._notify(db_id, schema, kind, value)
+
+    def get_or_load(self, db_id: str, schema: Optional[str], kind: str, loader: Callable[[], Any], *extra) -> Any:
+        """Returns the cached value, calling the loader and caching its result on a miss."""
+        key = (db_id, schema, kind) + extra
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(db_id, schema, kind, value, *extra)
+        return value
+
+    def invalidate(self, db_id: str, schema: Optional[str] = None):
+        """Drops every entry for a database, or only those of one schema."""
+        if schema is None:
+            removed = self._cache.invalidate(lambda k: k[0] == db_id)
+        else:
+            removed = self._cache.invalidate(lambda k: k[0] == db_id and k[1] in (schema, None))
+        if removed:
+            logger.debug(f"Invalidated {removed} metadata cache entries for {db_id} ({schema or 'all schemas'})")
+        self._notify(db_id, schema, None, None)
+
+    def clear(self):
+        """Drops all cached metadata."""
+        self._cache.clear()
+
+    def _notify(self, db_id: str, schema: Optional[str], kind: Optional[str], value: Any):
+        """Fans out a change to listeners; a failing listener never breaks the caller."""
+        for listener in self._listeners:
+            try:
+                listener(db_id, schema, kind, value)
+            except Exception as e:
+                logger.warning(f"Metadata cache listener failed: {e}")
+
+
+metadata_cache = MetadataCache()
+
+
+class PartialResult(dict):
+    """A mapping known to be missing some objects: returned to the caller, never cached."""
+
+
+def cached_metadata(kind: str):
+    """
+    Decorator for MetadataService getters taking (database_id, schema[, table]).
+    Only non-empty, complete results are cached: the getters swallow errors into empty
+    values (or PartialResult), and those must be retried rather than remembered.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            db_id = bound.arguments['database_id']
+            schema = bound.arguments.get('schema')
+            extra = (bound.arguments['table'],) if 'table' in bound.arguments else ()
+
+            hit = metadata_cache.get(db_id, schema, kind, *extra)
+            if hit is not None:
+                return hit
+            value = fn(self, *args, **kwargs)
+            if value and not isinstance(value, PartialResult):
+                metadata_cache.set(db_id, schema, kind, value, *extra)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,67 @@
+"""
+metadata/inspector_cache.py
+
+Per-database store for SQLAlchemy's reflection info cache.
+
+`inspect(conn)` returns a fresh Inspector with an empty `info_cache`, so every
+column/PK/FK/index lookup would otherwise hit the catalog again. Sharing one cache
+dict per database lets repeated reflection of the same tables resolve in memory.
+Entries expire with the metadata cache TTL and are dropped whenever the metadata
+cache is invalidated for that database or schema.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from utils.ttl_cache import TTLCache
+from services.metadata.cache import metadata_cache, METADATA_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class InspectorCache:
+    """Hands out one reflection cache dict per database id."""
+
+    def __init__(self, ttl: int = METADATA_CACHE_TTL, maxsize: int = 256):
+        self._caches = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def info_cache_for(self, db_id: str) -> Dict[Any, Any]:
+        """Returns the live reflection cache for a database, creating it if needed."""
+        cache = self._caches.get(db_id)
+        if cache is None:
+            cache = {}
+            self._caches.set(db_id, cache)
+        return cache
+
+    def invalidate(self, db_id: str, schema: Optional[str] = None):
+        """Drops reflected data for a database, or only entries reflected for one schema."""
+        if schema is None:
+            self._caches.pop(db_id)
+            return
+        cache = self._caches.get(db_id)
+        if not cache:
+            return
+        # Reflection keys are (method, positional str args, ((kw, value), ...)); schema is a kw
+        stale = [key for key in list(cache) if self._key_schema(key) in (schema, None)]
+        for key in stale:
+            cache.pop(key, None)
+
+    def on_cache_update(self, db_id: str, schema: Optional[str], kind: Optional[str], value: Any):
+        """Metadata cache listener: follows invalidations only."""
+        if kind is None:
+            self.invalidate(db_id, schema)
+
+    @staticmethod
+    def _key_schema(key) -> Optional[str]:
+        """Extracts the schema argument from a SQLAlchemy reflection cache key."""
+        try:
+            for name, value in key[2]:
+                if name == 'schema':
+                    return value[0] if isinstance(value, tuple) else value
+        except (IndexError, TypeError, ValueError):
+            pass
+        return None
+
+
+inspector_cache = InspectorCache()
+metadata_cache.subscribe(inspector_cache.on_cache_update)
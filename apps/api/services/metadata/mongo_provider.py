@@ -5,10 +5,18 @@ Metadata provider for MongoDB databases.
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
+from services.metadata.cache import metadata_cache
+from services.metadata.mongo_schema import mongo_schema_inferrer, SCHEMA_BULK_SAMPLE_SIZE, SCHEMA_BULK_WORKERS
+
 logger = logging.getLogger(__name__)
 
+# ─── Configuration ────────────────────────────────────────────────────────────
+STATS_UNION_BATCH = 200           # Collections folded into one $unionWith aggregation
+# ─────────────────────────────────────────────────────────────────────────────
+
 class MongoMetadataProvider:
     """Handles metadata extraction for MongoDB collections and databases."""
 
@@ -27,14 +35,8 @@ class MongoMetadataProvider:
             return []
             
         target_db = schema if schema and schema != 'public' else default_db
-        all_names = client[target_db].list_collection_names()
-        
-        try:
-            collections_info = list(client[target_db].list_collections())
-            view_names = [c['name'] for c in collections_info if c.get('type') == 'view']
-            return [name for name in all_names if name not in view_names and not name.startswith('system.')]
-        except Exception:
-            return [name for name in all_names if not name.startswith('system.')]
+        # One listCollections round-trip yields both names and types
+        return self._collection_names(client[target_db])
 
     def get_views(self, db_id: str, schema: str, session) -> List[str]:
         """Lists all views in a specific MongoDB database."""
@@ -51,31 +53,47 @@ class MongoMetadataProvider:
             return []
 
     def get_columns(self, db_id: str, schema: str, table: str, session) -> List[Dict[str, Any]]:
-        """Infers 'columns' (fields) by sampling documents from a collection."""
+        """Infers 'columns' (fields, including nested paths) from a sampled schema profile."""
+        return self._profile_columns(self.get_collection_schema(db_id, schema, table, session))
+
+    def get_all_columns(self, db_id: str, schema: str, session) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Columns of every collection and view, profiled concurrently from small samples
+        (SCHEMA_BULK_SAMPLE_SIZE); the single-collection schema endpoint samples more.
+        """
         client, default_db = self.service.get_mongo_client(db_id, session)
         if not client:
-            return []
-            
+            return {}
+
         target_db = schema if schema and schema != 'public' else default_db
-        collection = client[target_db][table]
-        
-        try:
-            # Sample documents to infer schema
+        database = client[target_db]
+        names = self.get_tables(db_id, schema, session) + self.get_views(db_id, schema, session)
+        if not names:
+            return {}
+
+        def _columns(name: str) -> List[Dict[str, Any]]:
             try:
-                cursor = collection.aggregate([{"$sample": {"size": 20}}])
-            except Exception:
-                cursor = collection.find().limit(20)
-                
-            all_fields = {}
-            for doc in cursor:
-                for key, value in doc.items():
-                    if key not in all_fields or (all_fields[key] == 'NoneType' and value is not None):
-                        all_fields[key] = type(value).__name__
-            
-            return [{"name": k, "type": t, "nullable": True} for k, t in all_fields.items()]
+                return self._profile_columns(mongo_schema_inferrer.infer(db_id, database, name, SCHEMA_BULK_SAMPLE_SIZE))
+            except Exception as e:
+                logger.error(f"Error inferring MongoDB schema for {name}: {e}")
+                return []
+
+        # pymongo clients are thread-safe; the pool only bounds concurrent $sample aggregations
+        with ThreadPoolExecutor(max_workers=min(SCHEMA_BULK_WORKERS, len(names)), thread_name_prefix="mongo-profile") as pool:
+            return dict(zip(names, pool.map(_columns, names)))
+
+    def get_collection_schema(self, db_id: str, schema: str, table: str, session, sample_size: Optional[int] = None) -> Dict[str, Any]:
+        """Returns field paths with type histograms and presence ratios for a collection."""
+        client, default_db = self.service.get_mongo_client(db_id, session)
+        if not client:
+            return {}
+
+        target_db = schema if schema and schema != 'public' else default_db
+        try:
+            return mongo_schema_inferrer.infer(db_id, client[target_db], table, sample_size)
         except Exception as e:
-            logger.error(f"Error inferring MongoDB columns: {e}")
-            return []
+            logger.error(f"Error inferring MongoDB schema for {table}: {e}")
+            return {}
 
     def get_indexes(self, db_id: str, schema: str, table: str, session) -> List[Dict[str, Any]]:
         """Lists all indices defined on a MongoDB collection."""
@@ -92,6 +110,20 @@ class MongoMetadataProvider:
             logger.error(f"Error listing MongoDB indexes: {e}")
             return []
 
+    def get_collection_stats(self, db_id: str, schema: str, session) -> List[Dict[str, Any]]:
+        """
+        Returns document counts and sizes for every collection of a database.
+        Uses one $collStats aggregation chained with $unionWith per batch of collections;
+        servers older than 4.4 fall back to one collstats command per collection.
+        """
+        client, default_db = self.service.get_mongo_client(db_id, session)
+        if not client:
+            return []
+
+        target_db = schema if schema and schema != 'public' else default_db
+        database = client[target_db]
+        return metadata_cache.get_or_load(db_id, target_db, 'collection_stats', lambda: self._load_collection_stats(database))
+
     def get_table_info(self, db_id: str, schema: str, table: str, session) -> Dict[str, Any]:
         """Returns statistics for a MongoDB collection."""
         client, default_db = self.service.get_mongo_client(db_id, session)
@@ -109,3 +141,90 @@ class MongoMetadataProvider:
             }
         except Exception:
             return {}
+
+    # --- Private Helpers ---
+
+    @staticmethod
+    def _profile_columns(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": f["name"],
+                "type": f["type"],
+                "nullable": f["nullable"],
+                "presence": f["presence"],
+                "types": f["types"],
+            }
+            for f in profile.get("fields", [])
+        ]
+
+    def _collection_names(self, database) -> List[str]:
+        """Lists regular collections (no views, no system collections) in one round-trip."""
+        try:
+            collections = database.list_collections(filter={"type": {"$ne": "view"}}, authorizedCollections=True, nameOnly=True)
+            names = [c['name'] for c in collections]
+        except Exception as e:
+            # Servers/permissions that reject the filtered listing still answer the plain one (views included)
+            logger.debug(f"Filtered listCollections failed for {database.name}, listing names only: {e}")
+            names = database.list_collection_names()
+        return [name for name in names if not name.startswith('system.')]
+
+    def _load_collection_stats(self, database) -> List[Dict[str, Any]]:
+        """Collects storage stats for all collections with as few round-trips as possible."""
+        names = self._collection_names(database)
+        stats: Dict[str, Dict[str, Any]] = {}
+        try:
+            for start in range(0, len(names), STATS_UNION_BATCH):
+                batch = names[start:start + STATS_UNION_BATCH]
+                for row in database[batch[0]].aggregate(self._stats_pipeline(database.name, batch[1:])):
+                    stats[row["_id"]] = row
+        except Exception as e:
+            logger.info(f"$collStats aggregation unavailable for {database.name}, using collstats per collection: {e}")
+            stats = {}
+            for name in names:
+                try:
+                    raw = database.command("collstats", name)
+                    stats[name] = {
+                        "count": raw.get("count", 0), "size": raw.get("size", 0),
+                        "storageSize": raw.get("storageSize", 0), "indexSize": raw.get("totalIndexSize", 0),
+                        "totalSize": raw.get("totalSize"),
+                    }
+                except Exception:
+                    stats[name] = {}
+
+        result = []
+        for name in sorted(names):
+            row = stats.get(name, {})
+            total = row.get("totalSize")
+            if total is None and row:
+                total = (row.get("storageSize") or 0) + (row.get("indexSize") or 0)
+            count = row.get("count")
+            size = row.get("size")
+            result.append({
+                "table": name,
+                "row_count": count,
+                "total_bytes": total,
+                "data_bytes": size,
+                "storage_bytes": row.get("storageSize"),
+                "index_bytes": row.get("indexSize"),
+                "avg_document_bytes": int(size / count) if count and size else None,
+                "total_size": f"{total / 1024 / 1024:.2f} MB" if total is not None else None,
+                "exact": False,
+            })
+        return result
+
+    @staticmethod
+    def _stats_pipeline(db_name: str, other_collections: List[str]) -> List[Dict[str, Any]]:
+        """$collStats for the pipeline's own collection, unioned with the same stage for the rest."""
+        coll_stats = {"$collStats": {"storageStats": {}}}
+        pipeline = [coll_stats]
+        pipeline.extend({"$unionWith": {"coll": name, "pipeline": [coll_stats]}} for name in other_collections)
+        # Sharded collections report once per shard; sum them per namespace
+        pipeline.append({"$group": {
+            "_id": {"$substrCP": ["$ns", len(db_name) + 1, {"$strLenCP": "$ns"}]},
+            "count": {"$sum": "$storageStats.count"},
+            "size": {"$sum": "$storageStats.size"},
+            "storageSize": {"$sum": "$storageStats.storageSize"},
+            "indexSize": {"$sum": "$storageStats.totalIndexSize"},
+            "totalSize": {"$sum": "$storageStats.totalSize"},
+        }})
+        return pipeline
@@ -0,0 +1,172 @@
+"""
+metadata/mongo_schema.py
+
+Statistical schema inference for MongoDB collections. A `$sample` of documents is
+flattened server-side with `$objectToArray` into (path, BSON type) pairs, which a
+`$facet` groups into per-path type histograms alongside the sample size. Nested
+documents (and documents inside arrays) are expanded into dotted paths.
+"""
+
+import os
+import datetime
+import decimal
+import logging
+from typing import Any, Dict, List, Optional
+
+from services.metadata.cache import metadata_cache
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+SCHEMA_SAMPLE_SIZE = int(os.getenv("MONGO_SCHEMA_SAMPLE_SIZE", "1000"))   # Documents profiled per collection
+SCHEMA_BULK_SAMPLE_SIZE = int(os.getenv("MONGO_SCHEMA_BULK_SAMPLE_SIZE", "100"))  # Per collection when listing a whole database
+SCHEMA_BULK_WORKERS = 4                                                 # Collections profiled at once when listing
+SCHEMA_MAX_SAMPLE_SIZE = 100_000                                        # Upper bound a caller may request
+SCHEMA_MAX_DEPTH = 4                                                    # Nesting levels expanded into paths
+SCHEMA_MAX_TIME_MS = 15000                                              # Server-side time limit for the profile
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class MongoSchemaInferrer:
+    """Profiles collections and caches the result per (db, database name, collection, sample size)."""
+
+    def infer(self, db_id: str, database, collection: str, sample_size: Optional[int] = None) -> Dict[str, Any]:
+        """Returns the cached profile of a collection, computing it on a miss."""
+        size = max(1, min(int(sample_size or SCHEMA_SAMPLE_SIZE), SCHEMA_MAX_SAMPLE_SIZE))
+        return metadata_cache.get_or_load(
+            db_id, database.name, 'collection_schema',
+            lambda: self.profile(database[collection], size),
+            collection, size
+        )
+
+    def profile(self, collection, sample_size: int) -> Dict[str, Any]:
+        """Runs the sampling aggregation, falling back to client-side flattening on old servers."""
+        try:
+            facet = next(collection.aggregate(self._pipeline(sample_size), allowDiskUse=True, maxTimeMS=SCHEMA_MAX_TIME_MS), None)
+            counts = [((row["_id"]["p"], row["_id"]["t"]), row["n"]) for row in (facet or {}).get("fields", [])]
+            total = ((facet or {}).get("total") or [{}])[0].get("n", 0)
+        except Exception as e:
+            logger.info(f"Server-side schema sampling unavailable for {collection.name}, profiling locally: {e}")
+            counts, total = self._profile_locally(collection, sample_size)
+
+        return {
+            "collection": collection.name,
+            "sampleSize": total,
+            "fields": self._summarize(counts, total),
+        }
+
+    # --- Private Helpers ---
+
+    def _pipeline(self, sample_size: int) -> List[Dict[str, Any]]:
+        """Builds the $sample -> flatten -> $facet pipeline."""
+        return [
+            {"$sample": {"size": sample_size}},
+            {"$project": {"_id": 0, "fields": self._flatten_expr("$$ROOT", "", 0)}},
+            {"$facet": {
+                "fields": [
+                    {"$unwind": "$fields"},
+                    {"$group": {"_id": {"p": "$fields.p", "t": "$fields.t"}, "n": {"$sum": 1}}},
+                ],
+                "total": [{"$count": "n"}],
+            }},
+        ]
+
+    def _flatten_expr(self, doc_expr: Any, prefix_expr: Any, depth: int) -> Dict[str, Any]:
+        """
+        Aggregation expression yielding [{p: path, t: type}] for a document.
+        Recursion is unrolled to SCHEMA_MAX_DEPTH because pipelines cannot recurse.
+        Arrays of documents are expanded through their first element.
+        """
+        kv = f"kv{depth}"
+        value = f"$${kv}.v"
+        path = {"$concat": [prefix_expr, f"$${kv}.k"]} if prefix_expr else f"$${kv}.k"
+        entry = [{"p": path, "t": {"$type": value}}]
+
+        if depth + 1 < SCHEMA_MAX_DEPTH:
+            child_prefix = {"$concat": [path, "."]}
+            first_item = {"$arrayElemAt": [value, 0]}
+            children = {"$switch": {
+                "branches": [
+                    {"case": {"$eq": [{"$type": value}, "object"]},
+                     "then": self._flatten_expr(value, child_prefix, depth + 1)},
+                    {"case": {"$and": [
+                        {"$eq": [{"$type": value}, "array"]},
+                        {"$eq": [{"$type": first_item}, "object"]},
+                    ]}, "then": self._flatten_expr(first_item, child_prefix, depth + 1)},
+                ],
+                "default": [],
+            }}
+            entry = {"$concatArrays": [entry, children]}
+
+        return {"$reduce": {
+            "input": {"$map": {"input": {"$objectToArray": doc_expr}, "as": kv, "in": entry}},
+            "initialValue": [],
+            "in": {"$concatArrays": ["$$value", "$$this"]},
+        }}
+
+    def _profile_locally(self, collection, sample_size: int):
+        """Client-side equivalent of the pipeline for servers without $sample/$objectToArray."""
+        counts: Dict[tuple, int] = {}
+        total = 0
+        for doc in collection.find().limit(sample_size):
+            total += 1
+            for path, bson_type in self._flatten_doc(doc, "", 0):
+                counts[(path, bson_type)] = counts.get((path, bson_type), 0) + 1
+        return list(counts.items()), total
+
+    def _flatten_doc(self, doc: Dict[str, Any], prefix: str, depth: int):
+        for key, value in doc.items():
+            path = f"{prefix}{key}"
+            yield path, self._bson_type(value)
+            if depth + 1 >= SCHEMA_MAX_DEPTH:
+                continue
+            if isinstance(value, dict):
+                yield from self._flatten_doc(value, path + ".", depth + 1)
+            elif isinstance(value, list) and value and isinstance(value[0], dict):
+                yield from self._flatten_doc(value[0], path + ".", depth + 1)
+
+    @staticmethod
+    def _bson_type(value: Any) -> str:
+        """Maps a decoded Python value to the alias MongoDB's $type reports."""
+        if value is None: return 'null'
+        if isinstance(value, bool): return 'bool'
+        if isinstance(value, int): return 'int' if -2**31 <= value < 2**31 else 'long'
+        if isinstance(value, float): return 'double'
+        if isinstance(value, str): return 'string'
+        if isinstance(value, dict): return 'object'
+        if isinstance(value, list): return 'array'
+        if isinstance(value, datetime.datetime): return 'date'
+        if isinstance(value, (bytes, bytearray)): return 'binData'
+        if isinstance(value, decimal.Decimal): return 'decimal'
+        name = type(value).__name__
+        return {'ObjectId': 'objectId', 'Decimal128': 'decimal', 'Binary': 'binData', 'Int64': 'long',
+                'Timestamp': 'timestamp', 'Regex': 'regex'}.get(name, name)
+
+    @staticmethod
+    def _summarize(counts, total: int) -> List[Dict[str, Any]]:
+        """Folds (path, type) counts into per-path type histograms and presence ratios."""
+        fields: Dict[str, Dict[str, int]] = {}
+        for (path, bson_type), n in counts:
+            bucket = fields.setdefault(path, {})
+            bucket[bson_type] = bucket.get(bson_type, 0) + n
+
+        result = []
+        for path, types in fields.items():
+            seen = sum(types.values())
+            non_null = {t: n for t, n in types.items() if t not in ('null', 'missing')}
+            dominant = max(non_null, key=non_null.get) if non_null else 'null'
+            presence = round(seen / total, 4) if total else 0.0
+            result.append({
+                "name": path,
+                "type": dominant,
+                "types": dict(sorted(types.items(), key=lambda item: -item[1])),
+                "presence": presence,
+                "nullable": presence < 1 or 'null' in types,
+                "depth": path.count('.'),
+            })
+        # _id first, then shallow paths, then alphabetical for stable output
+        result.sort(key=lambda f: (f["name"] != "_id", f["depth"], f["name"]))
+        return result
+
+
+mongo_schema_inferrer = MongoSchemaInferrer()
@@ -0,0 +1,110 @@
+"""
+metadata/prefetcher.py
+
+Background warm-up of the metadata cache. When a connection is registered or first
+used, its schemas, tables, views and columns are fetched on a small low-priority
+worker pool so the first tree expansion is served from cache. The pool size is the
+global cap on how many databases warm up at once.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set
+
+from services.metadata.cache import METADATA_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+PREFETCH_ENABLED = os.getenv("METADATA_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_MAX_CONCURRENCY = 2      # Databases warmed at the same time across the server
+PREFETCH_MAX_SCHEMAS = 20         # Schemas warmed per database; the rest load on demand
+PREFETCH_PAUSE_SECONDS = 0.05     # Yield between schemas so user requests win the pool
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Catalog schemas nobody expands first; skipped to keep warm-ups short
+SYSTEM_SCHEMAS = {
+    'information_schema', 'pg_catalog', 'pg_toast', 'mysql', 'performance_schema', 'sys',
+    'system', 'admin', 'local', 'config', 'temp.main', 'system.main', 'system.information_schema',
+}
+
+# Default schemas are warmed first because the UI opens them first
+DEFAULT_SCHEMAS = ('public', 'main', 'memory.main', 'dbo', 'default')
+
+
+class MetadataPrefetcher:
+    """Deduplicates and runs per-database warm-ups on a bounded daemon pool."""
+
+    def __init__(self, enabled: bool = PREFETCH_ENABLED, max_concurrency: int = PREFETCH_MAX_CONCURRENCY,
+                 cooldown: float = METADATA_CACHE_TTL):
+        self.enabled = enabled
+        self.cooldown = cooldown
+        self._max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._warmed_at: Dict[str, float] = {}
+
+    def schedule(self, db_id: str) -> bool:
+        """
+        Queues a warm-up unless one is already queued or the cache was warmed recently.
+        Returns True when a new task was submitted.
+        """
+        if not self.enabled or not db_id:
+            return False
+        with self._lock:
+            if db_id in self._pending:
+                return False
+            warmed_at = self._warmed_at.get(db_id)
+            if warmed_at is not None and time.monotonic() - warmed_at < self.cooldown:
+                return False
+            self._pending.add(db_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_concurrency, thread_name_prefix="metadata-prefetch")
+            executor = self._executor
+        executor.submit(self._run, db_id)
+        return True
+
+    def forget(self, db_id: str):
+        """Clears the cooldown so the next use of the database warms it again."""
+        with self._lock:
+            self._warmed_at.pop(db_id, None)
+
+    def warm(self, db_id: str):
+        """Fetches schemas, then tables, views and columns of each schema through the cache."""
+        from services.metadata import metadata_service
+
+        schemas = metadata_service.get_schemas(db_id) or []
+        for schema in self._ordered(schemas)[:PREFETCH_MAX_SCHEMAS]:
+            metadata_service.get_tables(db_id, schema)
+            metadata_service.get_views(db_id, schema)
+            metadata_service.get_all_columns(db_id, schema)
+            time.sleep(PREFETCH_PAUSE_SECONDS)
+
+    # --- Private Helpers ---
+
+    def _run(self, db_id: str):
+        """Worker task: warms one database and records when it finished."""
+        started = time.monotonic()
+        try:
+            self.warm(db_id)
+            with self._lock:
+                self._warmed_at[db_id] = time.monotonic()
+            logger.debug(f"Prefetched metadata for {db_id} in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            logger.warning(f"Metadata prefetch failed for {db_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(db_id)
+
+    @staticmethod
+    def _ordered(schemas):
+        """Puts default schemas first and drops system catalogs."""
+        user_schemas = [s for s in schemas if str(s).lower() not in SYSTEM_SCHEMAS]
+        return sorted(user_schemas, key=lambda s: (s not in DEFAULT_SCHEMAS, DEFAULT_SCHEMAS.index(s) if s in DEFAULT_SCHEMAS else 0))
+
+
+metadata_prefetcher = MetadataPrefetcher()
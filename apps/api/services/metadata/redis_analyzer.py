@@ -0,0 +1,166 @@
+"""
+metadata/redis_analyzer.py
+
+Background keyspace analyzer for Redis. Streams SCAN over a logical database, fetches
+TYPE / MEMORY USAGE / TTL for each batch in one pipelined round-trip, and aggregates
+key counts and bytes per ':'-delimited prefix. Results are cached per (database, index)
+so operators can see where memory goes without running `redis-cli --bigkeys`.
+"""
+
+import heapq
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+ANALYZER_SCAN_COUNT = 1000        # SCAN COUNT hint; also the pipeline batch size
+ANALYZER_MAX_KEYS = 200_000       # Keys inspected per run; larger keyspaces are extrapolated
+ANALYZER_MAX_DEPTH = 3            # Prefix levels kept in the namespace tree
+ANALYZER_TOP_KEYS = 20            # Largest keys reported individually
+ANALYZER_MEMORY_SAMPLES = 5       # MEMORY USAGE SAMPLES for aggregate types
+ANALYZER_RESULT_TTL = 600         # Seconds a finished analysis stays cached
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class KeyspaceAnalyzer:
+    """Runs at most one analysis per (db_id, db_index) at a time and caches the outcome."""
+
+    def __init__(self, delimiter: str = ':', result_ttl: int = ANALYZER_RESULT_TTL):
+        self.delimiter = delimiter
+        self._jobs = TTLCache(maxsize=256, ttl=result_ttl)
+        self._lock = threading.Lock()
+
+    def start(self, db_id: str, db_index: int, client, refresh: bool = False) -> Dict[str, Any]:
+        """Starts a background analysis unless one is running or a fresh result is cached."""
+        key = (db_id, db_index)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and (job["status"] == "running" or not refresh):
+                return self._public(job)
+            job = {
+                "status": "running", "database": db_index, "scanned": 0, "total": None,
+                "startedAt": time.time(), "finishedAt": None, "error": None, "result": None,
+            }
+            self._jobs.set(key, job)
+
+        threading.Thread(
+            target=self._run, args=(job, client, db_index),
+            name=f"redis-analyze-{db_id}-{db_index}", daemon=True
+        ).start()
+        return self._public(job)
+
+    def status(self, db_id: str, db_index: int) -> Optional[Dict[str, Any]]:
+        """Returns the current or last analysis for a logical database, if any."""
+        job = self._jobs.get((db_id, db_index))
+        return self._public(job) if job else None
+
+    def analyze(self, client, db_index: int, progress: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Scans the keyspace of a client bound to `db_index` and returns the aggregated prefix tree."""
+        total = client.dbsize()
+        if progress is not None:
+            progress["total"] = total
+
+        root = self._node("")
+        top: List[tuple] = []
+        scanned = 0
+        cursor = 0
+        truncated = False
+        while True:
+            cursor, keys = client.scan(cursor=cursor, count=ANALYZER_SCAN_COUNT)
+            truncated = len(keys) > ANALYZER_MAX_KEYS - scanned
+            keys = keys[:ANALYZER_MAX_KEYS - scanned]
+            if keys:
+                for key, key_type, size, ttl in self._inspect_batch(client, keys):
+                    self._add(root, key, key_type, size, ttl)
+                    if len(top) < ANALYZER_TOP_KEYS:
+                        heapq.heappush(top, (size, key, key_type))
+                    elif size > top[0][0]:
+                        heapq.heapreplace(top, (size, key, key_type))
+                scanned += len(keys)
+                if progress is not None:
+                    progress["scanned"] = scanned
+            if int(cursor) == 0 or scanned >= ANALYZER_MAX_KEYS:
+                break
+
+        sampled = int(cursor) != 0 or truncated
+        # Scale sampled totals so operators see the expected full-keyspace figure
+        scale = (total / scanned) if sampled and scanned else 1.0
+        return {
+            "totalKeys": total,
+            "scannedKeys": scanned,
+            "sampled": sampled,
+            "totalBytes": root["bytes"],
+            "estimatedTotalBytes": int(root["bytes"] * scale),
+            "tree": self._finalize(root)["children"],
+            "topKeys": [{"key": k, "type": t, "bytes": s} for s, k, t in sorted(top, reverse=True)],
+        }
+
+    # --- Private Helpers ---
+
+    def _run(self, job: Dict[str, Any], client, db_index: int):
+        """Worker thread: runs one analysis and records its outcome on the job."""
+        try:
+            job["result"] = self.analyze(client, db_index, progress=job)
+            job["status"] = "done"
+        except Exception as e:
+            logger.warning(f"Redis keyspace analysis failed (DB {db_index}): {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finishedAt"] = time.time()
+
+    def _inspect_batch(self, client, keys: List[str]):
+        """Fetches TYPE, MEMORY USAGE and TTL for a batch of keys in one round-trip."""
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.type(key)
+            pipe.memory_usage(key, samples=ANALYZER_MEMORY_SAMPLES)
+            pipe.ttl(key)
+        replies = pipe.execute(raise_on_error=False)
+        for i, key in enumerate(keys):
+            key_type, size, ttl = replies[3 * i:3 * i + 3]
+            # Keys can expire between SCAN and the pipeline; errors are reported as exceptions
+            if isinstance(key_type, Exception) or key_type == 'none':
+                continue
+            size = size if isinstance(size, int) else 0
+            ttl = ttl if isinstance(ttl, int) else -1
+            yield key, key_type, size, ttl
+
+    def _add(self, root: Dict[str, Any], key: str, key_type: str, size: int, ttl: int):
+        """Adds one key to every prefix node on its path, up to the configured depth."""
+        parts = key.split(self.delimiter)
+        node = root
+        self._count(node, key_type, size, ttl)
+        for depth in range(min(len(parts) - 1, ANALYZER_MAX_DEPTH)):
+            prefix = self.delimiter.join(parts[:depth + 1]) + self.delimiter
+            node = node["children"].setdefault(prefix, self._node(prefix))
+            self._count(node, key_type, size, ttl)
+
+    @staticmethod
+    def _count(node: Dict[str, Any], key_type: str, size: int, ttl: int):
+        node["keys"] += 1
+        node["bytes"] += size
+        node["types"][key_type] = node["types"].get(key_type, 0) + 1
+        if ttl >= 0:
+            node["expiring"] += 1
+
+    @staticmethod
+    def _node(prefix: str) -> Dict[str, Any]:
+        return {"prefix": prefix, "keys": 0, "bytes": 0, "expiring": 0, "types": {}, "children": {}}
+
+    def _finalize(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """Turns child maps into lists ordered by memory, largest first."""
+        children = sorted(node["children"].values(), key=lambda n: n["bytes"], reverse=True)
+        return {**node, "children": [self._finalize(child) for child in children]}
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(job)
+
+
+keyspace_analyzer = KeyspaceAnalyzer()
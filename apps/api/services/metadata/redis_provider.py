@@ -7,8 +7,27 @@ Metadata provider for Redis databases.
 import logging
 from typing import List, Dict, Any, Optional
 
+from services.metadata.redis_analyzer import keyspace_analyzer
+
 logger = logging.getLogger(__name__)
 
+# ─── Key Browsing Configuration ───────────────────────────────────────────────
+BROWSE_DEFAULT_COUNT = 500        # Target keys per page
+BROWSE_MAX_COUNT = 5000           # Upper bound a client may request per page
+BROWSE_MAX_SCAN_CALLS = 20        # SCAN round-trips per page, so sparse matches stay bounded
+INSPECT_MAX_KEYS = 1000           # Keys accepted by one multi-key inspect call
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Element-count command per key type; all are queued and the matching reply is kept
+SIZE_COMMANDS = (
+    ('string', 'STRLEN'),
+    ('hash', 'HLEN'),
+    ('list', 'LLEN'),
+    ('set', 'SCARD'),
+    ('zset', 'ZCARD'),
+    ('stream', 'XLEN'),
+)
+
 class RedisMetadataProvider:
     """Handles metadata extraction for Redis databases and keys."""
 
@@ -24,12 +43,11 @@ class RedisMetadataProvider:
         db_type, config = self.service.get_db_config(db_id, session)
         db_index = self._get_db_index(schema, config)
         
-        client, _ = self.service.get_redis_client(db_id, session)
+        client, _ = self.service.get_redis_client(db_id, session, db_index)
         if not client:
             return []
             
         try:
-            client.select(db_index)
             keys = []
             # SCAN is safer in production than KEYS *
             for k in client.scan_iter(match='*', count=1000):
@@ -40,28 +58,86 @@ class RedisMetadataProvider:
             logger.error(f"Error scanning Redis keys (DB {db_index}): {e}")
             return []
 
+    def browse_keys(self, db_id: str, schema: str, session, cursor: int = 0, match: Optional[str] = None,
+                    key_type: Optional[str] = None, prefix: str = '', delimiter: str = ':',
+                    count: int = BROWSE_DEFAULT_COUNT) -> Dict[str, Any]:
+        """
+        Returns one page of a keyspace walk. The SCAN cursor is handed back to the caller,
+        so each page costs a bounded number of round-trips regardless of keyspace size.
+        Keys below `prefix` are folded into namespace groups at the next delimiter;
+        group counts cover the current page only. `match` is a glob applied below `prefix`.
+        """
+        db_type, config = self.service.get_db_config(db_id, session)
+        db_index = self._get_db_index(schema, config)
+
+        client, _ = self.service.get_redis_client(db_id, session, db_index)
+        if not client:
+            return {"cursor": "0", "done": True, "keys": [], "groups": []}
+
+        count = max(1, min(int(count), BROWSE_MAX_COUNT))
+        pattern = self._escape_glob(prefix) + (match or '*')
+
+        found: List[str] = []
+        calls = 0
+        while True:
+            cursor, batch = client.scan(cursor=cursor, match=pattern, count=count, _type=key_type or None)
+            found.extend(batch)
+            calls += 1
+            if int(cursor) == 0 or len(found) >= count or calls >= BROWSE_MAX_SCAN_CALLS:
+                break
+
+        keys, groups = self._group_by_namespace(found, prefix, delimiter)
+        return {
+            "cursor": str(cursor),
+            "done": int(cursor) == 0,
+            "keys": sorted(keys),
+            "groups": [{"prefix": p, "count": n} for p, n in sorted(groups.items())],
+        }
+
+    def analyze_keyspace(self, db_id: str, schema: str, session, refresh: bool = False) -> Dict[str, Any]:
+        """Starts (or returns) the background memory analysis of one logical database."""
+        db_type, config = self.service.get_db_config(db_id, session)
+        db_index = self._get_db_index(schema, config)
+
+        status = keyspace_analyzer.status(db_id, db_index)
+        if status and not refresh:
+            return status
+        client, _ = self.service.get_redis_client(db_id, session, db_index)
+        if not client:
+            return {}
+        return keyspace_analyzer.start(db_id, db_index, client, refresh=refresh)
+
+    def get_keyspace_analysis(self, db_id: str, schema: str, session) -> Optional[Dict[str, Any]]:
+        """Returns the latest keyspace analysis without starting a new one."""
+        db_type, config = self.service.get_db_config(db_id, session)
+        return keyspace_analyzer.status(db_id, self._get_db_index(schema, config))
+
     def get_columns(self, db_id: str, schema: str, table: str, session) -> List[Dict[str, Any]]:
         """Infers 'columns' (metadata fields) based on key type."""
         db_type, config = self.service.get_db_config(db_id, session)
         db_index = self._get_db_index(schema, config)
         
-        client, _ = self.service.get_redis_client(db_id, session)
+        client, _ = self.service.get_redis_client(db_id, session, db_index)
         if not client:
             return []
             
         try:
-            client.select(db_index)
-            key_type = client.type(table)
+            # One round-trip: the HSCAN reply is simply an error for non-hash keys
+            pipe = client.pipeline(transaction=False)
+            pipe.type(table)
+            pipe.hscan(table, cursor=0, count=50)
+            key_type, hash_page = pipe.execute(raise_on_error=False)
+            if isinstance(key_type, Exception):
+                return []
             cols = [
                 {"name": "key", "type": "String", "nullable": False}, 
                 {"name": "type", "type": "String", "nullable": False}
             ]
             if key_type == 'string':
                 cols.append({"name": "value", "type": "String", "nullable": True})
-            elif key_type == 'hash':
+            elif key_type == 'hash' and not isinstance(hash_page, Exception):
                 # Sampling hash fields for visibility
-                fields = client.hkeys(table)
-                for f in fields[:50]:
+                for f in list(hash_page[1])[:50]:
                     cols.append({"name": f, "type": "HashField", "nullable": True})
             return cols
         except Exception:
@@ -69,27 +145,27 @@ class RedisMetadataProvider:
 
     def get_table_info(self, db_id: str, schema: str, table: str, session) -> Dict[str, Any]:
         """Provides statistics such as key type, expiration (TTL), and memory usage."""
+        details = self.inspect_keys(db_id, schema, [table], session)
+        if not details or details[0].get("type") in (None, 'none'):
+            return {}
+        info = details[0]
+        return {k: info[k] for k in ("type", "ttl", "element_count", "memory_usage")}
+
+    def inspect_keys(self, db_id: str, schema: str, keys: List[str], session) -> List[Dict[str, Any]]:
+        """Returns type, TTL, element count and memory usage for many keys in one round-trip."""
         db_type, config = self.service.get_db_config(db_id, session)
         db_index = self._get_db_index(schema, config)
-        
-        client, _ = self.service.get_redis_client(db_id, session)
+
+        client, _ = self.service.get_redis_client(db_id, session, db_index)
         if not client:
-             return {}
-        
+            return []
+
+        keys = list(keys)[:INSPECT_MAX_KEYS]
         try:
-            client.select(db_index)
-            key_type = client.type(table)
-            ttl = client.ttl(table)
-            size = self._get_key_size(client, table, key_type)
-            
-            return {
-                "type": key_type,
-                "ttl": f"{ttl}s" if ttl >= 0 else ("Infinity" if ttl == -1 else "n/a"),
-                "element_count": size,
-                "memory_usage": f"{client.memory_usage(table) or 0} bytes"
-            }
-        except Exception:
-            return {}
+            return self._inspect_pipeline(client, keys)
+        except Exception as e:
+            logger.error(f"Error inspecting Redis keys (DB {db_index}): {e}")
+            return []
 
     # --- Private Helpers ---
 
@@ -100,11 +176,65 @@ class RedisMetadataProvider:
         except (ValueError, TypeError):
             return 0
 
-    def _get_key_size(self, client, table: str, key_type: str) -> int:
-        """Determines the number of elements or characters in a given key."""
-        if key_type == 'string': return client.strlen(table)
-        if key_type == 'hash': return client.hlen(table)
-        if key_type == 'list': return client.llen(table)
-        if key_type == 'set': return client.scard(table)
-        if key_type == 'zset': return client.zcard(table)
-        return 0
+    @staticmethod
+    def _group_by_namespace(keys: List[str], prefix: str, delimiter: str):
+        """Splits keys into direct children of `prefix` and counts of deeper namespaces."""
+        leaves: List[str] = []
+        groups: Dict[str, int] = {}
+        for key in dict.fromkeys(keys):  # SCAN may return a key more than once
+            if prefix and not key.startswith(prefix):
+                continue
+            rest = key[len(prefix):]
+            head, sep, _ = rest.partition(delimiter) if delimiter else (rest, '', '')
+            if sep:
+                group = prefix + head + sep
+                groups[group] = groups.get(group, 0) + 1
+            else:
+                leaves.append(key)
+        return leaves, groups
+
+    @staticmethod
+    def _escape_glob(value: str) -> str:
+        """Escapes Redis glob metacharacters so a prefix matches literally."""
+        return ''.join('\\' + ch if ch in '*?[]\\' else ch for ch in value)
+
+    def _inspect_pipeline(self, client, keys: List[str]) -> List[Dict[str, Any]]:
+        """
+        Two pipelined round-trips: TYPE, TTL and MEMORY USAGE for every key, then the one
+        size command matching each existing key's type (no WRONGTYPE replies to discard).
+        """
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.type(key)
+            pipe.ttl(key)
+            pipe.memory_usage(key)
+        replies = pipe.execute(raise_on_error=False)
+
+        size_commands = dict(SIZE_COMMANDS)
+        sized = []
+        pipe = client.pipeline(transaction=False)
+        for i, key in enumerate(keys):
+            command = size_commands.get(replies[i * 3])
+            if command:
+                pipe.execute_command(command, key)
+                sized.append(key)
+        sizes = dict(zip(sized, pipe.execute(raise_on_error=False))) if sized else {}
+
+        results = []
+        for i, key in enumerate(keys):
+            key_type, ttl, memory = replies[i * 3:(i + 1) * 3]
+            if isinstance(key_type, Exception) or key_type == 'none':
+                results.append({"key": key, "type": None, "exists": False})
+                continue
+            size = sizes.get(key, 0)
+            ttl = ttl if isinstance(ttl, int) else -2
+            memory = memory if isinstance(memory, int) else 0
+            results.append({
+                "key": key,
+                "exists": True,
+                "type": key_type,
+                "ttl": f"{ttl}s" if ttl >= 0 else ("Infinity" if ttl == -1 else "n/a"),
+                "element_count": size if isinstance(size, int) else 0,
+                "memory_usage": f"{memory} bytes",
+            })
+        return results
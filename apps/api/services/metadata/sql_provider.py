@@ -5,11 +5,25 @@ Metadata provider for SQL-compliant databases using SQLAlchemy.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from typing import List, Dict, Any, Optional, Callable
 from sqlalchemy import text, inspect
 
+from services.metadata.inspector_cache import inspector_cache
+from services.metadata.cache import PartialResult
+
 logger = logging.getLogger(__name__)
 
+# ─── Parallel Fallback Configuration ──────────────────────────────────────────
+FALLBACK_MAX_WORKERS = 8          # Concurrent reflection threads per fallback run
+FALLBACK_TIMEOUT_SECONDS = 25     # Give up (no partial result) after this
+FALLBACK_PROGRESS_EVERY = 50      # Log progress every N reflected objects
+# ─────────────────────────────────────────────────────────────────────────────
+
+# ─── Table Stats Configuration ────────────────────────────────────────────────
+EXACT_COUNT_BATCH = 100           # Tables counted per UNION ALL statement in exact mode
+# ─────────────────────────────────────────────────────────────────────────────
+
 class SqlMetadataProvider:
     """Handles metadata extraction for relational databases via SQLAlchemy reflection."""
 
@@ -27,7 +41,7 @@ class SqlMetadataProvider:
             if conn.dialect.name == 'duckdb':
                 # DuckDB typically uses 'main' as default
                 try:
-                    return inspect(conn).get_schema_names()
+                    return self._inspector(conn, db_id).get_schema_names()
                 except Exception:
                     return ['main']
             if conn.dialect.name == 'oracle':
@@ -36,29 +50,16 @@ class SqlMetadataProvider:
                     "SELECT username FROM ALL_USERS ORDER BY username"
                 ))
                 return [row[0] for row in res]
-            return inspect(conn).get_schema_names()
+            return self._inspector(conn, db_id).get_schema_names()
         return self.service.run_dynamic_query(db_id, _op)
 
     def get_tables(self, db_id: str, schema: str) -> List[str]:
         """Lists all table names within a specific schema."""
-        def _op(conn):
-            if conn.dialect.name in ['clickhouse', 'clickhousedb']:
-                target_schema = 'default' if schema == 'public' else schema
-                # Filter out views from table list for ClickHouse
-                res = conn.execute(text(f"SELECT name FROM system.tables WHERE database = :schema AND engine NOT LIKE '%View'"), {"schema": target_schema})
-                return [row[0] for row in res]
-            return inspect(conn).get_table_names(schema=schema)
-        return self.service.run_dynamic_query(db_id, _op)
+        return self.service.run_dynamic_query(db_id, lambda conn: self._list_tables(conn, db_id, schema))
 
     def get_views(self, db_id: str, schema: str) -> List[str]:
         """Lists all defined views within a schema."""
-        def _op(conn):
-            if conn.dialect.name in ['clickhouse', 'clickhousedb']:
-                target_schema = 'default' if schema == 'public' else schema
-                res = conn.execute(text(f"SELECT name FROM system.tables WHERE database = :schema AND engine LIKE '%View'"), {"schema": target_schema})
-                return [row[0] for row in res]
-            return inspect(conn).get_view_names(schema=schema)
-        return self.service.run_dynamic_query(db_id, _op)
+        return self.service.run_dynamic_query(db_id, lambda conn: self._list_views(conn, db_id, schema))
 
     def get_all_columns(self, db_id: str, schema: str) -> Dict[str, List[Dict[str, Any]]]:
         """Retrieves columns for all tables and views in a schema using a single query."""
@@ -169,33 +170,61 @@ class SqlMetadataProvider:
             return result
         return self.service.run_dynamic_query(db_id, _op)
 
+    def get_all_columns_parallel(
+        self,
+        db_id: str,
+        schema: str,
+        max_workers: int = FALLBACK_MAX_WORKERS,
+        timeout: float = FALLBACK_TIMEOUT_SECONDS,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Reflects columns object-by-object on a bounded thread pool sharing one engine.
+        Used when the single-query path fails. Objects whose reflection fails are left out
+        and the map is returned as a PartialResult, so it is not cached; raises TimeoutError
+        if the timeout expires.
+        """
+        engine = self.service.get_engine(db_id)
+        with engine.connect() as conn:
+            objects = self._list_tables(conn, db_id, schema) + self._list_views(conn, db_id, schema)
+            # File-based engines serialize on the file; extra threads only add contention
+            if conn.dialect.name in ['sqlite', 'duckdb']:
+                max_workers = 1
+
+        total = len(objects)
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        if not total:
+            return result
+
+        done, failed = 0, 0
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, total)), thread_name_prefix="metadata-fallback")
+        futures = {executor.submit(self._reflect_columns, engine, db_id, schema, name): name for name in objects}
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                name = futures[future]
+                try:
+                    result[name] = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Column reflection failed for {schema}.{name}: {e}")
+                done += 1
+                if on_progress:
+                    on_progress(done, total)
+                elif done % FALLBACK_PROGRESS_EVERY == 0:
+                    logger.info(f"Column fallback for {db_id}/{schema}: {done}/{total} objects reflected")
+        except FuturesTimeoutError:
+            raise TimeoutError(f"Column fallback for {db_id}/{schema} timed out after {timeout}s ({done}/{total} objects reflected)")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if failed:
+            logger.warning(f"Column fallback for {db_id}/{schema}: {failed} of {total} objects could not be reflected")
+            return PartialResult(result)
+        return result
+
     def get_columns(self, db_id: str, schema: str, table: str) -> List[Dict[str, Any]]:
         """Reflects column names and types for a specific table."""
-        def _op(conn):
-            if conn.dialect.name in ['clickhouse', 'clickhousedb']:
-                target_schema = 'default' if schema == 'public' else schema
-                res = conn.execute(text(f"DESCRIBE TABLE `{target_schema}`.`{table}`"))
-                return [{"name": row[0], "type": row[1], "nullable": True} for row in res]
-            
-            inspector = inspect(conn)
-            cols = inspector.get_columns(table, schema=schema)
-            try:
-                pk_constraint = inspector.get_pk_constraint(table, schema=schema)
-                pk_cols = pk_constraint.get("constrained_columns", [])
-            except Exception:
-                pk_cols = []
-                
-            return [
-                {
-                    "name": c["name"], 
-                    "type": str(c["type"]), 
-                    "nullable": c.get("nullable", True), 
-                    "primary_key": bool(c.get("primary_key", False)) or (c["name"] in pk_cols), 
-                    "autoincrement": bool(c.get("autoincrement", False))
-                } 
-                for c in cols
-            ]
-        return self.service.run_dynamic_query(db_id, _op)
+        return self.service.run_dynamic_query(db_id, lambda conn: self._columns_for(conn, db_id, schema, table))
 
     def get_indexes(self, db_id: str, schema: str, table: str) -> List[Dict[str, Any]]:
         """Lists all indices defined on a database table."""
@@ -204,7 +233,7 @@ class SqlMetadataProvider:
                 return []
             try:
                 return [{"indexname": idx["name"], "indexdef": str(idx["column_names"])} 
-                        for idx in inspect(conn).get_indexes(table, schema=schema)]
+                        for idx in self._inspector(conn, db_id).get_indexes(table, schema=schema)]
             except Exception:
                 return []
         return self.service.run_dynamic_query(db_id, _op)
@@ -215,7 +244,7 @@ class SqlMetadataProvider:
             if conn.dialect.name in ['clickhouse', 'clickhousedb']:
                 return []
             try:
-                fks = inspect(conn).get_foreign_keys(table, schema=schema)
+                fks = self._inspector(conn, db_id).get_foreign_keys(table, schema=schema)
                 return [{
                     "constraint": fk.get("name"),
                     "column": ", ".join(fk["constrained_columns"]),
@@ -313,6 +342,40 @@ class SqlMetadataProvider:
             return {}
         return self.service.run_dynamic_query(db_id, _op)
 
+    def get_table_stats(self, db_id: str, schema: str, exact: bool = False) -> List[Dict[str, Any]]:
+        """
+        Returns row counts and byte sizes for every table of a schema.
+        Counts come from planner statistics in a single catalog query and are approximate
+        (None where the catalog has no estimate); `exact=True` replaces them with COUNT(*)
+        results, batched into UNION ALL statements. Each row's `exact` flag says which it got.
+        """
+        def _op(conn):
+            try:
+                stats = self._estimated_table_stats(conn, db_id, schema)
+            except Exception as e:
+                logger.warning(f"Could not read table statistics for {schema}: {e}")
+                # A failed statement aborts the transaction on Postgres; the fallback needs a clean one
+                conn.rollback()
+                stats = {name: {"row_count": None, "total_bytes": None} for name in self._list_tables(conn, db_id, schema)}
+
+            if exact and stats:
+                for name, count in self._exact_row_counts(conn, schema, list(stats)).items():
+                    stats[name]["row_count"] = count
+                    stats[name]["exact"] = True
+            return [
+                {
+                    "table": name,
+                    "row_count": entry.get("row_count"),
+                    "total_bytes": entry.get("total_bytes"),
+                    "data_bytes": entry.get("data_bytes"),
+                    "index_bytes": entry.get("index_bytes"),
+                    "total_size": self._format_bytes(entry.get("total_bytes")),
+                    "exact": entry.get("exact", False),
+                }
+                for name, entry in sorted(stats.items())
+            ]
+        return self.service.run_dynamic_query(db_id, _op)
+
     def get_table_ddl(self, db_id: str, schema: str, table: str) -> str:
         """Constructs a CREATE TABLE statement, using native DDL when possible."""
         def _op(conn):
@@ -370,7 +433,7 @@ class SqlMetadataProvider:
                 cols_data = self.get_columns(db_id, schema, table)
                 
                 try:
-                    pks = inspect(conn).get_pk_constraint(table, schema=schema).get("constrained_columns", [])
+                    pks = self._inspector(conn, db_id).get_pk_constraint(table, schema=schema).get("constrained_columns", [])
                 except Exception:
                     pks = []
                 
@@ -446,7 +509,7 @@ class SqlMetadataProvider:
             if conn.dialect.name in ['clickhouse', 'clickhousedb', 'sqlite', 'duckdb']:
                 # These databases don't support optimized batch FK retrieval via information_schema
                 # Force inspector fallback
-                return self._inspector_fk_fallback(conn, schema)
+                return self._inspector_fk_fallback(conn, db_id, schema)
             
             # Oracle: use ALL_CONSTRAINTS + ALL_CONS_COLUMNS for foreign keys
             if conn.dialect.name == 'oracle':
@@ -562,7 +625,7 @@ class SqlMetadataProvider:
                     """)
                     res = conn.execute(query, {"schema": schema})
                 except Exception:
-                    return self._inspector_fk_fallback(conn, schema)
+                    return self._inspector_fk_fallback(conn, db_id, schema)
             
             try:
                 all_fks = []
@@ -578,14 +641,226 @@ class SqlMetadataProvider:
                 return all_fks
             except Exception as e:
                 logger.warning(f"Optimized FK fetch failed, using inspector fallback: {e}")
-                return self._inspector_fk_fallback(conn, schema)
+                return self._inspector_fk_fallback(conn, db_id, schema)
 
         return self.service.run_dynamic_query(db_id, _op)
 
-    def _inspector_fk_fallback(self, conn, schema: str) -> List[Dict[str, Any]]:
+    # --- Private Helpers ---
+
+    def _inspector(self, conn, db_id: str):
+        """Binds an Inspector to the connection, sharing the database's reflection cache."""
+        inspector = inspect(conn)
+        inspector.info_cache = inspector_cache.info_cache_for(db_id)
+        return inspector
+
+    def _estimated_table_stats(self, conn, db_id: str, schema: str) -> Dict[str, Dict[str, Any]]:
+        """Reads per-table row estimates and sizes for a whole schema from the catalog."""
+        dialect = conn.dialect.name
+
+        if dialect in ['clickhouse', 'clickhousedb']:
+            target_schema = 'default' if schema == 'public' else schema
+            # MergeTree part metadata holds exact row counts, so no scan is needed
+            res = conn.execute(text("""
+                SELECT table, sum(rows), sum(bytes_on_disk) FROM system.parts
+                WHERE database = :schema AND active GROUP BY table
+            """), {"schema": target_schema})
+            stats = {row[0]: {"row_count": int(row[1] or 0), "total_bytes": int(row[2] or 0), "exact": True} for row in res}
+            for name in self._list_tables(conn, db_id, schema):
+                stats.setdefault(name, {"row_count": 0, "total_bytes": 0, "exact": True})
+            return stats
+
+        if dialect == 'postgresql':
+            # reltuples is -1 for never-analyzed tables (PG14+); fall back to the stats collector
+            res = conn.execute(text("""
+                SELECT c.relname,
+                       CASE WHEN c.reltuples < 0 THEN s.n_live_tup ELSE c.reltuples::bigint END,
+                       pg_total_relation_size(c.oid),
+                       pg_relation_size(c.oid)
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                WHERE n.nspname = :schema AND c.relkind IN ('r', 'p', 'm')
+            """), {"schema": schema})
+            return {
+                row[0]: {
+                    "row_count": int(row[1]) if row[1] is not None else None,
+                    "total_bytes": row[2],
+                    "data_bytes": row[3],
+                    "index_bytes": row[2] - row[3] if row[2] is not None and row[3] is not None else None,
+                }
+                for row in res
+            }
+
+        if dialect == 'mysql':
+            res = conn.execute(text("""
+                SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+                FROM INFORMATION_SCHEMA.TABLES
+                WHERE TABLE_SCHEMA = :schema AND TABLE_TYPE = 'BASE TABLE'
+            """), {"schema": schema})
+            return {
+                row[0]: {
+                    "row_count": row[1],
+                    "total_bytes": (row[2] or 0) + (row[3] or 0),
+                    "data_bytes": row[2],
+                    "index_bytes": row[3],
+                }
+                for row in res
+            }
+
+        if dialect == 'mssql':
+            # Partition metadata: heap/clustered index rows, pages reserved by every index (needs VIEW DATABASE STATE)
+            res = conn.execute(text("""
+                SELECT t.name,
+                       SUM(CASE WHEN ps.index_id IN (0, 1) THEN ps.row_count ELSE 0 END),
+                       SUM(ps.reserved_page_count) * 8192,
+                       SUM(CASE WHEN ps.index_id IN (0, 1) THEN ps.reserved_page_count ELSE 0 END) * 8192
+                FROM sys.dm_db_partition_stats ps
+                JOIN sys.tables t ON t.object_id = ps.object_id
+                JOIN sys.schemas s ON s.schema_id = t.schema_id
+                WHERE s.name = :schema
+                GROUP BY t.name
+            """), {"schema": schema})
+            return {
+                row[0]: {
+                    "row_count": int(row[1]) if row[1] is not None else None,
+                    "total_bytes": row[2],
+                    "data_bytes": row[3],
+                    "index_bytes": row[2] - row[3] if row[2] is not None and row[3] is not None else None,
+                }
+                for row in res
+            }
+
+        if dialect == 'oracle':
+            owner = schema.upper()
+            res = conn.execute(text("SELECT TABLE_NAME, NUM_ROWS FROM ALL_TABLES WHERE OWNER = :schema"), {"schema": owner})
+            stats = {row[0]: {"row_count": row[1], "total_bytes": None} for row in res}
+            try:
+                # Segment sizes may require DBA privileges; counts are still useful without them
+                res = conn.execute(text("""
+                    SELECT SEGMENT_NAME, SUM(BYTES) FROM DBA_SEGMENTS
+                    WHERE OWNER = :schema AND SEGMENT_TYPE LIKE 'TABLE%' GROUP BY SEGMENT_NAME
+                """), {"schema": owner})
+                for name, size in res:
+                    if name in stats:
+                        stats[name]["total_bytes"] = size
+            except Exception:
+                pass
+            return stats
+
+        if dialect == 'duckdb':
+            # duckdb-engine reports schemas as "<catalog>.<schema>"
+            catalog, _, schema_name = schema.rpartition('.')
+            res = conn.execute(text("""
+                SELECT table_name, estimated_size FROM duckdb_tables()
+                WHERE schema_name = :schema AND (:catalog = '' OR database_name = :catalog)
+            """), {"schema": schema_name, "catalog": catalog})
+            return {row[0]: {"row_count": row[1], "total_bytes": None} for row in res}
+
+        if dialect == 'sqlite':
+            stats = {name: {"row_count": None, "total_bytes": None} for name in self._list_tables(conn, db_id, schema)}
+            prefix = self._quote(conn, schema) + "." if schema and schema != 'main' else ""
+            try:
+                # sqlite_stat1 only exists after ANALYZE; its first number is the row estimate
+                for tbl, stat in conn.execute(text(f"SELECT tbl, stat FROM {prefix}sqlite_stat1")):
+                    if tbl in stats and stat and stats[tbl]["row_count"] is None:
+                        stats[tbl]["row_count"] = int(stat.split()[0])
+            except Exception:
+                pass
+            try:
+                # dbstat is optional (SQLITE_ENABLE_DBSTAT_VTAB); sizes stay unknown without it
+                res = conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat WHERE schema = :schema GROUP BY name"), {"schema": schema or 'main'})
+                for name, size in res:
+                    if name in stats:
+                        stats[name]["total_bytes"] = size
+            except Exception:
+                pass
+            # Tables without ANALYZE data have no estimate; counting them is left to exact=True
+            return stats
+
+        return {name: {"row_count": None, "total_bytes": None} for name in self._list_tables(conn, db_id, schema)}
+
+    def _exact_row_counts(self, conn, schema: str, tables: List[str]) -> Dict[str, int]:
+        """Counts rows of many tables with one UNION ALL statement per batch."""
+        counts: Dict[str, int] = {}
+        if conn.dialect.name in ['clickhouse', 'clickhousedb']:
+            schema = 'default' if schema == 'public' else schema
+        if not schema:
+            qualifier = ""
+        elif conn.dialect.name == 'duckdb':
+            qualifier = ".".join(self._quote(conn, part) for part in schema.split('.')) + "."
+        else:
+            qualifier = self._quote(conn, schema) + "."
+        for start in range(0, len(tables), EXACT_COUNT_BATCH):
+            batch = tables[start:start + EXACT_COUNT_BATCH]
+            parts = [
+                f"SELECT :t{i} AS table_name, COUNT(*) AS row_count FROM {qualifier}{self._quote(conn, name)}"
+                for i, name in enumerate(batch)
+            ]
+            params = {f"t{i}": name for i, name in enumerate(batch)}
+            for name, count in conn.execute(text(" UNION ALL ".join(parts)), params):
+                counts[name] = int(count)
+        return counts
+
+    @staticmethod
+    def _quote(conn, identifier: str) -> str:
+        return conn.dialect.identifier_preparer.quote(identifier)
+
+    @staticmethod
+    def _format_bytes(size: Optional[int]) -> Optional[str]:
+        return f"{size / 1024 / 1024:.2f} MB" if size is not None else None
+
+    def _list_tables(self, conn, db_id: str, schema: str) -> List[str]:
+        """Lists base tables on an open connection, excluding views."""
+        if conn.dialect.name in ['clickhouse', 'clickhousedb']:
+            target_schema = 'default' if schema == 'public' else schema
+            # Filter out views from table list for ClickHouse
+            res = conn.execute(text(f"SELECT name FROM system.tables WHERE database = :schema AND engine NOT LIKE '%View'"), {"schema": target_schema})
+            return [row[0] for row in res]
+        return self._inspector(conn, db_id).get_table_names(schema=schema)
+
+    def _list_views(self, conn, db_id: str, schema: str) -> List[str]:
+        """Lists views on an open connection."""
+        if conn.dialect.name in ['clickhouse', 'clickhousedb']:
+            target_schema = 'default' if schema == 'public' else schema
+            res = conn.execute(text(f"SELECT name FROM system.tables WHERE database = :schema AND engine LIKE '%View'"), {"schema": target_schema})
+            return [row[0] for row in res]
+        return self._inspector(conn, db_id).get_view_names(schema=schema)
+
+    def _columns_for(self, conn, db_id: str, schema: str, table: str) -> List[Dict[str, Any]]:
+        """Reflects the columns of one table on an open connection."""
+        if conn.dialect.name in ['clickhouse', 'clickhousedb']:
+            target_schema = 'default' if schema == 'public' else schema
+            res = conn.execute(text(f"DESCRIBE TABLE `{target_schema}`.`{table}`"))
+            return [{"name": row[0], "type": row[1], "nullable": True} for row in res]
+
+        inspector = self._inspector(conn, db_id)
+        cols = inspector.get_columns(table, schema=schema)
+        try:
+            pk_constraint = inspector.get_pk_constraint(table, schema=schema)
+            pk_cols = pk_constraint.get("constrained_columns", [])
+        except Exception:
+            pk_cols = []
+
+        return [
+            {
+                "name": c["name"],
+                "type": str(c["type"]),
+                "nullable": c.get("nullable", True),
+                "primary_key": bool(c.get("primary_key", False)) or (c["name"] in pk_cols),
+                "autoincrement": bool(c.get("autoincrement", False))
+            }
+            for c in cols
+        ]
+
+    def _reflect_columns(self, engine, db_id: str, schema: str, table: str) -> List[Dict[str, Any]]:
+        """Worker task: reflects one table on its own pooled connection."""
+        with engine.connect() as conn:
+            return self._columns_for(conn, db_id, schema, table)
+
+    def _inspector_fk_fallback(self, conn, db_id: str, schema: str) -> List[Dict[str, Any]]:
         """Fallback method to discover foreign keys using inspector.get_foreign_keys."""
         try:
-            inspector = inspect(conn)
+            inspector = self._inspector(conn, db_id)
             tables = inspector.get_table_names(schema=schema)
             all_fks = []
             for table in tables:
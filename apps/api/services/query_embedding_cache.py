@@ -0,0 +1,137 @@
+"""
+query_embedding_cache.py
+
+Two-level cache for intent embeddings: an in-process LRU in front of the
+`query_embeddings` table in the metadata store. Keys are the embedding model plus
+the normalized intent text, so repeated or re-phrased-by-whitespace prompts (and
+autocomplete keystrokes inside the same word) reuse one vector instead of calling
+the embedding API again. Normalization only builds the key: the vector is embedded
+from the first phrasing seen, as the user wrote it. Persisted rows survive restarts
+and are pruned by last use.
+"""
+
+import re
+import hashlib
+import logging
+import datetime
+import unicodedata
+from typing import Callable, List, Optional, Sequence
+
+from models.metadata import SessionLocal, QueryEmbedding
+from utils.ttl_cache import TTLCache
+from utils.vector_codec import encode_vector, decode_vector
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+QUERY_CACHE_MEMORY_SIZE = 2048           # Vectors kept in process (LRU)
+QUERY_CACHE_MEMORY_TTL = 24 * 3600       # Seconds before an in-process entry is re-read
+QUERY_CACHE_MAX_ROWS = 20_000            # Persisted rows kept; least recently used are pruned
+QUERY_CACHE_PRUNE_EVERY = 200            # Inserts between prune passes
+# ─────────────────────────────────────────────────────────────────────────────
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_intent(text: str) -> str:
+    """Canonical form used as the cache key: NFKC, case-folded, whitespace collapsed."""
+    text = unicodedata.normalize('NFKC', text or '')
+    return _WHITESPACE_RE.sub(' ', text).strip().casefold()
+
+
+def drop_partial_word(prefix: str) -> str:
+    """
+    Removes the word still being typed at the end of an autocomplete prefix, so every
+    keystroke inside one word maps to the same intent (and the same cache entry).
+    """
+    if not prefix or prefix[-1].isspace():
+        return prefix
+    match = re.search(r'[\w.]+$', prefix)
+    return prefix[:match.start()] if match else prefix
+
+
+class QueryEmbeddingCache:
+    """Looks intents up in memory, then in the metadata store, then embeds and stores them."""
+
+    def __init__(self, memory_size: int = QUERY_CACHE_MEMORY_SIZE, memory_ttl: float = QUERY_CACHE_MEMORY_TTL):
+        self._memory = TTLCache(maxsize=memory_size, ttl=memory_ttl)
+        self._inserts = 0
+
+    def get_or_embed(self, text: str, model: str, embed: Callable[[str], Sequence[float]]) -> List[float]:
+        """
+        Returns the cached vector for (model, normalized text), calling `embed` only on a miss.
+        A miss embeds `text` unchanged; case and spacing can carry meaning the model should see.
+        """
+        key = self._key(model, normalize_intent(text))
+
+        vector = self._memory.get(key)
+        if vector is not None:
+            return vector
+
+        vector = self._load(key)
+        if vector is None:
+            vector = list(embed(text))
+            if vector:
+                self._store(key, model, text, vector)
+        if vector:
+            self._memory.set(key, vector)
+        return vector
+
+    def clear_memory(self):
+        """Drops the in-process layer (persisted rows are kept)."""
+        self._memory.clear()
+
+    # --- Private Helpers ---
+
+    @staticmethod
+    def _key(model: str, normalized: str) -> str:
+        return hashlib.sha256(f"{model}\n{normalized}".encode('utf-8')).hexdigest()
+
+    def _load(self, key: str) -> Optional[List[float]]:
+        """Reads a persisted vector and marks it used; store errors degrade to a miss."""
+        session = SessionLocal()
+        if session is None:
+            return None
+        try:
+            row = session.get(QueryEmbedding, key)
+            if row is None:
+                return None
+            row.hits = (row.hits or 0) + 1
+            row.lastUsed = datetime.datetime.utcnow()
+            session.commit()
+            return decode_vector(row.vector).tolist()
+        except Exception as e:
+            logger.warning(f"Query embedding lookup failed: {e}")
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+    def _store(self, key: str, model: str, text: str, vector: Sequence[float]):
+        session = SessionLocal()
+        if session is None:
+            return
+        try:
+            blob, _, _ = encode_vector(vector, 'float32')
+            session.merge(QueryEmbedding(id=key, model=model, text=text, vector=blob, hits=0))
+            session.commit()
+            self._inserts += 1
+            if self._inserts % QUERY_CACHE_PRUNE_EVERY == 0:
+                self._prune(session)
+        except Exception as e:
+            logger.warning(f"Query embedding store failed: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
+    def _prune(self, session):
+        """Keeps the QUERY_CACHE_MAX_ROWS most recently used rows."""
+        cutoff = session.query(QueryEmbedding.lastUsed).order_by(QueryEmbedding.lastUsed.desc()) \
+            .offset(QUERY_CACHE_MAX_ROWS).limit(1).scalar()
+        if cutoff is not None:
+            deleted = session.query(QueryEmbedding).filter(QueryEmbedding.lastUsed <= cutoff).delete(synchronize_session=False)
+            session.commit()
+            logger.info(f"Pruned {deleted} cached query embeddings")
+
+
+query_embedding_cache = QueryEmbeddingCache()
@@ -5,10 +5,12 @@ Service for semantic schema linking using RAG.
 Identifies relevant tables for a user's SQL natural language request.
 """
 import os
+import time
 import uuid
-import math
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 try:
@@ -20,10 +22,24 @@ except ImportError:
 
 from models.metadata import SessionLocal, SchemaEmbedding, Db, UserAIConfig
 from services.metadata import metadata_service
-from services.ai.base import _get_system_api_key
+from services.ai.base import _get_system_api_key, embed_content
+from services.ai.gateway import ai_gateway
+from services.vector_index import vector_index
+from services.lexical_ranker import bm25_rank, table_terms
+from services.query_embedding_cache import query_embedding_cache
+from utils.vector_codec import encode_vector, decode_vector, VECTOR_FORMATS
 
 logger = logging.getLogger(__name__)
 
+# ─── Configuration ────────────────────────────────────────────────────────────
+EMBED_BATCH_SIZE = 100            # Texts per embed_content call (the batch API maximum)
+INDEX_MAX_CONCURRENCY = 1         # Background indexing jobs running at once
+INDEX_RETRY_SECONDS = 300         # Lazy re-scheduling pause after a job finished without vectors
+# Blob format for stored vectors: float32, float16 (half size) or int8 (quantized, quarter size)
+EMBEDDING_STORAGE_FORMAT = os.getenv("EMBEDDING_STORAGE_FORMAT", "float32")
+MIGRATION_BATCH_SIZE = 500        # Legacy JSON rows converted per transaction
+# ─────────────────────────────────────────────────────────────────────────────
+
 class SchemaRetriever:
     """
     Handles indexing and weighted retrieval of schema elements.
@@ -32,71 +48,77 @@ class SchemaRetriever:
 
     def __init__(self):
         self.embedding_model = "models/gemini-embedding-2-preview"
-        # Delay initialization of Gemini to first use or use a safe wrapper
-        self._api_configured = False
-
-    def _ensure_genai(self):
-        """Ensures the GenerativeAI SDK is configured with an API key."""
-        if not self._api_configured:
-            api_key = _get_system_api_key()
-            if HAS_GENAI and api_key:
-                try:
-                    genai.configure(api_key=api_key)
-                    self._api_configured = True
-                except Exception as e:
-                    logger.error(f"Failed to configure GenAI for embeddings: {e}")
-        return self._api_configured
+        self._jobs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._jobs_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
 
     def index_database(self, database_id: str, schema: str = "public"):
         """
         Creates/Refreshes semantic indices for all tables in a database.
+        Only new or changed table descriptions (or vectors from another embedding model)
+        are embedded, in batched requests; rows for dropped tables are removed and
+        unchanged rows are left alone.
         """
         if not HAS_GENAI or not genai:
             return False
 
-        # Re-configure in case key changed
-        api_key = _get_system_api_key()
-        if api_key: genai.configure(api_key=api_key)
-
         session = SessionLocal()
         try:
             # Fetch all columns to build representative text for each table
             table_columns = metadata_service.get_all_columns(database_id, schema)
-            
-            # Remove existing indices for this DB/schema to avoid duplicates on refresh
-            session.query(SchemaEmbedding).filter_by(databaseId=database_id, schema=schema).delete()
-            
-            for table_name, cols in table_columns.items():
-                # Build a descriptive string: "Table [name] with columns: [col1], [col2], ..."
-                col_names = ", ".join([c['name'] for c in cols])
-                search_text = f"Table {table_name} with columns: {col_names}"
-                
-                # Get embeddings
-                # Note: GenAI content generation might be rate limited; batching would be better for LARGE schemas
-                embedding_res = genai.embed_content(
-                    model=self.embedding_model,
-                    content=search_text,
-                    task_type="RETRIEVAL_DOCUMENT"
-                )
-                
-                vector = embedding_res.get('embedding', [])
-                
-                embedding_entry = SchemaEmbedding(
-                    id=str(uuid.uuid4()),
-                    databaseId=database_id,
-                    schema=schema,
-                    tableName=table_name,
-                    tableDescription=search_text,
-                    embedding=vector
-                )
-                session.add(embedding_entry)
-            
+            wanted = {table: self._describe_table(table, cols) for table, cols in table_columns.items()}
+
+            existing: Dict[str, SchemaEmbedding] = {}
+            for row in session.query(SchemaEmbedding).filter_by(databaseId=database_id, schema=schema):
+                # Tables that disappeared (or duplicate rows) are dropped
+                if row.tableName not in wanted or row.tableName in existing:
+                    session.delete(row)
+                else:
+                    existing[row.tableName] = row
+            removed = len(session.deleted)
             session.commit()
-            logger.info(f"Indexed {len(table_columns)} tables for database {database_id}")
+
+            # Description text plus model is the content key: an unchanged pair needs no new vector
+            stale = [
+                t for t, text in wanted.items()
+                if t not in existing or existing[t].tableDescription != text
+                or existing[t].embeddingModel != self.embedding_model
+            ]
+            for start in range(0, len(stale), EMBED_BATCH_SIZE):
+                batch = stale[start:start + EMBED_BATCH_SIZE]
+                vectors = self._embed_batch([wanted[t] for t in batch], "RETRIEVAL_DOCUMENT")
+                for table_name, vector in zip(batch, vectors):
+                    row = existing.get(table_name)
+                    if row is None:
+                        session.add(SchemaEmbedding(
+                            id=str(uuid.uuid4()),
+                            databaseId=database_id,
+                            schema=schema,
+                            tableName=table_name,
+                            tableDescription=wanted[table_name],
+                            embeddingModel=self.embedding_model,
+                            **self._packed(vector)
+                        ))
+                    else:
+                        row.tableDescription = wanted[table_name]
+                        row.embeddingModel = self.embedding_model
+                        for field, value in self._packed(vector).items():
+                            setattr(row, field, value)
+                # Commit per batch: short transactions, and progress survives a later failure
+                session.commit()
+
+            if stale or removed:
+                vector_index.invalidate(database_id, schema)
+            logger.info(
+                f"Indexed database {database_id} ({schema}): {len(stale)} embedded, "
+                f"{len(wanted) - len(stale)} unchanged, {removed} removed"
+            )
             return True
         except Exception as e:
             logger.error(f"Failed to index database {database_id}: {e}")
             session.rollback()
+            # Batches committed before the failure are already visible
+            vector_index.invalidate(database_id, schema)
             return False
         finally:
             session.close()
@@ -108,41 +130,28 @@ class SchemaRetriever:
         if not HAS_GENAI or not genai:
             return []
 
-        # Re-configure in case key changed
-        api_key = _get_system_api_key()
-        if api_key: genai.configure(api_key=api_key)
-
         session = SessionLocal()
         try:
-            # 1. Get embedding for the user intent
-            embedding_res = genai.embed_content(
-                model=self.embedding_model,
-                content=intent,
-                task_type="RETRIEVAL_QUERY"
+            # 1. Load the in-memory matrix for this DB/schema (rows are read only on a miss).
+            # While a job is still writing batches the stored vectors are partial.
+            entry = None
+            if not self._is_indexing(database_id, schema):
+                entry = vector_index.get_or_build(
+                    database_id, schema, lambda: self._load_vectors(session, database_id, schema)
+                )
+            if entry is None:
+                # Never embed inside the request: index in the background, rank lexically meanwhile
+                self.schedule_index(database_id, schema)
+                return self._lexical_tables(database_id, intent, schema, top_k)
+
+            # 2. Get embedding for the user intent (repeated intents are served from cache)
+            query_vector = query_embedding_cache.get_or_embed(
+                intent, self.embedding_model,
+                lambda text: self._embed(text, "RETRIEVAL_QUERY").get('embedding', [])
             )
-            query_vector = embedding_res.get('embedding', [])
-            
-            # 2. Fetch all table embeddings for this DB
-            stored_embeddings = session.query(SchemaEmbedding).filter_by(databaseId=database_id, schema=schema).all()
-            
-            if not stored_embeddings:
-                # If no indexing has been done, index now (lazy indexing)
-                logger.info(f"Triggering lazy indexing for {database_id}")
-                self.index_database(database_id, schema)
-                stored_embeddings = session.query(SchemaEmbedding).filter_by(databaseId=database_id, schema=schema).all()
-
-            if not stored_embeddings:
-                return []
-
-            # 3. Calculate Cosine Similarity
-            scored_tables = []
-            for entry in stored_embeddings:
-                sim = self._cosine_similarity(query_vector, entry.embedding)
-                scored_tables.append((entry.tableName, sim))
-            
-            # 4. Sort and return top K
-            scored_tables.sort(key=lambda x: x[1], reverse=True)
-            return [t[0] for t in scored_tables[:top_k]]
+
+            # 3. Rank with one matrix-vector product and a top-k partition
+            return [name for name, _ in vector_index.search(entry, query_vector, top_k)]
 
         except Exception as e:
             logger.error(f"Error retrieving relevant tables: {e}")
@@ -150,18 +159,142 @@ class SchemaRetriever:
         finally:
             session.close()
 
-    def _cosine_similarity(self, v1: List[float], v2: List[float]) -> float:
-        """Pure Python cosine similarity calculation."""
-        if not v1 or not v2 or len(v1) != len(v2):
-            return 0.0
-        
-        dot_product = sum(a * b for a, b in zip(v1, v2))
-        magnitude_v1 = math.sqrt(sum(a * a for a in v1))
-        magnitude_v2 = math.sqrt(sum(b * b for b in v2))
-        
-        if magnitude_v1 == 0 or magnitude_v2 == 0:
-            return 0.0
-            
-        return dot_product / (magnitude_v1 * magnitude_v2)
+    def schedule_index(self, database_id: str, schema: str = "public", force: bool = False) -> Dict[str, Any]:
+        """
+        Queues a background (re-)index and returns its job status. A queued or running
+        job is never duplicated; without `force`, a recently finished job is not re-run.
+        """
+        key = (database_id, schema)
+        with self._jobs_lock:
+            job = self._jobs.get(key)
+            if job and job["status"] in ("queued", "running"):
+                return dict(job)
+            if job and not force and time.time() - job["finishedAt"] < INDEX_RETRY_SECONDS:
+                return dict(job)
+            job = {
+                "status": "queued", "databaseId": database_id, "schema": schema,
+                "queuedAt": time.time(), "startedAt": None, "finishedAt": None, "error": None,
+            }
+            self._jobs[key] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=INDEX_MAX_CONCURRENCY, thread_name_prefix="schema-index")
+            executor = self._executor
+        executor.submit(self._run_index_job, job)
+        return dict(job)
+
+    def index_status(self, database_id: str, schema: str = "public") -> Dict[str, Any]:
+        """Reports the latest indexing job and how many tables currently have vectors."""
+        job = self._jobs.get((database_id, schema))
+        status = dict(job) if job else {"status": "idle", "databaseId": database_id, "schema": schema}
+        session = SessionLocal()
+        try:
+            status["indexedTables"] = session.query(SchemaEmbedding).filter_by(databaseId=database_id, schema=schema).count()
+        finally:
+            session.close()
+        return status
+
+    def migrate_storage(self, fmt: Optional[str] = None) -> int:
+        """
+        Converts rows still holding JSON vectors to the binary format, in batches.
+        Rows without any usable vector are removed so the next index run re-embeds them.
+        Returns the number of rows converted.
+        """
+        session = SessionLocal()
+        converted = 0
+        try:
+            while True:
+                rows = session.query(SchemaEmbedding).filter(SchemaEmbedding.vector.is_(None)).limit(MIGRATION_BATCH_SIZE).all()
+                if not rows:
+                    break
+                for row in rows:
+                    if row.embedding:
+                        for field, value in self._packed(row.embedding, fmt).items():
+                            setattr(row, field, value)
+                        converted += 1
+                    else:
+                        session.delete(row)
+                session.commit()
+            if converted:
+                logger.info(f"Migrated {converted} schema embeddings to {fmt or EMBEDDING_STORAGE_FORMAT} blobs")
+            return converted
+        except Exception as e:
+            logger.error(f"Schema embedding storage migration failed: {e}")
+            session.rollback()
+            return converted
+        finally:
+            session.close()
+
+    # --- Private Helpers ---
+
+    def _run_index_job(self, job: Dict[str, Any]):
+        """Worker: runs one index_database call and records the outcome on the job."""
+        job["status"] = "running"
+        job["startedAt"] = time.time()
+        try:
+            ok = self.index_database(job["databaseId"], job["schema"])
+            job["status"] = "done" if ok else "failed"
+            if not ok:
+                job["error"] = "Indexing failed; embeddings are unavailable for this schema"
+        except Exception as e:
+            logger.error(f"Background indexing failed for {job['databaseId']}: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finishedAt"] = time.time()
+
+    def _is_indexing(self, database_id: str, schema: str) -> bool:
+        job = self._jobs.get((database_id, schema))
+        return bool(job) and job["status"] in ("queued", "running")
+
+    def _lexical_tables(self, database_id: str, intent: str, schema: str, top_k: int) -> List[str]:
+        """BM25 over table and column names; the fallback until vectors exist."""
+        table_columns = metadata_service.get_all_columns(database_id, schema) or {}
+        documents = {table: table_terms(table, cols) for table, cols in table_columns.items()}
+        return [name for name, _ in bm25_rank(intent, documents, top_k)]
+
+    @staticmethod
+    def _describe_table(table_name: str, cols: List[Dict[str, Any]]) -> str:
+        """Builds a descriptive string: "Table [name] with columns: [col1], [col2], ..."."""
+        col_names = ", ".join([c['name'] for c in cols])
+        return f"Table {table_name} with columns: {col_names}"
+
+    def _embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """Embeds several texts in one request; the API returns one vector per input."""
+        vectors = self._embed(texts, task_type).get('embedding', [])
+        if len(vectors) != len(texts):
+            raise ValueError(f"Embedding API returned {len(vectors)} vectors for {len(texts)} inputs")
+        return vectors
+
+    def _embed(self, content, task_type: str) -> Dict[str, Any]:
+        """One embed_content request, admitted by the AI gateway and sent with the system key."""
+        api_key = _get_system_api_key()
+        return ai_gateway.call(
+            lambda: embed_content(api_key, model=self.embedding_model, content=content, task_type=task_type),
+            api_key=api_key
+        )
+
+    @staticmethod
+    def _packed(vector, fmt: Optional[str] = None) -> Dict[str, Any]:
+        """Column values for a vector in binary form; the legacy JSON column is emptied."""
+        fmt = fmt or EMBEDDING_STORAGE_FORMAT
+        if fmt not in VECTOR_FORMATS:
+            logger.warning(f"Unknown EMBEDDING_STORAGE_FORMAT '{fmt}', using float32")
+            fmt = 'float32'
+        blob, fmt, scale = encode_vector(vector, fmt)
+        return {"vector": blob, "vectorFormat": fmt, "vectorScale": scale, "embedding": []}
+
+    def _load_vectors(self, session, database_id: str, schema: str) -> List[tuple]:
+        """
+        Reads (table, vector) pairs for one schema; blobs are decoded with frombuffer, not parsed.
+        Only vectors from the current embedding model are comparable with its query vectors.
+        """
+        rows = session.query(
+            SchemaEmbedding.tableName, SchemaEmbedding.vector, SchemaEmbedding.vectorFormat,
+            SchemaEmbedding.vectorScale, SchemaEmbedding.embedding
+        ).filter_by(databaseId=database_id, schema=schema, embeddingModel=self.embedding_model).all()
+        return [
+            (name, decode_vector(blob, fmt, scale) if blob is not None else legacy)
+            for name, blob, fmt, scale, legacy in rows
+        ]
 
 schema_retriever = SchemaRetriever()
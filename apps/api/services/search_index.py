@@ -0,0 +1,308 @@
+"""
+search_index.py
+
+Local full-text index of database objects (schemas, tables, views, columns, routines)
+across every registered connection. Backed by SQLite FTS5 with the trigram tokenizer,
+so substring searches like "cust" match "dim_customer.customer_id" in milliseconds.
+The index is fed incrementally from the metadata cache: each cached slice
+(db, schema, kind) replaces only its own rows, unchanged slices are skipped, and
+an invalidation drops the rows of the invalidated database or schema.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from models.metadata import SessionLocal, Db
+from services.metadata import metadata_service
+from services.metadata.cache import metadata_cache
+
+logger = logging.getLogger(__name__)
+
+# Metadata cache kinds that feed the index, mapped to the object kind they produce
+INDEXED_KINDS = {
+    'schemas': 'schema',
+    'tables': 'table',
+    'views': 'view',
+    'columns': 'column',
+    'functions': 'function',
+    'procedures': 'procedure',
+}
+
+# Trigram matching needs at least three characters; shorter queries use a prefix scan
+MIN_TRIGRAM_QUERY = 3
+
+
+def _default_index_path() -> str:
+    """Places the index next to the Zero-Setup metadata store unless overridden."""
+    override = os.getenv("SEARCH_INDEX_PATH")
+    if override:
+        return override
+    data_dir = Path.home() / '.quriodb'
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return str(data_dir / 'search_index.db')
+
+
+class ObjectSearchIndex:
+    """
+    Maintains and queries the object search index.
+    Writes are serialized on a single background worker; reads open short-lived connections.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._initialized = False
+        self._trigram = True
+        self._init_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+
+    # --- Public API ---
+
+    def on_cache_update(self, db_id: str, schema: Optional[str], kind: Optional[str], value: Any):
+        """Metadata cache listener: queues an incremental refresh of the changed slice."""
+        if kind is None:
+            # Invalidation: the objects may be gone, so drop them until they are cached again
+            self._writer.submit(self._safe_remove, db_id, schema)
+            return
+        if kind not in INDEXED_KINDS or value is None:
+            return
+        self._writer.submit(self._safe_index_slice, db_id, schema or '', kind, value)
+
+    def index_slice(self, db_id: str, schema: str, kind: str, value: Any) -> bool:
+        """
+        Replaces the rows of one (db, schema, kind) slice.
+        Returns False when the slice content is unchanged and nothing was written.
+        """
+        rows = list(self._rows_for(db_id, schema, kind, value))
+        digest = hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()
+
+        conn = self._connect()
+        try:
+            current = conn.execute(
+                "SELECT digest FROM object_search_slices WHERE database_id = ? AND schema_name = ? AND kind = ?",
+                (db_id, schema, kind)
+            ).fetchone()
+            if current and current[0] == digest:
+                return False
+
+            with conn:
+                conn.execute(
+                    "DELETE FROM object_search WHERE database_id = ? AND schema_name = ? AND source = ?",
+                    (db_id, schema, kind)
+                )
+                conn.executemany(
+                    "INSERT INTO object_search (name, path, kind, parent, database_id, schema_name, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO object_search_slices (database_id, schema_name, kind, digest, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (db_id, schema, kind, digest, time.time())
+                )
+            return True
+        finally:
+            conn.close()
+
+    def remove_database(self, db_id: str, schema: Optional[str] = None):
+        """
+        Drops every indexed object of a connection, or only one schema's objects along with
+        the connection-level slices (the schema list), mirroring a metadata cache invalidation.
+        """
+        where, params = "database_id = ?", [db_id]
+        if schema is not None:
+            where, params = "database_id = ? AND schema_name IN (?, '')", [db_id, schema]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(f"DELETE FROM object_search WHERE {where}", params)
+                conn.execute(f"DELETE FROM object_search_slices WHERE {where}", params)
+        finally:
+            conn.close()
+
+    def refresh_database(self, db_id: str):
+        """Walks every schema of a connection through the metadata cache, indexing as it goes."""
+        schemas = metadata_service.get_schemas(db_id)
+        for schema in schemas:
+            metadata_service.get_tables(db_id, schema)
+            metadata_service.get_views(db_id, schema)
+            metadata_service.get_all_columns(db_id, schema)
+            metadata_service.get_functions(db_id, schema)
+            metadata_service.get_procedures(db_id, schema)
+
+    def refresh_all(self):
+        """Refreshes every registered connection in the background."""
+        session = SessionLocal()
+        try:
+            db_ids = [row[0] for row in session.query(Db.id).all()]
+        finally:
+            session.close()
+
+        def _run():
+            for db_id in db_ids:
+                try:
+                    self.refresh_database(db_id)
+                except Exception as e:
+                    logger.warning(f"Search index refresh failed for {db_id}: {e}")
+
+        threading.Thread(target=_run, name="search-index-refresh", daemon=True).start()
+        return len(db_ids)
+
+    def search(self, query: str, database_id: Optional[str] = None, kinds: Optional[List[str]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Finds objects whose name contains the query, best matches first."""
+        query = (query or '').strip()
+        if not query:
+            return []
+
+        filters, params = [], []
+        if self._ready() and self._trigram and len(query) >= MIN_TRIGRAM_QUERY:
+            phrase = '"' + query.replace('"', '""') + '"'
+            filters.append("object_search MATCH ?")
+            params.append(f"name : {phrase}")
+            order = "(lower(name) = lower(?)) DESC, bm25(object_search), length(name)"
+        elif self._trigram:
+            filters.append("name LIKE ? ESCAPE '\\'")
+            params.append(self._escape_like(query) + '%')
+            order = "(lower(name) = lower(?)) DESC, length(name)"
+        else:
+            filters.append("object_search MATCH ?")
+            params.append('name : ' + ' '.join('"' + t.replace('"', '""') + '"*' for t in query.split()))
+            order = "(lower(name) = lower(?)) DESC, bm25(object_search), length(name)"
+
+        if database_id:
+            filters.append("database_id = ?")
+            params.append(database_id)
+        if kinds:
+            filters.append(f"kind IN ({', '.join('?' for _ in kinds)})")
+            params.extend(kinds)
+
+        sql = (
+            "SELECT name, path, kind, parent, database_id, schema_name FROM object_search "
+            f"WHERE {' AND '.join(filters)} ORDER BY {order} LIMIT ?"
+        )
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, (*params, query, int(limit))).fetchall()
+        finally:
+            conn.close()
+
+        db_names = self._database_names({r[4] for r in rows})
+        return [{
+            "name": r[0], "path": r[1], "kind": r[2], "parent": r[3] or None,
+            "databaseId": r[4], "databaseName": db_names.get(r[4]), "schema": r[5] or None
+        } for r in rows]
+
+    # --- Private Helpers ---
+
+    def _safe_index_slice(self, db_id: str, schema: str, kind: str, value: Any):
+        """Background wrapper that never lets an indexing failure escape the worker."""
+        try:
+            self.index_slice(db_id, schema, kind, value)
+        except Exception as e:
+            logger.warning(f"Search indexing failed for {db_id}/{schema}/{kind}: {e}")
+
+    def _safe_remove(self, db_id: str, schema: Optional[str]):
+        """Background wrapper for invalidation-driven removals."""
+        try:
+            self.remove_database(db_id, schema)
+        except Exception as e:
+            logger.warning(f"Search index removal failed for {db_id}/{schema or '*'}: {e}")
+
+    def _rows_for(self, db_id: str, schema: str, kind: str, value: Any) -> Iterable[Tuple]:
+        """Flattens a cached metadata value into index rows."""
+        object_kind = INDEXED_KINDS[kind]
+        if kind == 'schemas':
+            for name in value or []:
+                yield (str(name), str(name), object_kind, '', db_id, '', kind)
+        elif kind == 'columns':
+            for table, columns in (value or {}).items():
+                for col in columns:
+                    name = str(col.get('name'))
+                    yield (name, f"{schema}.{table}.{name}", object_kind, str(table), db_id, schema, kind)
+        else:
+            for name in value or []:
+                yield (str(name), f"{schema}.{name}", object_kind, '', db_id, schema, kind)
+
+    def _database_names(self, db_ids: set) -> Dict[str, str]:
+        """Maps connection ids to display names for the result set."""
+        if not db_ids:
+            return {}
+        session = SessionLocal()
+        try:
+            return {row[0]: row[1] for row in session.query(Db.id, Db.databaseName).filter(Db.id.in_(list(db_ids))).all()}
+        except Exception as e:
+            logger.debug(f"Could not resolve database names for search results: {e}")
+            return {}
+        finally:
+            session.close()
+
+    def _ready(self) -> bool:
+        """Creates the index tables on first use."""
+        if self._initialized:
+            return True
+        with self._init_lock:
+            if self._initialized:
+                return True
+            path = self._path or _default_index_path()
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                try:
+                    self._create_fts(conn, "tokenize='trigram'")
+                except sqlite3.OperationalError:
+                    # SQLite < 3.34 lacks the trigram tokenizer; fall back to token prefix search
+                    logger.info("SQLite trigram tokenizer unavailable; search index uses prefix matching")
+                    self._trigram = False
+                    self._create_fts(conn, "tokenize=\"unicode61 tokenchars '_$'\"")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS object_search_slices (
+                        database_id TEXT NOT NULL,
+                        schema_name TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        digest TEXT NOT NULL,
+                        indexed_at REAL NOT NULL,
+                        PRIMARY KEY (database_id, schema_name, kind)
+                    )
+                """)
+                conn.commit()
+            finally:
+                conn.close()
+            self._path = path
+            self._initialized = True
+        return True
+
+    def _create_fts(self, conn, tokenizer: str):
+        """Creates the FTS5 table; only the object name is tokenized."""
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS object_search USING fts5(
+                name, path UNINDEXED, kind UNINDEXED, parent UNINDEXED,
+                database_id UNINDEXED, schema_name UNINDEXED, source UNINDEXED,
+                {tokenizer}
+            )
+        """)
+        # An existing table keeps its original tokenizer; detect it so queries match
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'object_search'").fetchone()
+        if sql and 'trigram' not in sql[0]:
+            self._trigram = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens a short-lived connection to the index."""
+        self._ready()
+        conn = sqlite3.connect(self._path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+search_index = ObjectSearchIndex()
+metadata_cache.subscribe(search_index.on_cache_update)
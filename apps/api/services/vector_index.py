@@ -0,0 +1,97 @@
+"""
+vector_index.py
+
+In-memory vector index for schema embeddings. Each (database, schema) gets one
+float32 matrix of L2-normalized table vectors, so ranking a query is a single
+matrix-vector product plus an `argpartition` top-k instead of a Python loop over
+decoded JSON rows. Matrices are built on first use and dropped on re-index.
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (table names, normalized float32 matrix of shape [tables, dims])
+IndexEntry = Tuple[List[str], np.ndarray]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalizes each row in place; zero rows stay zero."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class VectorIndex:
+    """Caches one normalized embedding matrix per (db_id, schema)."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], IndexEntry] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, db_id: str, schema: str, loader: Callable[[], Iterable[Tuple[str, Sequence[float]]]]) -> Optional[IndexEntry]:
+        """Returns the cached matrix, building it from (table, vector) pairs on a miss."""
+        key = (db_id, schema)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        entry = self.build(loader())
+        if entry is None:
+            return None
+        with self._lock:
+            # Another request may have built it meanwhile; keep the first
+            return self._entries.setdefault(key, entry)
+
+    def search(self, entry: IndexEntry, query: Sequence[float], top_k: int) -> List[Tuple[str, float]]:
+        """Returns the top_k (table, cosine similarity) pairs, best first."""
+        names, matrix = entry
+        q = np.asarray(query, dtype=np.float32)
+        if q.ndim != 1 or q.shape[0] != matrix.shape[1]:
+            logger.warning(f"Query vector has {q.shape[-1] if q.ndim else 0} dims, index has {matrix.shape[1]}")
+            return []
+        norm = float(np.linalg.norm(q))
+        if norm == 0:
+            return []
+        scores = matrix @ (q / norm)
+
+        k = min(top_k, len(names))
+        if k <= 0:
+            return []
+        # argpartition finds the top k in O(n); only those k are fully sorted
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(names) else np.arange(len(names))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(names[i], float(scores[i])) for i in top]
+
+    def invalidate(self, db_id: str, schema: Optional[str] = None):
+        """Drops the matrix for one schema, or every schema of a database."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == db_id and (schema is None or k[1] == schema)]:
+                del self._entries[key]
+
+    @staticmethod
+    def build(rows: Iterable[Tuple[str, Sequence[float]]]) -> Optional[IndexEntry]:
+        """Stacks vectors of the dominant dimensionality; mismatched rows are skipped."""
+        names: List[str] = []
+        vectors: List[Sequence[float]] = []
+        for name, vector in rows:
+            if vector is not None and len(vector):
+                names.append(name)
+                vectors.append(vector)
+        if not vectors:
+            return None
+
+        dims = Counter(len(v) for v in vectors).most_common(1)[0][0]
+        kept = [(n, v) for n, v in zip(names, vectors) if len(v) == dims]
+        if len(kept) < len(names):
+            logger.warning(f"Skipped {len(names) - len(kept)} embeddings with unexpected dimensionality")
+        matrix = np.array([v for _, v in kept], dtype=np.float32)
+        return [n for n, _ in kept], normalize_rows(matrix)
+
+
+vector_index = VectorIndex()
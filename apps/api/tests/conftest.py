@@ -4,10 +4,17 @@ backend/tests/conftest.py
 Fixtures and configuration for pytest.
 """
 
+import os
+import tempfile
 import pytest
 from unittest.mock import MagicMock
 from functools import wraps
 
+# Keep the object search index out of the user's data directory during tests
+os.environ.setdefault("SEARCH_INDEX_PATH", os.path.join(tempfile.mkdtemp(prefix="quriodb-tests-"), "search_index.db"))
+# Background metadata warm-ups would race the mocks; tests drive the prefetcher directly
+os.environ.setdefault("METADATA_PREFETCH_ENABLED", "false")
+
 # Mock auth middleware decorators before application imports so tests bypass auth
 def mock_decorator(f):
     @wraps(f)
@@ -25,6 +32,14 @@ import services.connection
 import services.execution
 import services.metadata
 
+@pytest.fixture(autouse=True)
+def reset_metadata_cache():
+    """Start every test with an empty metadata cache so mocked results never leak."""
+    from services.metadata.cache import metadata_cache
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
+
 @pytest.fixture
 def app():
     """Create and configure a new app instance for each test."""
@@ -0,0 +1,149 @@
+import pytest
+from unittest.mock import MagicMock
+
+from services.ai.context import schema_context_service
+from services.metadata.cache import metadata_cache
+
+
+COLUMNS = {
+    "orders": [{"name": "id", "type": "INTEGER", "nullable": False}, {"name": "customer_id", "type": "INTEGER", "nullable": True}],
+    "customers": [{"name": "id", "type": "INTEGER", "nullable": False}, {"name": "name", "type": "TEXT", "nullable": True}],
+    "audit": [{"name": "id", "type": "INTEGER", "nullable": False}],
+}
+FKS = [{"table": "orders", "column": "customer_id", "foreignTable": "customers", "foreignColumn": "id"}]
+
+
+@pytest.fixture
+def context_env(mocker):
+    """Metadata, retrieval and sample queries mocked out; fragment caches start empty."""
+    schema_context_service.invalidate("db1")
+    mocker.patch("services.ai.context.metadata_service.get_all_columns", return_value=COLUMNS)
+    fks = mocker.patch("services.ai.context.metadata_service.get_all_foreign_keys", return_value=FKS)
+    mocker.patch("services.ai.context.schema_retriever.get_relevant_tables", return_value=["orders"])
+    mocker.patch.object(schema_context_service, "_get_db_type", return_value="postgresql")
+    mocker.patch("services.ai.context.BaseDatabaseService.get_engine", return_value=MagicMock())
+    samples = mocker.patch.object(
+        schema_context_service, "_get_samples", return_value={"columns": ["id"], "rows": [[1], [2]]}
+    )
+    yield fks, samples
+    schema_context_service.invalidate("db1")
+
+
+def test_context_is_assembled_from_cached_fragments(context_env):
+    fks, samples = context_env
+
+    first = schema_context_service.format_schema_context("db1", "public", intent="orders per customer")
+    assert 'CREATE TABLE "orders"' in first and 'CREATE TABLE "customers"' in first
+    assert 'CREATE TABLE "audit"' not in first
+    assert "FOREIGN KEY (customer_id) REFERENCES customers(id)" in first
+    assert "-- [1]" in first
+    assert fks.call_count == 1                      # fetched once, shared with the FK expansion
+    assert samples.call_count == 2
+
+    second = schema_context_service.format_schema_context("db1", "public", intent="latest orders by customer")
+    assert second == first
+    assert samples.call_count == 2                  # sample rows served from cache
+
+
+def test_metadata_refresh_drops_context_fragments(context_env):
+    _, samples = context_env
+    schema_context_service.format_schema_context("db1", "public", intent="orders")
+    metadata_cache.invalidate("db1", "public")
+    schema_context_service.format_schema_context("db1", "public", intent="orders")
+    assert samples.call_count == 4
+
+
+def test_slow_sample_queries_are_left_out_then_cached(context_env, mocker):
+    """Samples run concurrently; a table past the timeout is omitted but warms the cache."""
+    import threading
+    import services.ai.context as context_module
+    _, samples = context_env
+    mocker.patch.object(context_module, "CONTEXT_SAMPLE_TIMEOUT", 0.2)
+    release = threading.Event()
+
+    def fetch(conn, table, schema, db_type):
+        if table == "customers":
+            release.wait(2)
+        return {"columns": ["id"], "rows": [[table]]}
+    samples.side_effect = fetch
+
+    first = schema_context_service.format_schema_context("db1", "public", intent="orders")
+    assert "-- [orders]" in first and "-- [customers]" not in first
+    release.set()
+    for _ in range(100):   # the late fetch lands in the cache on its own
+        if schema_context_service._sample_cache.get(("db1", "public", "customers")) is not None:
+            break
+        threading.Event().wait(0.02)
+    second = schema_context_service.format_schema_context("db1", "public", intent="orders")
+    assert "-- [customers]" in second
+    assert samples.call_count == 2
+
+
+def test_token_budget_drops_samples_before_tables(context_env):
+    _, samples = context_env
+
+    roomy = schema_context_service.format_schema_context("db1", "public", intent="orders")
+    tight = schema_context_service.format_schema_context("db1", "public", intent="orders", token_budget=80)
+
+    assert "-- [1]" in roomy
+    assert 'CREATE TABLE "orders"' in tight and 'CREATE TABLE "customers"' in tight
+    assert "-- SAMPLE DATA" not in tight
+    assert len(tight) < len(roomy)
+
+
+def test_sample_queries_are_bounded_per_dialect(tmp_path, mocker):
+    """Samples use the dialect's row-limit syntax and are skipped when no timeout can be armed."""
+    from sqlalchemy import create_engine, text
+    mocker.patch("services.ai.context.CONTEXT_SAMPLE_TIMEOUT", 0.2)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'samples.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO users (id) VALUES (1), (2), (3), (4)"))
+        conn.execute(text(
+            "CREATE VIEW slow AS WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+            "SELECT count(*) AS c FROM n"
+        ))
+    with engine.connect() as conn:
+        assert schema_context_service._get_samples(conn, "users", "main", "sqlite")["rows"] == [[1], [2], [3]]
+        # An unbounded view is interrupted rather than holding the worker
+        assert schema_context_service._get_samples(conn, "slow", "main", "sqlite") is None
+
+    mssql = MagicMock()
+    mssql.dialect.name = "mssql"
+    mssql.execute.return_value.keys.return_value = ["id"]
+    mssql.execute.return_value.fetchall.return_value = [(1,)]
+    assert schema_context_service._get_samples(mssql, "users", "dbo", "mssql") == {"columns": ["id"], "rows": [[1]]}
+    executed = [str(c.args[0]) for c in mssql.execute.call_args_list]
+    assert executed == ["SET LOCK_TIMEOUT 200", 'SELECT TOP 3 * FROM "dbo"."users"', "SET LOCK_TIMEOUT -1"]
+    assert mssql.connection.driver_connection.timeout == 0   # pyodbc timeout reset for the pool
+
+    oracle = MagicMock()
+    oracle.dialect.name = "oracle"
+    del oracle.connection.driver_connection.call_timeout      # driver without call timeouts
+    assert schema_context_service._get_samples(oracle, "users", "app", "oracle") is None
+    oracle.execute.assert_not_called()
+
+
+def test_mssql_samples_are_bounded_with_pytds(mocker):
+    """pytds connections have no query timeout attribute; the sample still runs, bounded."""
+    import socket
+    from types import SimpleNamespace
+    mocker.patch("services.ai.context.CONTEXT_SAMPLE_TIMEOUT", 0.5)
+
+    sock = socket.socket()
+    sock.settimeout(30)
+    timeouts = []
+    conn = MagicMock()
+    conn.dialect.name = "mssql"
+    conn.connection.driver_connection = SimpleNamespace(_tds_socket=SimpleNamespace(sock=sock))
+    conn.execute.side_effect = lambda stmt: timeouts.append(sock.gettimeout()) or conn.execute.return_value
+    conn.execute.return_value.keys.return_value = ["id"]
+    conn.execute.return_value.fetchall.return_value = [(1,), (2,)]
+    try:
+        assert schema_context_service._get_samples(conn, "users", "dbo", "mssql") == {"columns": ["id"], "rows": [[1], [2]]}
+        executed = [str(c.args[0]) for c in conn.execute.call_args_list]
+        assert executed == ["SET LOCK_TIMEOUT 500", 'SELECT TOP 3 * FROM "dbo"."users"', "SET LOCK_TIMEOUT -1"]
+        assert timeouts[1] == 0.5 and sock.gettimeout() == 30   # read bounded, then restored for the pool
+    finally:
+        sock.close()
@@ -0,0 +1,183 @@
+import time
+import threading
+
+import pytest
+
+from services.ai import base as ai_base
+from services.ai.gateway import AIGateway, AIGatewayBusy, AIRateLimited, TokenBucket, retry_after_hint
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(mocker):
+    mocker.patch("services.ai.gateway.AI_BACKOFF_BASE", 0.01)
+
+
+def test_token_bucket_allows_burst_then_asks_to_wait():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert 0 < bucket.reserve() <= 1.0
+
+    bucket.cool_down(30)
+    assert bucket.reserve() > 29
+
+
+def test_retry_after_hint_is_parsed_from_quota_errors():
+    assert retry_after_hint(RateLimitError("429 Quota exceeded. Please retry in 12.5s.")) == 12.5
+    assert retry_after_hint(RateLimitError("429 ... retry_delay { seconds: 7 }")) == 7
+    assert retry_after_hint(RateLimitError("500 internal")) is None
+
+
+def test_call_retries_rate_limits_with_backoff():
+    gateway = AIGateway()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError("429 Resource has been exhausted")
+        return "ok"
+
+    assert gateway.call(flaky, api_key="k1", timeout=5) == "ok"
+    assert len(attempts) == 3
+
+
+def test_exhausted_key_fails_fast_instead_of_sleeping():
+    gateway = AIGateway()
+    attempts = []
+
+    def exhausted():
+        attempts.append(1)
+        raise RateLimitError("429 Quota exceeded. Please retry in 40s.")
+
+    started = time.monotonic()
+    with pytest.raises(AIRateLimited) as info:
+        gateway.call(exhausted, api_key="k1", timeout=2)
+    assert time.monotonic() - started < 0.5
+    assert len(attempts) == 1 and info.value.retry_after > 30
+
+    # Other requests on the same key are refused without calling the API; other keys are unaffected
+    with pytest.raises(AIRateLimited):
+        gateway.call(lambda: attempts.append(1), api_key="k1", timeout=2)
+    assert len(attempts) == 1
+    assert gateway.call(lambda: "ok", api_key="k2") == "ok"
+
+
+def test_other_errors_propagate_without_retry():
+    gateway = AIGateway()
+    with pytest.raises(ValueError):
+        gateway.call(lambda: (_ for _ in ()).throw(ValueError("bad request")), api_key="k1")
+
+
+def test_saturated_gateway_rejects_instead_of_queueing_forever():
+    gateway = AIGateway(max_concurrency=1, max_queue=1)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        gateway.call(lambda: (holding.set(), release.wait(2)), api_key="k1")
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    holding.wait(1)
+    try:
+        with pytest.raises(AIGatewayBusy):
+            gateway.call(lambda: "late", api_key="k2", timeout=0.1)
+    finally:
+        release.set()
+        worker.join()
+    assert gateway.call(lambda: "ok", api_key="k2") == "ok"
+
+
+def test_threads_waiting_for_a_token_count_against_the_queue():
+    gateway = AIGateway(max_concurrency=4, max_queue=1)
+    bucket = gateway._bucket("k1")
+    while bucket.reserve() == 0:    # drain the burst; the next token is about a second away
+        pass
+    waiting = threading.Thread(target=lambda: gateway.call(lambda: "ok", api_key="k1", timeout=3))
+    waiting.start()
+    time.sleep(0.1)
+    try:
+        started = time.monotonic()
+        with pytest.raises(AIGatewayBusy):
+            gateway.call(lambda: "ok", api_key="k2", timeout=3)
+        assert time.monotonic() - started < 0.5
+    finally:
+        waiting.join()
+
+
+def test_open_streams_do_not_take_shared_call_slots():
+    gateway = AIGateway(max_concurrency=1, max_queue=1, max_streams=2)
+
+    with gateway.stream_slot(api_key="k1"), gateway.stream_slot(api_key="k2"):
+        # One-shot calls still get the shared slot while streams are open
+        assert gateway.call(lambda: "ok", api_key="k3", timeout=0.5) == "ok"
+        with pytest.raises(AIGatewayBusy):
+            with gateway.stream_slot(api_key="k3"):
+                pass
+
+    with gateway.stream_slot(api_key="k1"):
+        pass
+
+
+def test_service_degrades_to_error_message_on_rate_limit(mocker):
+    service = ai_base.BaseAIService()
+    mocker.patch.object(service, "_ensure_genai", return_value=True)
+    mocker.patch.object(service, "_get_user_api_key", return_value="user-key")
+    mocker.patch.object(ai_base, "_get_system_api_key", return_value="system-key")
+    call = mocker.patch.object(ai_base.ai_gateway, "call", side_effect=AIRateLimited("AI rate limit reached; retry in 40s"))
+
+    response = service._request_response("prompt", "gemini-2.5-flash", user_id="u1")
+    assert response == "AI Error: AI rate limit reached; retry in 40s"
+    assert call.call_count == 1     # a refused request is not retried on the system key
+
+
+def test_key_fallback_shares_one_deadline(mocker):
+    service = ai_base.BaseAIService()
+    mocker.patch.object(service, "_ensure_genai", return_value=True)
+    mocker.patch.object(service, "_get_user_api_key", return_value="user-key")
+    mocker.patch.object(ai_base, "_get_system_api_key", return_value="system-key")
+    mocker.patch.object(ai_base, "AI_REQUEST_DEADLINE", 1.0)
+    timeouts = []
+
+    def call(fn, api_key=None, timeout=None):
+        timeouts.append(timeout)
+        if api_key == "user-key":
+            time.sleep(0.3)
+            raise ValueError("API key not valid")
+        return "answer"
+
+    mocker.patch.object(ai_base.ai_gateway, "call", side_effect=call)
+    assert service._request_response("prompt", "gemini-2.5-flash", user_id="u1") == "answer"
+    assert timeouts[0] <= 1.0 and timeouts[1] <= 0.7
+
+
+def test_models_are_bound_to_their_own_api_key(mocker):
+    """Each key gets its own client, so concurrent calls never depend on the global configure()."""
+    made = []
+
+    def fake_client(client_options=None):
+        made.append(client_options["api_key"])
+        return f"client:{client_options['api_key']}"
+
+    mocker.patch("google.ai.generativelanguage.GenerativeServiceClient", side_effect=fake_client)
+    mocker.patch.dict(ai_base._key_clients, clear=True)
+    mocker.patch.object(ai_base, "AI_KEY_CLIENTS_MAX", 2)
+    configure = mocker.patch.object(ai_base.genai, "configure")
+    embed = mocker.patch.object(ai_base.genai, "embed_content", return_value={"embedding": [0.5]})
+
+    model_a = ai_base.get_model("gemini-2.5-flash", "key-a")
+    model_b = ai_base.get_model("gemini-2.5-flash", "key-b")
+    again_a = ai_base.get_model("gemini-2.5-flash", "key-a")
+    assert (model_a._client, model_b._client, again_a._client) == ("client:key-a", "client:key-b", "client:key-a")
+    assert made == ["key-a", "key-b"]
+    assert ai_base.embed_content("key-a", model="m", content="x")["embedding"] == [0.5]
+    assert embed.call_args.kwargs["client"] == "client:key-a"
+    configure.assert_not_called()
+
+    # Bounded, least recently used first, and the raw keys are never map keys
+    ai_base.get_model("gemini-2.5-flash", "key-c")
+    assert len(ai_base._key_clients) == 2 and "key-a" not in ai_base._key_clients
+    assert list(ai_base._key_clients.values()) == ["client:key-a", "client:key-c"]
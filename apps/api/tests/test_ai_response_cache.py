@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.metadata import AIResponseCache
+from services.ai.base import BaseAIService
+from services.ai.response_cache import ai_response_cache
+
+
+@pytest.fixture
+def response_store(mocker):
+    """In-memory metadata store holding only the response cache table."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    AIResponseCache.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    mocker.patch("services.ai.response_cache.SessionLocal", factory)
+    ai_response_cache.clear_memory()
+    yield factory
+    ai_response_cache.clear_memory()
+
+
+def test_repeated_prompt_is_served_from_cache(response_store, mocker):
+    service = BaseAIService()
+    call = mocker.patch.object(service, "_request_response", return_value="SELECT 1;")
+
+    first = service._generate_response("prompt", model_id="m1", cache=True)
+    second = service._generate_response("prompt", model_id="m1", cache=True)
+    assert first == second == "SELECT 1;"
+    assert call.call_count == 1
+
+    # A different model or prompt is a different key
+    service._generate_response("prompt", model_id="m2", cache=True)
+    service._generate_response("prompt ", model_id="m1", cache=True)
+    assert call.call_count == 3
+
+
+def test_persisted_responses_survive_restart_until_expiry(response_store):
+    ai_response_cache.set("prompt", "m1", "answer")
+    ai_response_cache.clear_memory()
+    assert ai_response_cache.get("prompt", "m1") == "answer"
+
+    session = response_store()
+    row = session.query(AIResponseCache).one()
+    assert row.hits == 1
+    row.expiresAt = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+    session.commit()
+    session.close()
+
+    ai_response_cache.clear_memory()
+    assert ai_response_cache.get("prompt", "m1") is None
+
+
+def test_errors_and_uncached_calls_are_not_stored(response_store, mocker):
+    service = BaseAIService()
+    call = mocker.patch.object(service, "_request_response", return_value="AI Error: 429 quota")
+
+    service._generate_response("prompt", model_id="m1", cache=True)
+    service._generate_response("prompt", model_id="m1", cache=True)
+    assert call.call_count == 2
+
+    call.return_value = "fresh"
+    service._generate_response("other", model_id="m1")
+    assert ai_response_cache.get("other", "m1") is None
+    assert response_store().query(AIResponseCache).count() == 0
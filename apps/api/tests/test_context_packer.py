@@ -0,0 +1,75 @@
+from services.ai.context_packer import (
+    ContextPacker, TableContext, estimate_tokens, rank_tables, rank_tables_with_parents
+)
+
+
+FKS = [
+    {"table": "orders", "foreignTable": "customers"},
+    {"table": "customers", "foreignTable": "regions"},
+    {"table": "regions", "foreignTable": "countries"},
+]
+TABLES = ["audit", "countries", "customers", "orders", "regions"]
+
+
+def test_estimate_tokens_counts_word_pieces_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("id") == 1
+    assert estimate_tokens("customer_id INTEGER") == 2 + 1 + 1 + 2     # customer, _, id, INTEGER
+    assert estimate_tokens('CREATE TABLE "orders" (') == 2 + 2 + 1 + 2 + 1 + 1
+
+
+def test_rank_tables_orders_by_retrieval_rank_then_fk_distance():
+    ranked = rank_tables(TABLES, ["orders", "audit"], FKS)
+    # Seeds by rank, one hop (customers), two hops (regions); countries is three hops away
+    assert ranked == ["orders", "audit", "customers", "regions"]
+    assert rank_tables_with_parents(TABLES, ["orders", "audit"], FKS) == [
+        ("orders", None), ("audit", None), ("customers", "orders"), ("regions", "customers")
+    ]
+
+
+def test_rank_tables_keeps_original_order_without_retrieval():
+    assert rank_tables(TABLES, [], FKS) == TABLES
+    assert rank_tables(TABLES, ["dropped_table"], FKS) == TABLES
+
+
+def test_packer_prefers_ddl_of_more_tables_over_samples():
+    tables = [
+        TableContext("a", ddl="CREATE TABLE a (id INT);", samples="-- [1, 2, 3, 4, 5, 6, 7, 8, 9]"),
+        TableContext("b", ddl="CREATE TABLE b (id INT);", samples="-- [1]"),
+    ]
+    ddl_cost = estimate_tokens(tables[0].ddl) + 1
+    packer = ContextPacker(budget=2 * ddl_cost + 8)
+    for table in tables:
+        packer.add(table)
+    packer.fill('samples')
+
+    context = packer.render()
+    assert "CREATE TABLE a" in context and "CREATE TABLE b" in context
+    # a's samples do not fit, b's smaller ones still do
+    assert tables[0].included == ['ddl'] and tables[1].included == ['ddl', 'samples']
+
+
+def test_packer_without_budget_includes_everything():
+    table = TableContext("a", ddl="CREATE TABLE a (id INT);", comments="-- id: key", samples="-- [1]")
+    packer = ContextPacker(budget=None, header="HEADER")
+    packer.add(table)
+    packer.fill('comments')
+    packer.fill('samples')
+    assert packer.render() == "HEADER\n\nCREATE TABLE a (id INT);\n-- id: key\n-- [1]"
+
+
+def test_packer_truncates_top_table_and_skips_orphaned_neighbours():
+    columns = "\n".join(f"  column_{i} INTEGER NOT NULL" for i in range(40))
+    top = TableContext("orders", ddl=f'CREATE TABLE "orders" (\n{columns}\n);')
+    wide = TableContext("audit", ddl=f'CREATE TABLE "audit" (\n{columns}\n);')
+    neighbour = TableContext("k", ddl="CREATE TABLE k (id);", via="audit")
+    packer = ContextPacker(budget=60, header="HEADER")
+
+    # Too big for the whole budget, but the top-ranked table is cut down rather than dropped
+    assert packer.add(top) is True
+    assert top.ddl.startswith('CREATE TABLE "orders" (\n  column_0') and top.ddl.endswith("more omitted\n);")
+    # A later table that does not fit is skipped, and so is the small neighbour hanging off it
+    assert packer.add(wide) is False
+    assert packer.add(neighbour) is False
+    assert [t.name for t in packer.tables] == ["orders"]
+    assert estimate_tokens(packer.render()) <= 60
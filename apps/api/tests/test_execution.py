@@ -62,3 +62,129 @@ def test_execute_update(client, mock_session, mock_engine):
     assert res['data'] == []
     assert res['columns'] == []
     assert res['error'] is None
+
+def test_execute_stream_sql_ndjson(client, mock_session, mocker, tmp_path):
+    """Streaming execution emits columns, chunked rows and a summary as NDJSON."""
+    import json
+    from sqlalchemy import create_engine, text
+    import services.execution
+    from services.execution import execution_service
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'stream.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER, name TEXT)"))
+        conn.execute(text("INSERT INTO items SELECT value, 'item' || value FROM json_each('[1,2,3,4,5]')"))
+
+    db_mock = MagicMock()
+    db_mock.type = "sqlite"
+    db_mock.config = {}
+    mock_session.query.return_value.filter.return_value.first.return_value = db_mock
+    mocker.patch.object(execution_service, "get_engine", return_value=engine)
+    mocker.patch.object(services.execution, "STREAM_CHUNK_ROWS", 2)
+
+    payload = {"databaseId": "1", "sql": "SELECT id, name FROM items ORDER BY id", "limit": 3}
+    response = client.post('/api/database/execute/stream', json=payload)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[0] == {"type": "columns", "columns": ["id", "name"]}
+    assert [len(e["rows"]) for e in events if e["type"] == "rows"] == [2, 1]
+    assert events[1]["rows"][0] == {"id": 1, "name": "item1"}
+    assert events[-1]["type"] == "end" and events[-1]["rowCount"] == 3
+
+def test_mongo_cursor_limits_server_side():
+    """Pipelines get a trailing $limit (except after $out/$merge) and cursors a batch size."""
+    from services.execution.mongo_executor import MongoExecutor
+    executor = MongoExecutor(MagicMock())
+    aggregate = MagicMock()
+    find = MagicMock()
+
+    executor._open_cursor(aggregate, 'aggregate', [[{"$match": {"a": 1}}]], 50, batch_size=20)
+    assert aggregate.call_args.args[0] == [{"$match": {"a": 1}}, {"$limit": 50}]
+    assert aggregate.call_args.kwargs == {"batchSize": 20}
+
+    executor._open_cursor(aggregate, 'aggregate', [[{"$out": "copy"}]], 50)
+    assert aggregate.call_args.args[0] == [{"$out": "copy"}]
+
+    executor._open_cursor(find, 'find', [{"a": 1}, {"name": 1}], 10)
+    find.assert_called_with({"a": 1}, {"name": 1})
+    find.return_value.limit.assert_called_with(10)
+    find.return_value.limit.return_value.batch_size.assert_called_with(10)
+
+    # LIMIT 0 means no documents, not "no limit"
+    find.reset_mock()
+    assert list(executor._open_cursor(find, 'find', [{}, {}, {"limit": 0}], 1000)) == []
+    assert list(executor._open_cursor(aggregate, 'aggregate', [[{"$match": {}}]], 0)) == []
+    find.assert_not_called()
+
+def test_mongo_document_conversion_matches_python_walk():
+    """Batched conversion keeps nesting and primitives, stringifies BSON-only types and _id."""
+    import math
+    import datetime
+    from bson import ObjectId, Decimal128, Int64
+    from services.execution.mongo_executor import MongoExecutor
+
+    oid = ObjectId()
+    docs = [
+        {"_id": oid, "n": Int64(7), "price": Decimal128("9.99"), "when": datetime.datetime(2024, 1, 2, 3, 4, 5),
+         "nested": {"ok": True, "none": None, "list": [1, 2.5, {"deep": ObjectId(str(oid))}]}},
+        {"_id": 42, "extra": "x"},
+    ]
+
+    rows, columns = MongoExecutor(MagicMock())._process_documents(iter(docs))
+
+    assert rows[0] == {
+        "_id": str(oid), "n": 7, "price": "9.99", "when": "2024-01-02 03:04:05",
+        "nested": {"ok": True, "none": None, "list": [1, 2.5, {"deep": str(oid)}]},
+    }
+    assert rows[1] == {"_id": "42", "extra": "x"}
+    assert columns == ["_id", "extra", "n", "nested", "price", "when"]
+
+    # Non-finite floats survive as floats, as with the Python walk
+    rows, _ = MongoExecutor(MagicMock())._process_documents(iter([{"_id": 1, "r": float("nan"), "m": float("-inf")}]))
+    assert math.isnan(rows[0]["r"]) and rows[0]["m"] == float("-inf")
+
+def test_mongo_explain_normalizes_collection_scans_and_index_use():
+    """executionStats trees map onto the relational plan shape with scan/index flags."""
+    from services.execution.mongo_explain import normalize_explain
+
+    find_raw = {
+        "queryPlanner": {"winningPlan": {"stage": "COLLSCAN", "filter": {"age": {"$gt": 30}}}},
+        "executionStats": {
+            "nReturned": 5, "totalDocsExamined": 1000, "totalKeysExamined": 0, "executionTimeMillis": 12,
+            "executionStages": {"stage": "COLLSCAN", "nReturned": 5, "docsExamined": 1000, "executionTimeMillisEstimate": 11},
+        },
+    }
+    plan = normalize_explain(find_raw, "users")[0]
+    assert plan["Plan"]["Node Type"] == "COLLSCAN"
+    assert plan["Plan"]["Collection Scan"] is True and plan["Plan"]["Relation Name"] == "users"
+    assert plan["Summary"]["collectionScan"] is True
+    assert plan["Summary"]["examinedPerReturned"] == 200.0
+    assert plan["Execution Time"] == 12
+
+    agg_raw = {"stages": [
+        {"$cursor": {
+            "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "status_1"}}},
+            "executionStats": {
+                "nReturned": 40, "totalDocsExamined": 40, "totalKeysExamined": 40, "executionTimeMillis": 3,
+                "executionStages": {"stage": "FETCH", "nReturned": 40, "docsExamined": 40,
+                                    "inputStage": {"stage": "IXSCAN", "nReturned": 40, "keysExamined": 40, "indexName": "status_1"}},
+            },
+        }},
+        {"$group": {"_id": "$status"}, "nReturned": 3, "executionTimeMillisEstimate": 4},
+    ]}
+    plan = normalize_explain(agg_raw, "orders")[0]
+    assert plan["Plan"]["Node Type"] == "$group" and plan["Plan"]["Actual Rows"] == 3
+    fetch = plan["Plan"]["Plans"][0]
+    assert fetch["Node Type"] == "FETCH" and fetch["Plans"][0]["Index Name"] == "status_1"
+    assert plan["Summary"]["indexesUsed"] == ["status_1"]
+    assert plan["Summary"]["collectionScan"] is False
+    assert plan["Summary"]["nReturned"] == 3
+
+def test_mongo_explain_command_carries_sql_options():
+    from services.execution.mongo_executor import MongoExecutor, EXPLAIN_MAX_TIME_MS
+    executor = MongoExecutor(MagicMock())
+    command = executor._explain_command('find', 'users', [{"a": 1}, {"a": 1, "_id": 0}, {"sort": {"a": -1}, "limit": 5}])
+    assert command == {"find": "users", "filter": {"a": 1}, "maxTimeMS": EXPLAIN_MAX_TIME_MS,
+                       "projection": {"a": 1, "_id": 0}, "sort": {"a": -1}, "limit": 5}
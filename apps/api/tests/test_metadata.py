@@ -4,6 +4,7 @@ backend/tests/test_metadata.py
 Tests for metadata fetching (schemas, tables, columns).
 """
 
+import pytest
 from unittest.mock import MagicMock
 
 def test_get_tables(client, mock_session, mock_engine, mocker):
@@ -50,3 +51,225 @@ def test_get_columns(client, mock_session, mock_engine, mocker):
     assert cols[0]['nullable'] is False
     assert cols[1]['name'] == "name" 
     assert cols[1]['nullable'] is True
+
+def test_get_all_columns_parallel_fallback(client, mock_session, mock_engine, mocker):
+    """Test the parallel per-table fallback runs when the single-query path fails."""
+    import services.metadata
+    db_mock = MagicMock()
+    db_mock.type = "postgres"
+    db_mock.config = {}
+    mock_session.query.return_value.filter.return_value.first.return_value = db_mock
+
+    mocker.patch.object(
+        services.metadata.metadata_service.sql_provider, "get_all_columns",
+        side_effect=Exception("catalog query failed")
+    )
+    mock_inspect = mocker.patch("services.metadata.sql_provider.inspect")
+    mock_inspector = mock_inspect.return_value
+    mock_inspector.get_table_names.return_value = ["orders", "users"]
+    mock_inspector.get_view_names.return_value = ["active_users"]
+    mock_inspector.get_columns.side_effect = lambda table, schema=None: [
+        {"name": f"{table}_id", "type": "INTEGER", "nullable": False}
+    ]
+
+    response = client.get('/api/database/all-columns?databaseId=1&schema=public')
+    assert response.status_code == 200
+    result = response.json
+    assert sorted(result.keys()) == ["active_users", "orders", "users"]
+    assert result["orders"][0]["name"] == "orders_id"
+
+def test_get_all_columns_stops_after_failed_parallel_fallback(mock_session, mocker):
+    """A failed parallel fallback returns nothing instead of walking every object serially."""
+    from services.metadata import metadata_service
+    db_mock = MagicMock()
+    db_mock.type = "postgres"
+    db_mock.config = {}
+    mock_session.query.return_value.filter.return_value.first.return_value = db_mock
+
+    provider = metadata_service.sql_provider
+    mocker.patch.object(provider, "get_all_columns", side_effect=Exception("catalog query failed"))
+    mocker.patch.object(provider, "get_all_columns_parallel", side_effect=TimeoutError("timed out"))
+    get_tables = mocker.patch.object(metadata_service, "get_tables", return_value=["orders"])
+
+    assert metadata_service.get_all_columns("serial-db", "public") == {}
+    get_tables.assert_not_called()
+
+def test_partial_parallel_fallback_is_not_cached(mock_session, mocker):
+    """Objects that failed to reflect make the map partial; it is returned but not cached."""
+    from services.metadata import metadata_service
+    from services.metadata.cache import metadata_cache
+    from services.metadata.sql_provider import SqlMetadataProvider
+    db_mock = MagicMock()
+    db_mock.type = "postgres"
+    db_mock.config = {}
+    mock_session.query.return_value.filter.return_value.first.return_value = db_mock
+
+    provider = SqlMetadataProvider(MagicMock())
+    conn = provider.service.get_engine.return_value.connect.return_value.__enter__.return_value
+    conn.dialect.name = "postgresql"
+    mocker.patch.object(provider, "_list_tables", return_value=["orders", "broken"])
+    mocker.patch.object(provider, "_list_views", return_value=[])
+
+    def reflect(engine, db_id, schema, name):
+        if name == "broken":
+            raise Exception("permission denied")
+        return [{"name": "id"}]
+
+    mocker.patch.object(provider, "_reflect_columns", side_effect=reflect)
+    mocker.patch.object(provider, "get_all_columns", side_effect=Exception("catalog query failed"))
+    mocker.patch.object(metadata_service, "sql_provider", provider)
+
+    assert metadata_service.get_all_columns("partial-db", "public") == {"orders": [{"name": "id"}]}
+    assert metadata_cache.get("partial-db", "public", "columns") is None
+
+def test_get_all_columns_parallel_raises_on_timeout(mocker):
+    """A timed-out fallback raises instead of returning (and caching) a truncated map."""
+    import threading
+    from services.metadata.sql_provider import SqlMetadataProvider
+
+    provider = SqlMetadataProvider(MagicMock())
+    conn = provider.service.get_engine.return_value.connect.return_value.__enter__.return_value
+    conn.dialect.name = "postgresql"
+    mocker.patch.object(provider, "_list_tables", return_value=["fast", "slow"])
+    mocker.patch.object(provider, "_list_views", return_value=[])
+    release = threading.Event()
+    mocker.patch.object(
+        provider, "_reflect_columns",
+        side_effect=lambda engine, db_id, schema, name: [] if name == "fast" else release.wait(2)
+    )
+
+    try:
+        with pytest.raises(TimeoutError):
+            provider.get_all_columns_parallel("db-1", "public", timeout=0.1)
+    finally:
+        release.set()
+
+def test_inspector_cache_reused_and_invalidated(tmp_path, mocker):
+    """Reflection results are served from the per-database cache until the metadata cache is invalidated."""
+    from sqlalchemy import create_engine, text, event
+    from services.metadata.sql_provider import SqlMetadataProvider
+    from services.metadata.inspector_cache import inspector_cache
+    from services.metadata.cache import metadata_cache
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'reflect.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)"))
+
+    service = MagicMock()
+    service.run_dynamic_query.side_effect = lambda db_id, cb: cb(engine.connect())
+    provider = SqlMetadataProvider(service)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    first = provider.get_columns("reflect-db", "main", "users")
+    catalog_queries = len(statements)
+    second = provider.get_columns("reflect-db", "main", "users")
+    assert first == second
+    assert len(statements) == catalog_queries
+
+    metadata_cache.invalidate("reflect-db", "main")
+    assert inspector_cache.info_cache_for("reflect-db") == {}
+    provider.get_columns("reflect-db", "main", "users")
+    assert len(statements) > catalog_queries
+
+def test_get_table_stats_sqlite_and_duckdb(tmp_path):
+    """Schema-wide table stats use catalog estimates, with exact COUNT(*) only on request."""
+    from sqlalchemy import create_engine, text
+    from services.metadata.sql_provider import SqlMetadataProvider
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("CREATE INDEX ix_users_name ON users (name)"))
+        conn.execute(text("INSERT INTO users (name) VALUES ('a'), ('b'), ('c')"))
+        conn.execute(text("ANALYZE"))
+        conn.execute(text("INSERT INTO users (name) VALUES ('d')"))
+
+    service = MagicMock()
+    service.run_dynamic_query.side_effect = lambda db_id, cb: cb(engine.connect())
+    provider = SqlMetadataProvider(service)
+
+    stats = {row["table"]: row for row in provider.get_table_stats("stats-db", "main")}
+    assert sorted(stats) == ["orders", "users"]
+    assert stats["users"]["row_count"] == 3  # ANALYZE estimate, not a scan
+    assert stats["orders"]["row_count"] is None  # no sqlite_stat1 data and no implicit COUNT(*)
+    assert stats["users"]["exact"] is False and stats["orders"]["exact"] is False
+
+    exact = {row["table"]: row for row in provider.get_table_stats("stats-db", "main", exact=True)}
+    assert exact["users"]["row_count"] == 4 and exact["orders"]["row_count"] == 0
+    assert exact["users"]["exact"] is True
+
+    duck = create_engine("duckdb:///:memory:")
+    with duck.connect() as conn:
+        conn.execute(text("CREATE TABLE events (id INTEGER)"))
+        conn.execute(text("INSERT INTO events SELECT * FROM range(5)"))
+        service.run_dynamic_query.side_effect = lambda db_id, cb: cb(conn)
+        rows = provider.get_table_stats("duck-db", "memory.main", exact=True)
+    assert rows == [{
+        "table": "events", "row_count": 5, "total_bytes": None, "data_bytes": None,
+        "index_bytes": None, "total_size": None, "exact": True
+    }]
+
+def test_get_table_stats_mssql_and_catalog_failure(mocker):
+    """MSSQL reads partition stats; a failed catalog query is rolled back before the fallback."""
+    from services.metadata.sql_provider import SqlMetadataProvider
+
+    conn = MagicMock()
+    conn.dialect.name = "mssql"
+    conn.execute.return_value = [("orders", 120, 3 * 8192, 2 * 8192)]
+    service = MagicMock()
+    service.run_dynamic_query.side_effect = lambda db_id, cb: cb(conn)
+    provider = SqlMetadataProvider(service)
+
+    rows = provider.get_table_stats("ms-db", "dbo")
+    assert "sys.dm_db_partition_stats" in str(conn.execute.call_args.args[0])
+    assert rows == [{
+        "table": "orders", "row_count": 120, "total_bytes": 24576, "data_bytes": 16384,
+        "index_bytes": 8192, "total_size": "0.02 MB", "exact": False
+    }]
+
+    conn.dialect.name = "postgresql"
+    conn.execute.side_effect = Exception("permission denied for pg_class")
+
+    def list_tables(c, db_id, schema):
+        if not c.rollback.called:
+            raise Exception("current transaction is aborted")
+        return ["orders"]
+
+    mocker.patch.object(provider, "_list_tables", side_effect=list_tables)
+    rows = provider.get_table_stats("pg-db", "public")
+    conn.rollback.assert_called_once()
+    assert rows[0]["table"] == "orders" and rows[0]["row_count"] is None
+
+def test_browse_redis_keys_pages_and_groups(client, mock_session, mocker):
+    """Redis browsing returns the SCAN cursor and folds keys into namespace groups."""
+    import services.metadata
+    db_mock = MagicMock()
+    db_mock.type = "redis"
+    db_mock.config = {}
+    mock_session.query.return_value.filter.return_value.first.return_value = db_mock
+
+    redis_client = MagicMock()
+    redis_client.scan.side_effect = [
+        (17, ["user:1:name", "user:1:email"]),
+        (42, ["user:2:name", "user:root", "user:1:name"]),
+    ]
+    mocker.patch.object(services.metadata.metadata_service, "get_redis_client", return_value=(redis_client, 0))
+
+    response = client.get('/api/database/redis/keys?databaseId=1&schema=0&prefix=user:&count=4&type=string')
+    assert response.status_code == 200
+    page = response.json
+    assert page["cursor"] == "42"
+    assert page["done"] is False
+    assert page["keys"] == ["user:root"]
+    assert page["groups"] == [{"prefix": "user:1:", "count": 2}, {"prefix": "user:2:", "count": 1}]
+    first_call = redis_client.scan.call_args_list[0].kwargs
+    assert first_call == {"cursor": 0, "match": "user:*", "count": 4, "_type": "string"}
+
+    # A match glob applies below the (literal) prefix rather than replacing it
+    redis_client.scan.side_effect = [(0, ["user:[1]:session"])]
+    response = client.get('/api/database/redis/keys?databaseId=1&schema=0&prefix=user:[1]:&match=*sess*')
+    assert response.json["keys"] == ["user:[1]:session"]
+    assert redis_client.scan.call_args.kwargs["match"] == "user:\\[1\\]:*sess*"
@@ -0,0 +1,143 @@
+"""
+tests/test_mongo_metadata.py
+
+Tests for MongoDB metadata helpers using lightweight collection stand-ins.
+"""
+
+from unittest.mock import MagicMock
+
+from services.metadata.mongo_schema import MongoSchemaInferrer
+
+
+def _collection(docs, aggregate_error=None):
+    collection = MagicMock()
+    collection.name = "orders"
+    collection.find.return_value.limit.side_effect = lambda n: iter(docs[:n])
+    if aggregate_error:
+        collection.aggregate.side_effect = aggregate_error
+    return collection
+
+
+def test_schema_profile_reports_nested_paths_and_histograms():
+    """Nested paths carry type histograms and presence ratios over the sample."""
+    docs = [
+        {"_id": 1, "total": 10, "customer": {"name": "Ada", "tier": "gold"}, "items": [{"sku": "A"}]},
+        {"_id": 2, "total": 12.5, "customer": {"name": "Bob"}, "items": []},
+        {"_id": 3, "total": None, "customer": {"name": "Cy"}, "items": [{"sku": "B"}], "note": "x"},
+        {"_id": 4, "total": 7, "customer": {"name": "Di"}, "items": [{"sku": "C"}]},
+    ]
+    collection = _collection(docs, aggregate_error=Exception("$objectToArray not supported"))
+
+    profile = MongoSchemaInferrer().profile(collection, 100)
+    fields = {f["name"]: f for f in profile["fields"]}
+
+    assert profile["sampleSize"] == 4
+    assert profile["fields"][0]["name"] == "_id"
+    assert fields["total"]["types"] == {"int": 2, "double": 1, "null": 1}
+    assert fields["total"]["type"] == "int" and fields["total"]["nullable"] is True
+    assert fields["customer.name"]["presence"] == 1.0
+    assert fields["customer.tier"]["presence"] == 0.25
+    assert fields["items.sku"]["presence"] == 0.75
+    assert fields["note"]["nullable"] is True
+    assert fields["_id"]["nullable"] is False
+
+
+def test_schema_profile_uses_server_side_sample_and_is_cached():
+    """The $sample/$facet result is parsed and cached per collection and sample size."""
+    collection = _collection([])
+    collection.aggregate.return_value = iter([{
+        "fields": [
+            {"_id": {"p": "_id", "t": "objectId"}, "n": 50},
+            {"_id": {"p": "email", "t": "string"}, "n": 45},
+        ],
+        "total": [{"n": 50}],
+    }])
+    database = MagicMock()
+    database.name = "shop"
+    database.__getitem__.return_value = collection
+    inferrer = MongoSchemaInferrer()
+
+    profile = inferrer.infer("mongo-1", database, "orders", sample_size=50)
+    again = inferrer.infer("mongo-1", database, "orders", sample_size=50)
+
+    assert again is profile
+    assert collection.aggregate.call_count == 1
+    pipeline = collection.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$sample": {"size": 50}}
+    assert "$facet" in pipeline[-1]
+    assert {f["name"]: f["presence"] for f in profile["fields"]} == {"_id": 1.0, "email": 0.9}
+
+
+def _stats_provider(database):
+    from services.metadata.mongo_provider import MongoMetadataProvider
+    client = MagicMock()
+    client.__getitem__.return_value = database
+    service = MagicMock()
+    service.get_mongo_client.return_value = (client, "shop")
+    return MongoMetadataProvider(service)
+
+
+def test_collection_stats_single_aggregation_and_cache():
+    """All collections are measured by one $collStats/$unionWith aggregation, then cached."""
+    database = MagicMock()
+    database.name = "shop"
+    database.list_collections.return_value = [{"name": "orders"}, {"name": "users"}, {"name": "system.profile"}]
+    database.__getitem__.return_value.aggregate.return_value = iter([
+        {"_id": "orders", "count": 10, "size": 1000, "storageSize": 4096, "indexSize": 2048, "totalSize": 6144},
+        {"_id": "users", "count": 0, "size": 0, "storageSize": 4096, "indexSize": 4096, "totalSize": 8192},
+    ])
+    provider = _stats_provider(database)
+
+    stats = provider.get_collection_stats("mongo-1", "shop", session=None)
+    assert provider.get_collection_stats("mongo-1", "shop", session=None) is stats
+
+    assert database.__getitem__.return_value.aggregate.call_count == 1
+    pipeline = database.__getitem__.return_value.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$collStats": {"storageStats": {}}}
+    assert pipeline[1]["$unionWith"]["coll"] == "users"
+    assert [s["table"] for s in stats] == ["orders", "users"]
+    assert stats[0]["row_count"] == 10 and stats[0]["avg_document_bytes"] == 100
+    assert stats[1]["avg_document_bytes"] is None
+    database.command.assert_not_called()
+
+
+def test_collection_stats_falls_back_to_collstats():
+    """Servers without $unionWith are measured with one collstats command per collection."""
+    database = MagicMock()
+    database.name = "legacy"
+    database.list_collections.return_value = [{"name": "events"}]
+    database.__getitem__.return_value.aggregate.side_effect = Exception("Unrecognized pipeline stage name: '$unionWith'")
+    database.command.return_value = {"count": 3, "size": 300, "storageSize": 1024, "totalIndexSize": 512}
+
+    stats = _stats_provider(database).get_collection_stats("mongo-2", "legacy", session=None)
+
+    assert stats[0]["row_count"] == 3
+    assert stats[0]["total_bytes"] == 1536
+
+
+def test_collection_names_fall_back_to_plain_listing():
+    """When the filtered listCollections is rejected, plain collection names are still returned."""
+    database = MagicMock()
+    database.list_collections.side_effect = Exception("not authorized on shop to execute command listCollections")
+    database.list_collection_names.return_value = ["orders", "system.views"]
+
+    assert _stats_provider(database).get_tables("mongo-3", "shop", session=None) == ["orders"]
+
+
+def test_all_columns_profile_small_samples_concurrently(mocker):
+    """Listing a database profiles every collection from a small sample on a bounded pool."""
+    from services.metadata import mongo_provider
+    database = MagicMock()
+    database.list_collections.side_effect = lambda **kw: iter(
+        [{"name": "orders"}, {"name": "users"}] if kw else [{"name": "big_view", "type": "view"}]
+    )
+    field = {"name": "id", "type": "int", "nullable": False, "presence": 1.0, "types": {"int": 1}}
+    infer = mocker.patch.object(mongo_provider.mongo_schema_inferrer, "infer", return_value={"fields": [field]})
+    pool = mocker.spy(mongo_provider, "ThreadPoolExecutor")
+
+    columns = _stats_provider(database).get_all_columns("mongo-4", "shop", session=None)
+
+    assert sorted(columns) == ["big_view", "orders", "users"]
+    assert columns["orders"] == [field]
+    assert {c.args[3] for c in infer.call_args_list} == {mongo_provider.SCHEMA_BULK_SAMPLE_SIZE}
+    assert pool.call_args.kwargs["max_workers"] == 3
@@ -0,0 +1,66 @@
+"""
+tests/test_prefetcher.py
+
+Tests for the background metadata prefetcher.
+"""
+
+import threading
+from unittest.mock import MagicMock
+
+from services.metadata.prefetcher import MetadataPrefetcher
+
+
+def _fake_metadata_service(mocker, release: threading.Event = None):
+    import services.metadata
+    service = MagicMock()
+    service.get_schemas.return_value = ["information_schema", "sales", "public"]
+
+    def _tables(db_id, schema):
+        if release:
+            release.wait(5)
+        return ["orders"]
+
+    service.get_tables.side_effect = _tables
+    mocker.patch.object(services.metadata, "metadata_service", service)
+    return service
+
+
+def test_prefetch_warms_user_schemas_default_first(mocker):
+    """Warm-up walks default schemas first and skips system catalogs."""
+    service = _fake_metadata_service(mocker)
+    prefetcher = MetadataPrefetcher(enabled=True)
+
+    prefetcher.warm("db-1")
+
+    warmed = [call.args[1] for call in service.get_all_columns.call_args_list]
+    assert warmed == ["public", "sales"]
+
+
+def test_prefetch_dedups_and_caps_concurrency(mocker):
+    """Queued databases are not scheduled twice and only max_concurrency run at once."""
+    release = threading.Event()
+    service = _fake_metadata_service(mocker, release)
+    prefetcher = MetadataPrefetcher(enabled=True, max_concurrency=1, cooldown=60)
+
+    assert prefetcher.schedule("db-1") is True
+    assert prefetcher.schedule("db-1") is False
+    assert prefetcher.schedule("db-2") is True
+    assert prefetcher._executor._max_workers == 1
+
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+    assert service.get_schemas.call_count == 2
+
+    # Recently warmed databases are skipped until forgotten
+    prefetcher._executor = None
+    assert prefetcher.schedule("db-1") is False
+    prefetcher.forget("db-1")
+    assert prefetcher.schedule("db-1") is True
+    prefetcher._executor.shutdown(wait=True)
+
+
+def test_prefetch_disabled_is_noop():
+    """A disabled prefetcher never starts its worker pool."""
+    prefetcher = MetadataPrefetcher(enabled=False)
+    assert prefetcher.schedule("db-1") is False
+    assert prefetcher._executor is None
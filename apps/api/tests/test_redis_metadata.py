@@ -0,0 +1,220 @@
+"""
+tests/test_redis_metadata.py
+
+Tests for Redis keyspace tooling using an in-memory stand-in for redis-py.
+"""
+
+from unittest.mock import MagicMock
+
+from services.metadata.redis_analyzer import KeyspaceAnalyzer
+from services.metadata.redis_provider import RedisMetadataProvider
+from services.execution.redis_executor import RedisExecutor
+
+
+class FakeRedis:
+    """Minimal redis-py stand-in: key -> (type, bytes, ttl[, value, length]), scanned in pages of 2."""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.selected = None  # Set only if code issues SELECT, which pooled clients must not
+        self.round_trips = 0
+        self.commands_sent = 0
+
+    def dbsize(self):
+        return len(self.keys)
+
+    def scan(self, cursor=0, match=None, count=None, _type=None):
+        self.round_trips += 1
+        names = sorted(self.keys)
+        page = names[cursor:cursor + 2]
+        next_cursor = cursor + 2 if cursor + 2 < len(names) else 0
+        return next_cursor, page
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hgetall(self, key):
+        self.round_trips += 1
+        return {"field": "value"}
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def type(self, key):
+        self.commands.append(lambda: self.client.keys.get(key, ('none',))[0])
+
+    def memory_usage(self, key, samples=None):
+        self.commands.append(lambda: self.client.keys[key][1] if key in self.client.keys else None)
+
+    def ttl(self, key):
+        self.commands.append(lambda: self.client.keys[key][2] if key in self.client.keys else -2)
+
+    def get(self, key):
+        def _get():
+            entry = self.client.keys.get(key)
+            if entry and entry[0] != 'string':
+                return Exception("WRONGTYPE Operation against a key holding the wrong kind of value")
+            return entry[3] if entry else None
+        self.commands.append(_get)
+
+    def execute_command(self, command, *args):
+        sizes = {'STRLEN': 'string', 'HLEN': 'hash', 'LLEN': 'list', 'SCARD': 'set', 'ZCARD': 'zset', 'XLEN': 'stream'}
+
+        def _run():
+            if command == 'SELECT':
+                self.client.selected = args[0]
+                return True
+            entry = self.client.keys.get(args[0])
+            if entry is None:
+                return 0
+            if sizes[command] != entry[0]:
+                return Exception("WRONGTYPE Operation against a key holding the wrong kind of value")
+            return entry[4]
+        self.commands.append(_run)
+
+    def execute(self, raise_on_error=True):
+        self.client.round_trips += 1
+        self.client.commands_sent += len(self.commands)
+        return [cmd() for cmd in self.commands]
+
+
+def test_keyspace_analyzer_aggregates_by_prefix():
+    """Counts and bytes roll up per prefix, with one pipelined round-trip per SCAN page."""
+    client = FakeRedis({
+        "user:1:profile": ("hash", 300, -1),
+        "user:1:session": ("string", 100, 60),
+        "user:2:profile": ("hash", 500, -1),
+        "cache:home": ("string", 50, 30),
+        "counter": ("string", 10, -1),
+    })
+
+    result = KeyspaceAnalyzer().analyze(client, 3)
+
+    assert client.round_trips == 6  # 3 SCAN pages + 3 pipelines
+    assert result["scannedKeys"] == 5 and result["sampled"] is False
+    assert result["totalBytes"] == 960
+
+    tree = {node["prefix"]: node for node in result["tree"]}
+    assert list(tree) == ["user:", "cache:"]  # ordered by bytes
+    assert tree["user:"]["keys"] == 3
+    assert tree["user:"]["bytes"] == 900
+    assert tree["user:"]["expiring"] == 1
+    assert tree["user:"]["types"] == {"hash": 2, "string": 1}
+    assert [n["prefix"] for n in tree["user:"]["children"]] == ["user:2:", "user:1:"]
+    assert result["topKeys"][0] == {"key": "user:2:profile", "type": "hash", "bytes": 500}
+
+
+def test_keyspace_analyzer_caches_jobs(mocker):
+    """A finished analysis is returned from cache until a refresh is requested."""
+    client = FakeRedis({"a:1": ("string", 1, -1)})
+    analyzer = KeyspaceAnalyzer()
+    thread = mocker.patch("services.metadata.redis_analyzer.threading.Thread")
+    thread.return_value.start.side_effect = lambda: analyzer._run(*thread.call_args.kwargs["args"])
+
+    analyzer.start("db-1", 0, client)
+    assert analyzer.status("db-1", 0)["status"] == "done"
+    assert analyzer.start("db-1", 0, client)["result"]["scannedKeys"] == 1
+    assert thread.call_count == 1
+
+    analyzer.start("db-1", 0, client, refresh=True)
+    assert thread.call_count == 2
+
+
+def test_inspect_keys_uses_two_pipelines():
+    """Multi-key inspection costs two round-trips and one size command per existing key."""
+    client = FakeRedis({
+        "user:1": ("hash", 300, -1, None, 4),
+        "greeting": ("string", 60, 120, "hello", 5),
+    })
+    service = MagicMock()
+    service.get_db_config.return_value = ("redis", {})
+    service.get_redis_client.return_value = (client, 0)
+    provider = RedisMetadataProvider(service)
+
+    details = provider.inspect_keys("db-1", "2", ["user:1", "greeting", "missing"], session=None)
+
+    assert client.round_trips == 2
+    assert client.commands_sent == 3 * 3 + 2      # TYPE/TTL/MEMORY per key, then HLEN and STRLEN
+    assert client.selected is None
+    service.get_redis_client.assert_called_once_with("db-1", None, 2)
+    assert details[0] == {
+        "key": "user:1", "exists": True, "type": "hash", "ttl": "Infinity",
+        "element_count": 4, "memory_usage": "300 bytes"
+    }
+    assert details[1]["ttl"] == "120s" and details[1]["element_count"] == 5
+    assert details[2] == {"key": "missing", "type": None, "exists": False}
+
+
+def test_executor_get_fetches_strings_in_one_round_trip():
+    """GET pipelines TYPE with the read; only non-string keys need a follow-up call."""
+    client = FakeRedis({
+        "greeting": ("string", 60, -1, "hello", 5),
+        "user:1": ("hash", 300, -1, None, 1),
+    })
+    executor = RedisExecutor(MagicMock())
+
+    assert executor._get_any(client, "greeting") == "hello"
+    assert client.round_trips == 1
+
+    assert executor._get_any(client, "user:1") == {"field": "value"}
+    assert client.round_trips == 3
+
+
+def test_redis_clients_are_pooled_per_logical_database(mock_session, mocker):
+    """Each (connection, db index) gets its own pool; invalidation closes all of them."""
+    from services.base_service import BaseDatabaseService, _redis_cache
+
+    db_mock = MagicMock()
+    db_mock.type = "redis"
+    db_mock.config = {"host": "cache.local", "database": "1"}
+    mock_session.query.return_value.filter.return_value.first.return_value = db_mock
+    mocker.patch("redis.ConnectionPool", side_effect=lambda **kw: MagicMock(connection_kwargs=dict(kw)))
+    clients = mocker.patch("redis.Redis", side_effect=lambda connection_pool: MagicMock(connection_pool=connection_pool))
+
+    service = BaseDatabaseService()
+    default_client, default_db = service.get_redis_client("r-1", mock_session)
+    other_client, _ = service.get_redis_client("r-1", mock_session, 3)
+
+    assert default_db == 1
+    assert default_client.connection_pool.connection_kwargs["db"] == 1
+    assert other_client.connection_pool.connection_kwargs["db"] == 3
+    assert service.get_redis_client("r-1", mock_session, 3)[0] is other_client
+    assert service.get_redis_client("r-1", mock_session, 1)[0] is default_client
+    assert clients.call_count == 2
+
+    BaseDatabaseService.invalidate_cache("r-1")
+    default_client.close.assert_called_once()
+    other_client.close.assert_called_once()
+    assert not [k for k in _redis_cache if "r-1" in str(k)]
+
+
+def test_executor_runs_commands_against_selected_logical_database(mocker):
+    """The schema chosen in the editor selects the pooled client for that DB index."""
+    from services.execution import ExecutionService
+
+    default_db, db3 = MagicMock(), MagicMock()
+    default_db.execute_command.return_value = 0
+    db3.execute_command.return_value = 42
+    service = ExecutionService()
+    mocker.patch("services.execution.SessionLocal", MagicMock())
+    mocker.patch("services.execution.redis_executor.SessionLocal", MagicMock())
+    mocker.patch.object(service, "get_db_config", return_value=("redis", {}))
+    mocker.patch.object(service, "_save_history")
+    get_client = mocker.patch.object(
+        service, "get_redis_client",
+        side_effect=lambda db_id, session, db_index=None: (db3 if db_index == 3 else default_db, 0)
+    )
+
+    result = service.execute_query("r-1", "DBSIZE", schema="3")
+
+    assert result["error"] is None
+    assert result["data"] == [{"result": "42"}]
+    assert get_client.call_args.args[2] == 3
+    db3.execute_command.assert_called_once_with("dbsize")
+    default_db.execute_command.assert_not_called()
+
+    events = list(service.stream_query("r-1", "DBSIZE", schema="3"))
+    assert events[0] == {"type": "rows", "rows": [{"result": "42"}]}
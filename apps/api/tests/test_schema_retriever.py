@@ -0,0 +1,266 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.metadata import SchemaEmbedding, QueryEmbedding
+from services.query_embedding_cache import query_embedding_cache, drop_partial_word
+from services.vector_index import VectorIndex, vector_index
+from services.ai.gateway import AIGateway
+from utils.vector_codec import decode_vector
+
+
+@pytest.fixture
+def embedding_store(mocker):
+    """In-memory metadata store holding only the schema_embeddings table."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    SchemaEmbedding.__table__.create(engine)
+    QueryEmbedding.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    mocker.patch("services.schema_retriever.SessionLocal", factory)
+    mocker.patch("services.query_embedding_cache.SessionLocal", factory)
+    query_embedding_cache.clear_memory()
+    vector_index.invalidate("db1")
+    yield factory
+    vector_index.invalidate("db1")
+
+
+class _InlineExecutor:
+    """Runs submitted jobs immediately so background indexing is deterministic."""
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        fn(*args)
+
+
+@pytest.fixture
+def inline_jobs(mocker):
+    from services.schema_retriever import schema_retriever
+    executor = _InlineExecutor()
+    mocker.patch.object(schema_retriever, "_executor", executor)
+    mocker.patch.object(schema_retriever, "_jobs", {})
+    return executor
+
+
+@pytest.fixture
+def fake_genai(mocker):
+    """Deterministic embedder: one dimension per known keyword."""
+    vocab = ["order", "customer", "product", "invoice"]
+
+    def embed_content(model, content, task_type=None):
+        items = content if isinstance(content, list) else [content]
+        vectors = [[float(item.lower().count(w)) + 0.01 for w in vocab] for item in items]
+        return {"embedding": vectors if isinstance(content, list) else vectors[0]}
+
+    genai = MagicMock()
+    genai.embed_content.side_effect = embed_content
+    mocker.patch("services.schema_retriever.genai", genai)
+    mocker.patch("services.schema_retriever.embed_content", side_effect=lambda api_key, **kw: genai.embed_content(**kw))
+    mocker.patch("services.schema_retriever.HAS_GENAI", True)
+    mocker.patch("services.schema_retriever._get_system_api_key", return_value=None)
+    mocker.patch("services.schema_retriever.ai_gateway", AIGateway())   # a fresh rate-limit bucket per test
+    return genai
+
+
+def test_vector_index_top_k_matches_brute_force():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(500, 32))
+    names = [f"t{i}" for i in range(500)]
+    entry = VectorIndex.build(zip(names, vectors.tolist()))
+    query = rng.normal(size=32)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = [names[i] for i in np.argsort(-(unit @ (query / np.linalg.norm(query))))[:10]]
+
+    result = VectorIndex().search(entry, query.tolist(), 10)
+    assert [name for name, _ in result] == expected
+    assert result[0][1] >= result[-1][1]
+    assert VectorIndex().search(entry, [1.0, 2.0], 10) == []
+
+
+def test_retrieval_uses_cached_matrix_until_reindex(embedding_store, fake_genai, mocker):
+    from services.schema_retriever import schema_retriever
+    columns = {
+        "orders": [{"name": "order_id"}, {"name": "customer_id"}],
+        "customers": [{"name": "customer_id"}, {"name": "name"}],
+        "products": [{"name": "product_id"}],
+    }
+    mocker.patch("services.schema_retriever.metadata_service.get_all_columns", side_effect=lambda *a: dict(columns))
+    assert schema_retriever.index_database("db1", "public") is True
+
+    load = mocker.spy(schema_retriever, "_load_vectors")
+    assert schema_retriever.get_relevant_tables("db1", "customer names", "public", top_k=1) == ["customers"]
+    assert schema_retriever.get_relevant_tables("db1", "product list", "public", top_k=1) == ["products"]
+    assert load.call_count == 1
+
+    columns["invoices"] = [{"name": "invoice_id"}]
+    schema_retriever.index_database("db1", "public")
+    assert schema_retriever.get_relevant_tables("db1", "invoice", "public", top_k=1) == ["invoices"]
+    assert load.call_count == 2
+
+
+def test_reindex_embeds_only_changed_tables_in_batches(embedding_store, fake_genai, mocker):
+    import services.schema_retriever as retriever_module
+    from services.schema_retriever import schema_retriever
+    mocker.patch.object(retriever_module, "EMBED_BATCH_SIZE", 2)
+    columns = {f"t{i}": [{"name": "id"}] for i in range(5)}
+    mocker.patch("services.schema_retriever.metadata_service.get_all_columns", side_effect=lambda *a: dict(columns))
+    gateway_calls = mocker.spy(retriever_module.ai_gateway, "call")
+
+    assert schema_retriever.index_database("db1", "public") is True
+    assert fake_genai.embed_content.call_count == 3          # 5 tables in batches of 2
+    assert gateway_calls.call_count == 3                     # each batch is admitted by the AI gateway
+
+    fake_genai.embed_content.reset_mock()
+    assert schema_retriever.index_database("db1", "public") is True
+    assert fake_genai.embed_content.call_count == 0          # nothing changed
+
+    columns["t1"] = [{"name": "id"}, {"name": "customer_id"}]
+    columns["t9"] = [{"name": "id"}]
+    del columns["t4"]
+    schema_retriever.index_database("db1", "public")
+    embedded = [text for call in fake_genai.embed_content.call_args_list for text in call.kwargs["content"]]
+    assert sorted(embedded) == ["Table t1 with columns: id, customer_id", "Table t9 with columns: id"]
+
+    session = embedding_store()
+    rows = {r.tableName: r.tableDescription for r in session.query(SchemaEmbedding).all()}
+    session.close()
+    assert sorted(rows) == ["t0", "t1", "t2", "t3", "t9"]
+    assert rows["t1"] == "Table t1 with columns: id, customer_id"
+
+
+def test_bm25_prefers_name_matches():
+    from services.lexical_ranker import bm25_rank, table_terms
+    docs = {
+        "orderItems": table_terms("orderItems", [{"name": "order_id"}, {"name": "product_id"}]),
+        "customers": table_terms("customers", [{"name": "customerId"}, {"name": "email"}]),
+        "audit_log": table_terms("audit_log", [{"name": "id"}, {"name": "payload"}]),
+    }
+    assert [n for n, _ in bm25_rank("emails of our customers", docs, 2)] == ["customers"]
+    assert bm25_rank("order products", docs, 3)[0][0] == "orderItems"
+    assert bm25_rank("", docs, 3) == []
+
+
+def test_missing_vectors_rank_lexically_and_index_in_background(embedding_store, fake_genai, inline_jobs, mocker):
+    from services.schema_retriever import schema_retriever
+    mocker.patch("services.schema_retriever.metadata_service.get_all_columns", return_value={
+        "invoices": [{"name": "invoice_id"}, {"name": "customer_id"}],
+        "products": [{"name": "product_id"}],
+    })
+    index = mocker.spy(schema_retriever, "index_database")
+
+    # No embeddings yet: the answer is lexical and no intent embedding is requested
+    assert schema_retriever.get_relevant_tables("db1", "unpaid invoices", "public", top_k=1) == ["invoices"]
+    assert inline_jobs.submitted == 1 and index.call_count == 1
+    assert all(call.kwargs["task_type"] == "RETRIEVAL_DOCUMENT" for call in fake_genai.embed_content.call_args_list)
+
+    status = schema_retriever.index_status("db1", "public")
+    assert status["status"] == "done" and status["indexedTables"] == 2
+
+    # Vectors are ready now, so the next request ranks semantically without re-scheduling
+    assert schema_retriever.get_relevant_tables("db1", "product catalogue", "public", top_k=1) == ["products"]
+    assert inline_jobs.submitted == 1
+
+
+def test_vector_codec_formats_round_trip():
+    from utils.vector_codec import encode_vector, decode_vector
+    vector = np.linspace(-1.5, 2.0, 768).tolist()
+    for fmt, size, tolerance in (("float32", 4, 1e-7), ("float16", 2, 2e-3), ("int8", 1, 2e-2)):
+        blob, stored_fmt, scale = encode_vector(vector, fmt)
+        assert len(blob) == 768 * size and stored_fmt == fmt
+        decoded = decode_vector(blob, fmt, scale)
+        assert decoded.dtype in (np.float32, np.float16)
+        assert np.allclose(decoded, vector, atol=tolerance * 2.0)
+    blob, _, _ = encode_vector(vector)
+    assert decode_vector(blob).base is not None      # float32 is a view over the blob, not a copy
+
+
+def test_legacy_json_rows_are_migrated_to_blobs(mocker):
+    """An old schema_embeddings table gains the binary columns and its rows are converted."""
+    from models.metadata import add_missing_columns
+    from services.schema_retriever import schema_retriever
+    from sqlalchemy import text
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE schema_embeddings (id VARCHAR PRIMARY KEY, "databaseId" VARCHAR NOT NULL, schema VARCHAR, '
+            '"tableName" VARCHAR NOT NULL, "tableDescription" TEXT, embedding JSON NOT NULL, '
+            'created_on DATETIME, changed_on DATETIME)'
+        ))
+        conn.execute(text(
+            "INSERT INTO schema_embeddings (id, \"databaseId\", schema, \"tableName\", embedding) VALUES "
+            "('a', 'db1', 'public', 'orders', '[0.5, 0.25, -1.0]'), ('b', 'db1', 'public', 'broken', '[]')"
+        ))
+        # Prisma-managed table drifted from the model: left alone
+        conn.execute(text('CREATE TABLE users (id VARCHAR PRIMARY KEY, email VARCHAR NOT NULL)'))
+    add_missing_columns(engine)
+    with engine.connect() as conn:
+        assert [row[1] for row in conn.execute(text("PRAGMA table_info(users)"))] == ["id", "email"]
+    mocker.patch("services.schema_retriever.SessionLocal", sessionmaker(bind=engine))
+
+    assert schema_retriever.migrate_storage("float16") == 1
+    session = sessionmaker(bind=engine)()
+    rows = session.query(SchemaEmbedding).all()
+    assert [r.tableName for r in rows] == ["orders"]
+    assert rows[0].vectorFormat == "float16" and rows[0].embedding == []
+    assert decode_vector(rows[0].vector, rows[0].vectorFormat, rows[0].vectorScale).tolist() == [0.5, 0.25, -1.0]
+    # Legacy rows never recorded their model: not served until the next index run re-embeds them
+    assert rows[0].embeddingModel is None
+    assert schema_retriever._load_vectors(session, "db1", "public") == []
+    session.close()
+
+
+def test_changing_the_embedding_model_reembeds_every_table(embedding_store, fake_genai, mocker):
+    from services.schema_retriever import schema_retriever
+    mocker.patch("services.schema_retriever.metadata_service.get_all_columns", return_value={
+        "customers": [{"name": "customer_id"}], "orders": [{"name": "order_id"}],
+    })
+    schema_retriever.index_database("db1", "public")
+    assert schema_retriever.index_database("db1", "public") and fake_genai.embed_content.call_count == 1
+
+    mocker.patch.object(schema_retriever, "embedding_model", "models/text-embedding-004")
+    session = embedding_store()
+    assert schema_retriever._load_vectors(session, "db1", "public") == []   # old vectors are not comparable
+    session.close()
+
+    schema_retriever.index_database("db1", "public")
+    assert fake_genai.embed_content.call_count == 2
+    assert fake_genai.embed_content.call_args.kwargs["model"] == "models/text-embedding-004"
+    session = embedding_store()
+    assert {r.embeddingModel for r in session.query(SchemaEmbedding)} == {"models/text-embedding-004"}
+    assert sorted(name for name, _ in schema_retriever._load_vectors(session, "db1", "public")) == ["customers", "orders"]
+    session.close()
+
+
+def test_intent_embeddings_are_cached_by_normalized_text(embedding_store, fake_genai, mocker):
+    from services.schema_retriever import schema_retriever
+    mocker.patch("services.schema_retriever.metadata_service.get_all_columns", return_value={
+        "customers": [{"name": "customer_id"}], "products": [{"name": "product_id"}],
+    })
+    schema_retriever.index_database("db1", "public")
+    queries = lambda: [c for c in fake_genai.embed_content.call_args_list if c.kwargs["task_type"] == "RETRIEVAL_QUERY"]
+
+    assert schema_retriever.get_relevant_tables("db1", "Top  Customers ", "public", top_k=1) == ["customers"]
+    assert schema_retriever.get_relevant_tables("db1", "top customers", "public", top_k=1) == ["customers"]
+    assert len(queries()) == 1
+    assert queries()[0].kwargs["content"] == "Top  Customers "    # normalized for the key only
+
+    # A restart loses the in-process layer; the persisted row still answers
+    query_embedding_cache.clear_memory()
+    assert schema_retriever.get_relevant_tables("db1", "TOP CUSTOMERS", "public", top_k=1) == ["customers"]
+    assert len(queries()) == 1
+    session = embedding_store()
+    assert session.query(QueryEmbedding).one().hits == 1
+    session.close()
+
+
+def test_autocomplete_intent_ignores_word_being_typed():
+    assert drop_partial_word("SELECT * FROM cust") == "SELECT * FROM "
+    assert drop_partial_word("SELECT * FROM customers WHERE c.na") == "SELECT * FROM customers WHERE "
+    assert drop_partial_word("SELECT * FROM ") == "SELECT * FROM "
+    assert drop_partial_word("") == ""
@@ -0,0 +1,86 @@
+"""
+backend/tests/test_search_index.py
+
+Tests for the object search index (FTS5) and its metadata cache feed.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from services.search_index import ObjectSearchIndex
+
+
+@pytest.fixture
+def index(tmp_path, mocker):
+    idx = ObjectSearchIndex(path=str(tmp_path / "search.db"))
+    mocker.patch.object(idx, "_database_names", return_value={"db1": "Warehouse"})
+    return idx
+
+
+def test_search_matches_substrings_across_kinds(index):
+    """Tables and columns are both found by a substring of their name."""
+    index.index_slice("db1", "public", "tables", ["dim_customer", "orders"])
+    index.index_slice("db1", "public", "columns", {"orders": [{"name": "customer_id"}, {"name": "total"}]})
+
+    results = index.search("customer")
+    names = {(r["kind"], r["name"]) for r in results}
+    assert ("table", "dim_customer") in names
+    assert ("column", "customer_id") in names
+    col = next(r for r in results if r["name"] == "customer_id")
+    assert col["parent"] == "orders"
+    assert col["path"] == "public.orders.customer_id"
+    assert col["databaseName"] == "Warehouse"
+
+
+def test_index_slice_is_incremental(index):
+    """Unchanged slices are skipped and changed slices replace only their own rows."""
+    assert index.index_slice("db1", "public", "tables", ["orders"]) is True
+    assert index.index_slice("db1", "public", "tables", ["orders"]) is False
+    index.index_slice("db1", "public", "views", ["order_summary"])
+
+    index.index_slice("db1", "public", "tables", ["invoices"])
+    names = {r["name"] for r in index.search("order")}
+    assert names == {"order_summary"}
+
+
+def test_search_filters_and_short_queries(index):
+    """Kind/database filters apply, and queries under three characters use prefix matching."""
+    index.index_slice("db1", "public", "tables", ["ab_test", "cab"])
+    index.index_slice("db2", "public", "tables", ["ab_other"])
+
+    assert {r["name"] for r in index.search("ab", database_id="db1")} == {"ab_test"}
+    assert index.search("ab_test", kinds=["view"]) == []
+
+
+def test_remove_database(index):
+    index.index_slice("db1", "public", "tables", ["orders"])
+    index.remove_database("db1")
+    assert index.search("orders") == []
+
+
+def test_cache_invalidation_drops_indexed_rows(index, mocker):
+    """kind=None notifications remove the invalidated schema's (or database's) objects."""
+    mocker.patch.object(index, "_writer", MagicMock(submit=lambda fn, *args: fn(*args)))
+    index.on_cache_update("db1", None, "schemas", ["public", "sales"])
+    index.on_cache_update("db1", "public", "tables", ["orders"])
+    index.on_cache_update("db1", "sales", "tables", ["order_lines"])
+    index.on_cache_update("db2", "public", "tables", ["order_archive"])
+
+    index.on_cache_update("db1", "public", None, None)
+    assert {r["name"] for r in index.search("order")} == {"order_lines", "order_archive"}
+    assert index.search("public") == []
+    # The slice digest went too, so re-caching the same tables indexes them again
+    assert index.index_slice("db1", "public", "tables", ["orders"]) is True
+
+    index.on_cache_update("db1", None, None, None)
+    assert {r["name"] for r in index.search("order")} == {"order_archive"}
+
+
+def test_search_route(client, mocker):
+    """The search endpoint validates input and returns index hits."""
+    import routes.metadata_routes
+    mocker.patch.object(routes.metadata_routes.search_index, "search", return_value=[{"name": "orders"}])
+
+    assert client.get('/api/database/search').status_code == 400
+    response = client.get('/api/database/search?q=ord&kinds=table')
+    assert response.status_code == 200
+    assert response.json == [{"name": "orders"}]
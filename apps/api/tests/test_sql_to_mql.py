@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import MagicMock
+
+from services.execution.sql_to_mql import translate, SqlTranslationError
+
+
+def test_select_pushes_filter_projection_sort_and_limit():
+    """Plain selects become find(filter, projection, options) the server can index."""
+    query = translate(
+        "SELECT name, address.city FROM users "
+        "WHERE age >= 18 AND age < 65 AND status IN ('active', 'new') AND name LIKE 'Jo%' "
+        "ORDER BY age DESC, name LIMIT 20 OFFSET 40"
+    )
+    assert query.collection == 'users'
+    assert query.operation == 'find'
+    assert query.to_args() == [
+        {"age": {"$gte": 18, "$lt": 65}, "status": {"$in": ["active", "new"]}, "name": {"$regex": "^Jo"}},
+        {"name": 1, "address.city": 1, "_id": 0},
+        {"sort": {"age": -1, "name": 1}, "skip": 40, "limit": 20},
+    ]
+
+
+def test_boolean_logic_and_null_handling():
+    query = translate(
+        "SELECT * FROM orders WHERE NOT (total > 100) OR (shipped IS NULL AND note IS NOT NULL) "
+        "OR qty NOT BETWEEN 1 AND 5"
+    )
+    assert query.filter == {"$or": [
+        {"total": {"$lte": 100}},
+        {"shipped": None, "note": {"$ne": None}},
+        {"$or": [{"qty": {"$lt": 1}}, {"qty": {"$gt": 5}}]},
+    ]}
+    assert query.projection is None
+
+
+def test_group_by_builds_pipeline_with_match_first():
+    query = translate(
+        "SELECT status, COUNT(*) AS n, AVG(total) FROM shop.orders WHERE total > 0 "
+        "GROUP BY status HAVING COUNT(*) > 1 ORDER BY n DESC LIMIT 5"
+    )
+    assert query.collection == 'shop.orders'
+    assert query.operation == 'aggregate'
+    assert query.pipeline == [
+        {"$match": {"total": {"$gt": 0}}},
+        {"$group": {"_id": {"status": "$status"}, "n": {"$sum": 1}, "avg_total": {"$avg": "$total"}}},
+        {"$project": {"_id": 0, "status": "$_id.status", "n": 1, "avg_total": 1}},
+        {"$match": {"n": {"$gt": 1}}},
+        {"$sort": {"n": -1}},
+        {"$limit": 5},
+    ]
+
+
+def test_hyphenated_collection_names_are_accepted_after_from():
+    assert translate("SELECT * FROM my-coll").collection == 'my-coll'
+    query = translate("SELECT name FROM app-db.user-events WHERE age > 1 LIMIT 5")
+    assert query.collection == 'app-db.user-events'
+    assert query.filter == {"age": {"$gt": 1}}
+    # Outside the FROM target a hyphen is still not part of a name
+    with pytest.raises(SqlTranslationError):
+        translate("SELECT * FROM logs WHERE my-field = 1")
+
+
+def test_aliases_rename_projected_fields():
+    query = translate("SELECT name AS n, address.city city, age FROM users ORDER BY n LIMIT 3")
+    assert query.to_args() == [
+        {},
+        {"n": "$name", "city": "$address.city", "age": 1, "_id": 0},
+        {"sort": {"name": 1}, "limit": 3},
+    ]
+
+
+def test_order_by_aggregate_resolves_to_its_output_field():
+    query = translate("SELECT status, COUNT(*) AS n FROM orders GROUP BY status ORDER BY COUNT(*) DESC")
+    assert query.pipeline[-1] == {"$sort": {"n": -1}}
+
+    # An aggregate only the ORDER BY uses is computed, sorted on, then dropped
+    query = translate("SELECT status FROM orders GROUP BY status ORDER BY COUNT(*) DESC, status")
+    assert query.pipeline == [
+        {"$group": {"_id": {"status": "$status"}, "count": {"$sum": 1}}},
+        {"$project": {"_id": 0, "status": "$_id.status", "count": 1}},
+        {"$sort": {"count": -1, "status": 1}},
+        {"$unset": ["count"]},
+    ]
+
+
+def test_double_quoted_identifiers_are_field_references():
+    assert translate('SELECT * FROM users WHERE status = "active"').filter == {
+        "$expr": {"$eq": ["$status", "$active"]}
+    }
+    assert translate('SELECT "active" FROM users WHERE "active" = TRUE').to_args()[:2] == [
+        {"active": True}, {"active": 1, "_id": 0}
+    ]
+
+
+def test_unsupported_sql_is_rejected():
+    for sql in ("DELETE FROM users", "SELECT * FROM a JOIN b ON a.id = b.id", "SELECT name, COUNT(*) FROM t"):
+        with pytest.raises(SqlTranslationError):
+            translate(sql)
+
+
+def test_mongo_executor_applies_sql_sort_and_tighter_limit():
+    """The executor hands SQL-derived options to the cursor instead of find({})."""
+    from services.execution.mongo_executor import MongoExecutor
+
+    executor = MongoExecutor(service=None)
+    name, op, args = executor._parse_query(None, True, "SELECT a FROM c WHERE b = 1 ORDER BY a LIMIT 3")
+    assert (name, op) == ('c', 'find')
+
+    find = MagicMock()
+    cursor = find.return_value
+    executor._open_cursor(find, op, args, 100)
+    find.assert_called_with({"b": 1}, {"a": 1, "_id": 0})
+    cursor.sort.assert_called_with([("a", 1)])
+    cursor.sort.return_value.limit.assert_called_with(3)
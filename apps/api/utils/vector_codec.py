@@ -0,0 +1,42 @@
+"""
+vector_codec.py
+
+Packs embedding vectors into compact little-endian blobs and back.
+Formats: float32 (exact for ranking), float16 (half size) and int8 (a quarter of
+float32, symmetric per-vector quantization with a stored scale).
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_FORMATS = {
+    'float32': np.dtype('<f4'),
+    'float16': np.dtype('<f2'),
+    'int8': np.dtype('i1'),
+}
+
+
+def encode_vector(vector: Sequence[float], fmt: str = 'float32') -> Tuple[bytes, str, Optional[float]]:
+    """Returns (blob, format, scale); scale is only set for int8."""
+    if fmt not in VECTOR_FORMATS:
+        raise ValueError(f"Unsupported vector format: {fmt}")
+    values = np.asarray(vector, dtype=np.float32)
+    if fmt != 'int8':
+        return values.astype(VECTOR_FORMATS[fmt]).tobytes(), fmt, None
+
+    peak = float(np.max(np.abs(values))) if values.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    quantized = np.clip(np.rint(values / scale), -127, 127).astype(VECTOR_FORMATS['int8'])
+    return quantized.tobytes(), fmt, scale
+
+
+def decode_vector(blob: bytes, fmt: Optional[str] = 'float32', scale: Optional[float] = None) -> np.ndarray:
+    """
+    Views a blob as a vector without copying: float32 and float16 come back as read-only
+    views of the buffer (widened once when the index matrix is stacked); int8 is rescaled.
+    """
+    values = np.frombuffer(blob, dtype=VECTOR_FORMATS[fmt or 'float32'])
+    if fmt == 'int8':
+        return values.astype(np.float32) * np.float32(scale or 1.0)
+    return values
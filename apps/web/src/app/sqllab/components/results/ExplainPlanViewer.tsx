@@ -7,8 +7,8 @@ interface ExplainPlanViewerProps {
 }
 
 export function ExplainPlanViewer({ planData, dialect = "postgresql" }: ExplainPlanViewerProps) {
-  // If the plan is JSON from Postgres
-  const isPostgresJson = dialect === "postgresql" && typeof planData === "object" && planData !== null;
+  // If the plan is JSON from Postgres (MongoDB explains are normalized to the same node shape)
+  const isPostgresJson = (dialect === "postgresql" || dialect === "mongodb") && typeof planData === "object" && planData !== null;
 
   if (isPostgresJson) {
     const plan = Array.isArray(planData) ? planData[0]?.Plan : planData?.Plan;
@@ -17,7 +17,7 @@ export function ExplainPlanViewer({ planData, dialect = "postgresql" }: ExplainP
         <div className="h-full overflow-y-auto scrollbar-thin p-4 font-mono text-xs bg-muted/5">
            <div className="mb-4 flex items-center gap-2 text-primary font-bold uppercase tracking-widest text-[10px]">
              <Activity className="h-4 w-4" />
-             <h2>PostgreSQL Execution Plan</h2>
+             <h2>{dialect === "mongodb" ? "MongoDB" : "PostgreSQL"} Execution Plan</h2>
            </div>
            
            <div className="border border-border/50 rounded-md bg-background/50 overflow-hidden shadow-sm">
@@ -212,7 +212,7 @@ function DuckDBPlanViewer({ planText }: { planText: string }) {
 /* ─────────────────────────────────────────────────── */
 
 function PostgresPlanNode({ node, depth = 0 }: { node: any; depth?: number }) {
-  const isSeqScan = node["Node Type"] === "Seq Scan";
+  const isSeqScan = node["Node Type"] === "Seq Scan" || node["Collection Scan"] === true;
   const cost = node["Total Cost"] || 0;
   const time = node["Actual Total Time"] || 0;
   
@@ -256,12 +256,25 @@ function PostgresPlanNode({ node, depth = 0 }: { node: any; depth?: number }) {
           </div>
           
           <div className="flex items-center gap-4 mt-1.5 text-[10px] opacity-70">
+            {node["Total Cost"] !== undefined && (
+              <span className="flex items-center gap-1">
+                Cost: <span className="font-bold text-foreground">{node["Startup Cost"]} .. {node["Total Cost"]}</span>
+              </span>
+            )}
             <span className="flex items-center gap-1">
-              Cost: <span className="font-bold text-foreground">{node["Startup Cost"]} .. {node["Total Cost"]}</span>
-            </span>
-            <span className="flex items-center gap-1">
-              Rows: <span className="font-bold text-foreground">{node["Plan Rows"]}</span>
+              Rows: <span className="font-bold text-foreground">{node["Plan Rows"] ?? node["Actual Rows"]}</span>
             </span>
+            {node["Docs Examined"] !== undefined && (
+              <span className="flex items-center gap-1">
+                Examined: <span className="font-bold text-foreground">{node["Docs Examined"]}</span>
+              </span>
+            )}
+            {node["Index Name"] && (
+              <span className="flex items-center gap-1 text-blue-500">
+                <Zap className="h-2.5 w-2.5" />
+                <span className="font-bold">{node["Index Name"]}</span>
+              </span>
+            )}
             {node["Actual Total Time"] !== undefined && (
               <span className="flex items-center gap-1 text-primary">
                 <Clock className="h-2.5 w-2.5" />
@@ -11,6 +11,7 @@ import { format } from "sql-formatter";
 
 interface QueryProps {
   selectedDS: string;
+  selectedSchema?: string;
   sql: string;
   autoCommit?: boolean;
   limit?: number;
@@ -20,6 +21,7 @@ interface QueryProps {
 
 export function useSQLLabQuery({
   selectedDS,
+  selectedSchema,
   sql,
   autoCommit = true,
   limit = 100,
@@ -34,12 +36,14 @@ export function useSQLLabQuery({
       sql: string;
       autoCommit?: boolean;
       limit?: number;
+      schema?: string;
     }) =>
       databaseApi.execute(
         vars.databaseId,
         vars.sql,
         vars.autoCommit,
         vars.limit,
+        vars.schema,
       ),
   });
 
@@ -66,6 +70,7 @@ export function useSQLLabQuery({
           sql: sqlOverride || sql,
           autoCommit,
           limit,
+          schema: selectedSchema,
         });
 
         // Axios returns data in data prop usually, but our client interceptor returns response.data
@@ -82,6 +87,7 @@ export function useSQLLabQuery({
     },
     [
       selectedDS,
+      selectedSchema,
       sql,
       autoCommit,
       limit,
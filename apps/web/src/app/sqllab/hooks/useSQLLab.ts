@@ -57,6 +57,7 @@ export function useSQLLab() {
     savedQueries, refetchSavedQueries,
   } = useSQLLabQuery({
     selectedDS: activeTab.selectedDS,
+    selectedSchema: activeTab.selectedSchema,
     sql: activeTab.sql,
     autoCommit: ui.activeResultTab === "results", // Generic, specific ones can override
     limit: ui.queryLimit,
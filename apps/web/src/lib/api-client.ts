@@ -168,8 +168,9 @@ export const databaseApi = {
     sql: string,
     autoCommit: boolean = true,
     limit?: number,
+    schema?: string,
   ) =>
-    req(api.post("database/execute", { databaseId, sql, autoCommit, limit })),
+    req(api.post("database/execute", { databaseId, sql, autoCommit, limit, schema })),
   getExplainPlan: (databaseId: string, sql: string) =>
     req(api.post("database/explain", { databaseId, sql })),
   saveQuery: (data: any) => req(api.post("database/save-query", data)),